@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'catalog'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate, pre_migrate
+        from . import signals  # noqa: F401
+        from .facets import install_facet_support_after_migrate
+        from .search import install_search_trigger_after_migrate, install_trigram_extension_before_migrate
+
+        pre_migrate.connect(install_trigram_extension_before_migrate, sender=self)
+        post_migrate.connect(install_search_trigger_after_migrate, sender=self)
+        post_migrate.connect(install_facet_support_after_migrate, sender=self)
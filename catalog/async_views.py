@@ -0,0 +1,84 @@
+from asgiref.sync import sync_to_async
+from django.urls import URLPattern
+from django.views.decorators.csrf import csrf_exempt
+
+
+class AsyncReadMixin:
+    """Serve viewset reads on the event loop when running under ASGI.
+
+    Actions with an ``a<action>`` coroutine (``alist``, ``aretrieve``,
+    ``aexport``) are dispatched by ``adispatch``, which mirrors
+    ``APIView.dispatch``: authentication, permissions, throttling and content
+    negotiation still run (in a worker thread, since they may touch the
+    database and cache), then
+    the coroutine awaits the ORM and the cache. Every format but the browsable
+    API is served natively; that one falls back to the sync action because it
+    renders forms from the database. Coroutine functions a response lists in
+    ``apost_render_callbacks`` are awaited with it once it's rendered, the
+    async counterpart of ``add_post_render_callback``.
+    """
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.accepted_renderer.format != 'api':
+                response = await getattr(self, f'a{self.action}')(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(getattr(self, self.action))(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        response = self.finalize_response(request, response, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            if response.accepted_renderer.format == 'json':
+                response.render()
+            else:
+                response = await sync_to_async(response.render)()
+            for callback in getattr(response, 'apost_render_callbacks', ()):
+                await callback(response)
+        return response
+
+
+def async_viewset_view(callback):
+    """Wrap the DRF view of a router route into an async Django view.
+
+    Requests for actions that have an ``a<action>`` coroutine go through
+    ``adispatch``; everything else (writes, OPTIONS, extra actions) runs the
+    original view in a worker thread.
+    """
+    cls, initkwargs = callback.cls, callback.initkwargs
+    actions = dict(callback.actions)
+    if 'get' in actions and 'head' not in actions:
+        actions['head'] = actions['get']
+    sync_view = sync_to_async(callback)
+
+    @csrf_exempt  # Like APIView.as_view: SessionAuthentication enforces CSRF itself
+    async def view(request, *args, **kwargs):
+        action = actions.get(request.method.lower())
+        if action is None or not hasattr(cls, f'a{action}'):
+            return await sync_view(request, *args, **kwargs)
+        self = cls(**initkwargs)
+        self.action_map = actions
+        for method, name in actions.items():
+            setattr(self, method, getattr(self, name))
+        return await self.adispatch(request, *args, **kwargs)
+
+    view.cls = cls
+    view.initkwargs = initkwargs
+    view.actions = callback.actions
+    return view
+
+
+def async_router_urls(router):
+    """``router.urls`` with every viewset route served by ``async_viewset_view``."""
+    patterns = []
+    for pattern in router.urls:
+        if getattr(pattern.callback, 'actions', None) and issubclass(pattern.callback.cls, AsyncReadMixin):
+            pattern = URLPattern(pattern.pattern, async_viewset_view(pattern.callback),
+                                 pattern.default_args, pattern.name)
+        patterns.append(pattern)
+    return patterns
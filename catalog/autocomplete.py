@@ -0,0 +1,378 @@
+import heapq
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from .conditional import deleted_since
+from .models import Product, ProductPopularity
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r'\w+')
+KEY_LENGTH = 48  # Characters of each name suffix that are indexed; longer prefixes are cut to match
+MAX_WORD_STARTS = 8  # Completions match the start of any of a name's first words
+SCAN_LIMIT = 500  # Prefixes matching more entries than this keep a precomputed top list
+REBUILD_THRESHOLD = 1000  # Renamed products at once past which the arrays are rebuilt rather than patched
+# Rows stamped by transactions that committed after the last sync: each sync
+# reads back SYNC_LAG further, and one a minute SYNC_OVERLAP
+SYNC_LAG = timedelta(seconds=5)
+SYNC_OVERLAP = timedelta(minutes=1)
+ENTRY_BITS = 16  # An index entry is a product slot, shifted by this, and an offset in its normalized name
+_OFFSET_MASK = (1 << ENTRY_BITS) - 1
+_AFTER = '\U0010ffff'
+
+
+def normalize(text):
+    """Casefolded words without accents or punctuation, joined by single spaces."""
+    text = text.casefold()
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return ' '.join(WORD.findall(text))
+
+
+def index_keys(name):
+    """The normalized name from each of its first words on, so completions match any of them."""
+    words = normalize(name).split(' ')
+    return {' '.join(words[start:])[:KEY_LENGTH] for start in range(min(len(words), MAX_WORD_STARTS))} - {''}
+
+
+def index_entries(slot, name):
+    """Index entries of the product in ``slot``, by key: one for each of index_keys(name)."""
+    normalized, entries, offset = normalize(name), {}, 0
+    for word in normalized.split(' ')[:MAX_WORD_STARTS]:
+        key = normalized[offset:offset + KEY_LENGTH]
+        if word and key not in entries:
+            entries[key] = slot << ENTRY_BITS | offset
+        offset += len(word) + 1
+    return entries
+
+
+def entry_key(names, entry):
+    offset = entry & _OFFSET_MASK
+    return normalize(names[entry >> ENTRY_BITS])[offset:offset + KEY_LENGTH]
+
+
+def index_rows(queryset):
+    """Stream ``(id, name, popularity)`` for the products of ``queryset``."""
+    rows = queryset.order_by().values_list('pk', 'name', 'popularity__units').iterator(chunk_size=10000)
+    return ((pk, name, units or 0) for pk, name, units in rows)
+
+
+def record_reservations(quantities):
+    """Add reserved units, given as ``{product_id: units}``, to the products' popularity.
+
+    Call it in the transaction that reserved them (see ProductViewSet.reserve):
+    that holds the products' row locks, so none of them can be deleted before
+    its popularity row is created, and the rows are updated in the same
+    ascending id order.
+    """
+    if not quantities:
+        return
+    now = timezone.now()
+    ProductPopularity.objects.bulk_create(
+        [ProductPopularity(product_id=pk) for pk in sorted(quantities)], ignore_conflicts=True,
+    )
+    for pk in sorted(quantities):
+        ProductPopularity.objects.filter(pk=pk).update(units=F('units') + quantities[pk], updated_at=now)
+
+
+class ProductNameIndex:
+    """Product names by prefix, in memory, for typeahead.
+
+    Products sit in slots: a list of names and arrays of ids and popularity.
+    A sorted array holds one entry per indexed name suffix (see index_keys),
+    packed into an integer as the product's slot and the offset of the
+    suffix in its normalized name, so a prefix is a bisected range and no
+    suffix is stored: keys are rebuilt from the names as they are compared.
+    Completions are the range's best products by popularity, then shortest
+    name. Ranges too big to rank per keystroke (short prefixes) have their
+    top ``CATALOG_AUTOCOMPLETE_LIMIT`` products precomputed, bottom up from
+    the longer prefixes, and patched as products change.
+
+    The index is loaded with one streaming query on the first completion,
+    or at worker startup by ``start()``. Saves and deletes in this process
+    apply as they commit. Everything else (bulk writes, other processes)
+    reaches it through ``sync()``, which ``start()`` runs in a thread after
+    product invalidations in this process (see ``schedule_sync``), at most
+    every ``CATALOG_AUTOCOMPLETE_SYNC_DELAY`` seconds, and at least every
+    ``CATALOG_AUTOCOMPLETE_SYNC_INTERVAL``. Nothing is broadcast per write:
+    other processes' changes arrive with the periodic sync.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._dirty = threading.Event()
+        self._pid = None
+        self.loaded = False
+        self.entries = array('q')  # slot << ENTRY_BITS | offset of the suffix, sorted by key
+        self.names = []  # Product name in each slot; None in free slots
+        self.slot_ids = array('q')  # Product id in each slot
+        self.popularity = array('q')  # Popularity in each slot
+        self.ids = array('q')  # Sorted product ids...
+        self.id_slots = array('q')  # ...and their slots
+        self._free = []  # Slots of removed products, reused first
+        self.top = {}  # Prefix -> slots of its best products, for prefixes matching over SCAN_LIMIT entries
+        self._synced_at = None
+        self._overlap_synced_at = None
+        self._deletions_seen = None
+
+    def key(self, entry):
+        return entry_key(self.names, entry)
+
+    def rank(self, slot):
+        return -self.popularity[slot], len(self.names[slot]), self.slot_ids[slot]
+
+    def best(self, slots):
+        return heapq.nsmallest(settings.CATALOG_AUTOCOMPLETE_LIMIT, set(slots), key=self.rank)
+
+    def product(self, pk):
+        """``(name, popularity)`` of the product, or None if it isn't indexed."""
+        slot = self._slot(pk)
+        return None if slot is None else (self.names[slot], self.popularity[slot])
+
+    def _slot(self, pk):
+        position = bisect_left(self.ids, pk)
+        if position < len(self.ids) and self.ids[position] == pk:
+            return self.id_slots[position]
+        return None
+
+    def complete(self, text, limit):
+        """Up to ``limit`` ``(id, name)`` pairs of products with a word starting with ``text``."""
+        prefix = normalize(text)[:KEY_LENGTH]
+        if not prefix:
+            return []
+        if not self.loaded:
+            self.load()
+        with self._lock:
+            top = self.top.get(prefix)
+            if top is None:
+                top = self._collect(prefix)
+            return [(self.slot_ids[slot], self.names[slot]) for slot in top[:limit]]
+
+    def _collect(self, prefix):
+        """Best slots for ``prefix``, from its precomputed sub-prefixes where the range is too big to scan."""
+        lo = bisect_left(self.entries, prefix, key=self.key)
+        hi = bisect_left(self.entries, prefix + _AFTER, lo, key=self.key)
+        if hi - lo <= SCAN_LIMIT:
+            return self.best(entry >> ENTRY_BITS for entry in self.entries[lo:hi])
+        candidates = []
+        depth = len(prefix) + 1
+        while lo < hi:
+            child = self.key(self.entries[lo])[:depth]
+            if child == prefix:  # Keys equal to the prefix sort first and can't be split any further
+                child_hi = bisect_right(self.entries, prefix, lo, hi, key=self.key)
+                candidates.extend(self.best(entry >> ENTRY_BITS for entry in self.entries[lo:child_hi]))
+            else:
+                child_hi = bisect_left(self.entries, child + _AFTER, lo, hi, key=self.key)
+                candidates.extend(self.top.get(child) or self._collect(child))
+            lo = child_hi
+        self.top[prefix] = self.best(candidates)
+        return self.top[prefix]
+
+    def _fill(self, rows):
+        """Replace the slots, entries and top lists with ones built from ``(id, name, popularity)`` rows."""
+        names, slot_ids, popularity = [], array('q'), array('q')
+        by_initial = {}  # Sorted an initial at a time, so only that many keys are built at once
+        for pk, name, rank in rows:
+            slot = len(names)
+            names.append(name)
+            slot_ids.append(pk)
+            popularity.append(rank)
+            for key, entry in index_entries(slot, name).items():
+                by_initial.setdefault(key[0], array('q')).append(entry)
+        entries = array('q')
+        for initial in sorted(by_initial):
+            entries.extend(sorted(by_initial.pop(initial), key=lambda entry: entry_key(names, entry)))
+        order = sorted(range(len(slot_ids)), key=slot_ids.__getitem__)
+        with self._lock:
+            self.names, self.slot_ids, self.popularity, self._free = names, slot_ids, popularity, []
+            self.entries = entries
+            self.ids = array('q', (slot_ids[slot] for slot in order))
+            self.id_slots = array('q', order)
+            self.top = {}
+            self._collect('')
+
+    def load(self):
+        with self._lock:
+            if self.loaded:
+                return
+            started, (deletions, _) = timezone.now(), deleted_since(Product, None)
+            clock = time.perf_counter()
+            self._fill(index_rows(Product.objects.all()))
+            self._synced_at = self._overlap_synced_at = started
+            self._deletions_seen = deletions
+            self.loaded = True
+        stats = self.stats()
+        logger.info('Autocomplete index loaded in %.2fs: %d products, %d entries, %.1f MB',
+                    time.perf_counter() - clock, stats['products'], stats['entries'], stats['bytes'] / 2 ** 20)
+
+    def apply(self, changes):
+        """Apply ``(id, name, popularity)`` changes.
+
+        A None name removes the product; a None popularity keeps the indexed one.
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            pending, renamed = [], 0
+            for pk, name, popularity in changes:
+                current = self.product(pk)
+                if name is not None and popularity is None:
+                    popularity = current[1] if current else 0
+                if current != (None if name is None else (name, popularity)):
+                    pending.append((pk, name, popularity))
+                    renamed += current is None or current[0] != name
+            if renamed > REBUILD_THRESHOLD:
+                products = {self.slot_ids[slot]: (name, self.popularity[slot])
+                            for slot, name in enumerate(self.names) if name is not None}
+                for pk, name, popularity in pending:
+                    if name is None:
+                        products.pop(pk, None)
+                    else:
+                        products[pk] = (name, popularity)
+                self._fill((pk, name, popularity) for pk, (name, popularity) in products.items())
+                return
+            for pk, name, popularity in pending:
+                self._apply(pk, name, popularity)
+
+    def _apply(self, pk, name, popularity):
+        slot = self._slot(pk)
+        if slot is None:
+            if name is None:
+                return
+            slot, old_rank, old_entries = self._allocate(pk), None, {}
+        else:
+            old_rank, old_entries = self.rank(slot), index_entries(slot, self.names[slot])
+        new_entries = index_entries(slot, name) if name is not None else {}
+        # Entries are found by their keys, which come from the slot's name:
+        # the old ones go while it still holds the old name
+        for key, entry in old_entries.items():
+            if new_entries.get(key) != entry:
+                del self.entries[self.entries.index(entry, bisect_left(self.entries, key, key=self.key))]
+        if name is not None:
+            self.names[slot], self.popularity[slot] = name, popularity
+        for key, entry in new_entries.items():
+            if old_entries.get(key) != entry:
+                self.entries.insert(bisect_right(self.entries, key, key=self.key), entry)
+
+        def prefixes(keys):
+            return {key[:length] for key in keys for length in range(len(key) + 1)} & self.top.keys()
+
+        new_prefixes = prefixes(new_entries)
+        limit = settings.CATALOG_AUTOCOMPLETE_LIMIT
+        # Longest first, so a prefix recomputed from its sub-prefixes sees their patched lists
+        for prefix in sorted(prefixes(old_entries) | new_prefixes, key=len, reverse=True):
+            top = self.top[prefix]
+            if slot in top:
+                top.remove(slot)
+                if len(top) + 1 >= limit and (prefix not in new_prefixes or self.rank(slot) > old_rank):
+                    del self.top[prefix]  # Others may now rank above it
+                    self._collect(prefix)
+                    continue
+            if prefix in new_prefixes:
+                insort(top, slot, key=self.rank)
+                del top[limit:]
+        if name is None:
+            self._release(pk, slot)
+
+    def _allocate(self, pk):
+        if self._free:
+            slot = self._free.pop()
+            self.slot_ids[slot] = pk
+        else:
+            slot = len(self.names)
+            self.names.append(None)
+            self.slot_ids.append(pk)
+            self.popularity.append(0)
+        position = bisect_left(self.ids, pk)
+        self.ids.insert(position, pk)
+        self.id_slots.insert(position, slot)
+        return slot
+
+    def _release(self, pk, slot):
+        position = bisect_left(self.ids, pk)
+        del self.ids[position], self.id_slots[position]
+        self.names[slot], self.slot_ids[slot], self.popularity[slot] = None, 0, 0
+        self._free.append(slot)
+
+    def stats(self):
+        """Size of the index; ``bytes`` approximates its memory footprint in this process."""
+        with self._lock:
+            size = sum(map(sys.getsizeof, (self.entries, self.slot_ids, self.popularity, self.ids, self.id_slots)))
+            size += sys.getsizeof(self.names) + sum(sys.getsizeof(name) for name in self.names if name is not None)
+            size += sys.getsizeof(self._free) + sys.getsizeof(self.top) + sum(
+                sys.getsizeof(prefix) + sys.getsizeof(top) for prefix, top in self.top.items()
+            )
+            return {'products': len(self.ids), 'entries': len(self.entries), 'top_lists': len(self.top),
+                    'bytes': size}
+
+    def sync(self):
+        """Catch up with product writes made without this process's signals.
+
+        Reads the rows updated or ranked since the last sync, and replays the deletion
+        log (see conditional.deleted_since); only when the log can't tell
+        which products were deleted are the ids of the whole table compared.
+        """
+        if not self.loaded:
+            return
+        started = timezone.now()
+        deletions, deleted = deleted_since(Product, self._deletions_seen)
+        since = self._synced_at - SYNC_LAG
+        overlap = started - self._overlap_synced_at >= SYNC_OVERLAP
+        if overlap:
+            since = min(since, self._overlap_synced_at - SYNC_OVERLAP)
+        changes = {}
+        for rows in (Product.objects.filter(updated_at__gte=since),
+                     Product.objects.filter(popularity__updated_at__gte=since)):
+            changes.update((row[0], row) for row in index_rows(rows))
+        self.apply(list(changes.values()))
+        if deleted is None:
+            live = set(Product.objects.values_list('pk', flat=True).iterator(chunk_size=10000))
+            with self._lock:
+                deleted = set(self.ids) - live
+        self.apply((pk, None, None) for pk in deleted)
+        self._synced_at, self._deletions_seen = started, deletions
+        if overlap:
+            self._overlap_synced_at = started
+
+    def schedule_sync(self):
+        # Called for every product invalidation in this process (see signals.py)
+        self._dirty.set()
+
+    def start(self):
+        """Load the index in a background thread and keep it in sync from there."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    threading.Thread(target=self._run, name='autocomplete-index', daemon=True).start()
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                self.load()
+                self.sync()
+            except Exception:
+                logger.exception('Could not update the autocomplete index')
+            finally:
+                connections.close_all()  # This thread's connections only
+            self._dirty.wait(settings.CATALOG_AUTOCOMPLETE_SYNC_INTERVAL)
+            # Every product write invalidates: a burst of them makes one sync
+            time.sleep(max(0.0, started + settings.CATALOG_AUTOCOMPLETE_SYNC_DELAY - time.monotonic()))
+            self._dirty.clear()
+
+
+product_index = ProductNameIndex()
@@ -0,0 +1,189 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import bump_generation, coalesced_generation_bumps
+from .models import Product
+from .object_cache import category_cache
+from .serializers import ProductBatchItemSerializer, ProductFeedItemSerializer
+from .tasks import queue_product_notifications
+
+
+def bulk_create_products(items, chunk_size=None):
+    """Validate and insert a list of product dicts in bulk.
+
+    Rows are validated in memory, their category ids are checked against
+    the category object cache (one ``IN`` query for the ones it misses) and
+    the valid rows are inserted with chunked ``bulk_create`` inside a single
+    transaction. Invalid rows are reported rather than failing the batch.
+
+    Returns ``(products, errors)`` where ``errors`` is a list of
+    ``{'index': ..., 'errors': ...}`` dicts pointing into ``items``.
+    """
+    chunk_size = chunk_size or getattr(settings, 'CATALOG_BATCH_CHUNK_SIZE', 1000)
+    row_serializer = ProductBatchItemSerializer()
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, row_serializer.run_validation(item)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+
+    categories = category_cache.get_many({data['category_id'] for _, data in valid})
+    products = []
+    for index, data in valid:
+        category_id = data.pop('category_id')
+        category = categories.get(category_id)
+        if category is None:
+            errors.append({'index': index, 'errors': {
+                'category_id': [f'Invalid pk "{category_id}" - object does not exist.'],
+            }})
+            continue
+        products.append(Product(category=category, **data))
+    errors.sort(key=lambda error: error['index'])
+
+    if products:
+        with transaction.atomic():
+            Product.objects.bulk_create(products, batch_size=chunk_size)
+            queue_product_notifications(product.id for product in products)
+    return products, errors
+
+
+CREATE_FIELDS = ('name', 'category_id', 'price', 'stock')
+
+# One statement per chunk on PostgreSQL. bulk_update's CASE WHEN per row
+# costs far more to build in Python than to run. NULL means "not in the
+# row", so the column keeps its current (locked) value.
+FEED_UPDATE_SQL = """
+UPDATE catalog_product AS product
+SET price = COALESCE(feed.price, product.price), stock = COALESCE(feed.stock, product.stock), updated_at = %s
+FROM unnest(%s::bigint[], %s::numeric[], %s::integer[]) AS feed (id, price, stock)
+WHERE product.id = feed.id
+"""
+
+
+def update_products(items, chunk_size=None):
+    """Apply a list of price/stock changes in bulk, inside a single transaction.
+
+    Rows are validated in memory and name their product by ``id`` or
+    ``sku``; later rows for the same product override earlier ones. The
+    products are looked up in chunks and then locked in ascending id order
+    (the order reserve_stock locks in, so neither can deadlock the other).
+    Rows that change nothing are skipped and only the fields a row sets are
+    written (see write_changes), so a price-only row never overwrites a
+    concurrent stock change. Rows for an unknown sku that carry everything
+    a product needs are inserted with ``INSERT ... ON CONFLICT``.
+
+    Returns one ``{'index', 'status', ...}`` dict per item, in order, with
+    status ``updated``, ``unchanged``, ``created`` or ``error``.
+    """
+    chunk_size = chunk_size or getattr(settings, 'CATALOG_BATCH_CHUNK_SIZE', 1000)
+    row_serializer = ProductFeedItemSerializer()
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            data = row_serializer.run_validation(item)
+        except serializers.ValidationError as exc:
+            results[index] = {'index': index, 'status': 'error', 'errors': exc.detail}
+            continue
+        key = ('id', data.pop('id')) if 'id' in data else ('sku', data.pop('sku'))
+        valid.append((index, key, data))
+
+    outcomes = {}
+    with coalesced_generation_bumps(), transaction.atomic():
+        found = {}  # ('id', pk) or ('sku', sku) -> pk
+        keys = list(dict.fromkeys(key for _, key, _ in valid))
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            ids = [value for kind, value in chunk if kind == 'id']
+            skus = [value for kind, value in chunk if kind == 'sku']
+            for pk, sku in Product.objects.filter(Q(pk__in=ids) | Q(sku__in=skus)).values_list('pk', 'sku'):
+                found[('id', pk)] = pk
+                if sku is not None:
+                    found[('sku', sku)] = pk
+
+        # Rows for the same product (by id or sku) merge, later ones winning
+        changes, indexes = {}, {}  # ('pk', pk), or the key of an unknown product -> row, item indexes
+        for index, key, data in valid:
+            key = ('pk', found[key]) if key in found else key
+            changes.setdefault(key, {}).update(data)
+            indexes.setdefault(key, []).append(index)
+
+        updates = {}  # changed fields -> products
+        pks = sorted(pk for kind, pk in changes if kind == 'pk')
+        for start in range(0, len(pks), chunk_size):
+            locked = Product.objects.select_for_update().filter(pk__in=pks[start:start + chunk_size])
+            for product in locked.order_by('pk').only('pk', 'price', 'stock'):
+                data = changes[('pk', product.pk)]
+                fields = tuple(name for name in ('price', 'stock')
+                               if name in data and data[name] != getattr(product, name))
+                if fields:
+                    for name in fields:
+                        setattr(product, name, data[name])
+                    updates.setdefault(fields, []).append(product)
+                outcomes[('pk', product.pk)] = {'id': product.pk, 'status': 'updated' if fields else 'unchanged'}
+        write_changes(updates, chunk_size)
+
+        created = []
+        missing = [key for key in changes if key not in outcomes]
+        categories = category_cache.get_many(
+            {changes[key]['category_id'] for key in missing if 'category_id' in changes[key]}
+        )
+        for key in missing:
+            data = changes[key]
+            if key[0] != 'sku':  # Unknown id, or deleted since the lookup
+                outcomes[key] = {'status': 'error', 'errors': {'id': ['Product not found.']}}
+            elif not all(name in data for name in CREATE_FIELDS):
+                outcomes[key] = {'status': 'error', 'errors': {'sku': [
+                    'Product not found; name, category_id, price and stock are needed to create it.'
+                ]}}
+            elif data['category_id'] not in categories:
+                outcomes[key] = {'status': 'error', 'errors': {
+                    'category_id': [f'Invalid pk "{data["category_id"]}" - object does not exist.'],
+                }}
+            else:
+                created.append((key, Product(sku=key[1], **data)))
+        if created:
+            # A product created concurrently under the same sku gets this row's price and stock
+            Product.objects.bulk_create(
+                [product for _, product in created], batch_size=chunk_size,
+                update_conflicts=True, unique_fields=['sku'], update_fields=['price', 'stock'],
+            )
+            for key, product in created:
+                outcomes[key] = {'id': product.pk, 'status': 'created'}
+            queue_product_notifications(product.pk for _, product in created)
+
+    for key, key_indexes in indexes.items():
+        for index in key_indexes:
+            results[index] = {'index': index, **outcomes[key]}
+    return results
+
+
+def write_changes(updates, chunk_size):
+    """Save ``{changed fields: products}`` from update_products."""
+    if connection.vendor != 'postgresql':
+        for fields, products in updates.items():
+            Product.objects.bulk_update(products, fields, batch_size=chunk_size)
+        return
+    changed = sorted(
+        ((product.pk, product.price if 'price' in fields else None, product.stock if 'stock' in fields else None)
+         for fields, products in updates.items() for product in products),
+    )
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for start in range(0, len(changed), chunk_size):
+            cursor.execute(FEED_UPDATE_SQL, [now, *map(list, zip(*changed[start:start + chunk_size]))])
+    if changed:
+        bump_generation(Product)  # Raw SQL skips CatalogQuerySet
+
+
+def product_to_row(product):
+    """Return ``product`` as a PRODUCT_ROW_FIELDS tuple for product_rows_to_data."""
+    category = product.category
+    return (
+        product.id, product.name, product.description, product.price, product.stock, product.created_at,
+        category.id, category.name, category.description, category.created_at,
+    )
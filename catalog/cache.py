@@ -0,0 +1,209 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+from django.http import HttpResponse
+
+from .metrics import record_cache_lookup
+from .replicas import acache_policy, cache_policy
+
+# Every catalog model has a generation counter in the cache. Cached responses
+# are keyed by the generations of the models they depend on, so bumping a
+# counter on write makes every older variant unreachable at once.
+GENERATION_KEY = 'catalog:gen:{}'
+RESPONSE_KEY = 'catalog:resp:{}:{}:{}'
+VARIANTS_KEY = 'catalog:variants:{}:{}'
+STATS_KEY = 'catalog:stats:{}:{}'
+
+# Sent with the model as sender every time its generation is bumped
+generation_bumped = Signal()
+
+_deferred = threading.local()
+
+
+def _incr(key, timeout=None):
+    """Increment a counter, creating it first if it doesn't exist yet."""
+    if cache.add(key, 1, timeout=timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:  # Expired between add() and incr()
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+def get_generations(models):
+    """Return the current generation of each model, in one cache round trip."""
+    keys = [GENERATION_KEY.format(model._meta.label_lower) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, 1, timeout=None)
+            found[key] = cache.get(key, 1)
+    return [found[key] for key in keys]
+
+
+# django-redis has no native async client: Django's default async cache
+# methods hop to a worker thread per call (and aget_many per key), so the
+# multi-step operations used by async views hop once for the whole step.
+_aincr = sync_to_async(_incr)
+aget_generations = sync_to_async(get_generations)
+
+
+def bump_generation(model, using=None):
+    """Invalidate every cached response that depends on ``model``."""
+    pending = getattr(_deferred, 'pending', None)
+    if pending is not None:
+        pending.add((model, using))
+        return
+    _bump(model)
+    # A concurrent reader can still see the old rows until commit and cache
+    # them under the new generation, so bump once more after the commit.
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: _bump(model), using=using)
+
+
+def _bump(model):
+    _incr(GENERATION_KEY.format(model._meta.label_lower))
+    generation_bumped.send(sender=model)
+
+
+@contextmanager
+def coalesced_generation_bumps():
+    """Collapse all generation bumps inside the block into one per model.
+
+    Wrap it around the transaction, so the bumps land after the commit.
+    """
+    if getattr(_deferred, 'pending', None) is not None:
+        yield  # Already coalescing in an outer block
+        return
+    _deferred.pending = set()
+    try:
+        yield
+    finally:
+        pending, _deferred.pending = _deferred.pending, None
+        for model, using in pending:
+            bump_generation(model, using=using)
+
+
+def _variant_hash(request):
+    params = sorted(request.query_params.lists())
+    return hashlib.md5(repr(params).encode()).hexdigest()
+
+
+def record_stat(endpoint, outcome):
+    _incr(STATS_KEY.format(endpoint, outcome))
+
+
+def response_cache_stats(endpoint):
+    """Return hit/miss/skip counters for a cached endpoint."""
+    keys = {outcome: STATS_KEY.format(endpoint, outcome) for outcome in ('hit', 'miss', 'skip')}
+    values = cache.get_many(keys.values())
+    return {outcome: values.get(key, 0) for outcome, key in keys.items()}
+
+
+def _cache_settings(timeout, max_variants):
+    return (
+        timeout or getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 15),
+        max_variants or getattr(settings, 'CATALOG_CACHE_MAX_VARIANTS', 500),
+    )
+
+
+def _cached_response(cached):
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def cache_response(endpoint, models, timeout=None, max_variants=None):
+    """Cache rendered JSON responses of a viewset action.
+
+    The key is built from the generations of ``models`` and the query string,
+    so writes to any of them show up on the next request. At most
+    ``max_variants`` distinct query strings are stored per generation; the
+    rest are served uncached.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            # Only the plain JSON rendering is shared; the browsable API embeds
+            # per-user content.
+            if request.accepted_renderer.format != 'json':
+                return view_method(self, request, *args, **kwargs)
+
+            ttl, limit = _cache_settings(timeout, max_variants)
+            lookup, ttl = cache_policy(ttl)
+            generations = '.'.join(str(gen) for gen in get_generations(models))
+            key = RESPONSE_KEY.format(endpoint, generations, _variant_hash(request))
+            cached = cache.get(key) if lookup else None
+            record_cache_lookup(cached is not None)
+            if cached is not None:
+                record_stat(endpoint, 'hit')
+                return _cached_response(cached)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            variants = _incr(VARIANTS_KEY.format(endpoint, generations), timeout=ttl)
+            if variants > limit:
+                record_stat(endpoint, 'skip')
+                response['X-Cache'] = 'SKIP'
+                return response
+
+            def store(rendered):
+                cache.set(key, (rendered.content, rendered['Content-Type']), timeout=ttl)
+
+            record_stat(endpoint, 'miss')
+            response.add_post_render_callback(store)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def acache_response(endpoint, models, timeout=None, max_variants=None):
+    """cache_response for the ``async def`` actions of AsyncReadMixin.
+
+    A post-render callback can't await the cache, so the response is stored
+    by an async one, which AsyncReadMixin.adispatch awaits once it has
+    finalized and rendered the response.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        async def wrapper(self, request, *args, **kwargs):
+            ttl, limit = _cache_settings(timeout, max_variants)
+            lookup, ttl = await acache_policy(ttl)
+            generations = '.'.join(str(gen) for gen in await aget_generations(models))
+            key = RESPONSE_KEY.format(endpoint, generations, _variant_hash(request))
+            cached = await cache.aget(key) if lookup else None
+            record_cache_lookup(cached is not None)
+            if cached is not None:
+                await _aincr(STATS_KEY.format(endpoint, 'hit'))
+                return _cached_response(cached)
+
+            response = await view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            if await _aincr(VARIANTS_KEY.format(endpoint, generations), timeout=ttl) > limit:
+                await _aincr(STATS_KEY.format(endpoint, 'skip'))
+                response['X-Cache'] = 'SKIP'
+                return response
+
+            async def store(rendered):
+                await cache.aset(key, (rendered.content, rendered['Content-Type']), timeout=ttl)
+
+            await _aincr(STATS_KEY.format(endpoint, 'miss'))
+            response.apost_render_callbacks = [store]
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
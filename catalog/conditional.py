@@ -0,0 +1,323 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.permissions import BasePermission
+
+from .cache import VARIANTS_KEY, _aincr, _cache_settings, _incr, aget_generations, get_generations
+from .pagination import KeysetPagination
+from .replicas import acache_policy, cache_policy
+
+# Validators are memoized like cached responses: keyed by the generations of
+# the models they depend on, so any write recomputes them.
+VALIDATORS_KEY = 'catalog:validators:{}:{}:{}'
+DELETED_KEY = 'catalog:deleted:{}'
+CHANGED_KEY = 'catalog:changed:{}'
+# Ids of deleted rows, one entry per committed delete, for processes that
+# hold rows in memory (see deleted_since)
+DELETION_LOG_KEY = 'catalog:deletions:{}'
+DELETED_IDS_KEY = 'catalog:deletions:{}:{}'
+DELETION_LOG_TIMEOUT = 24 * 60 * 60
+DELETION_LOG_MAX_READ = 1000  # Readers further behind than this rescan instead
+
+
+def record_deletion(model):
+    """Remember when a ``model`` row was last deleted.
+
+    max(updated_at) can't see deletions, so Last-Modified takes this into
+    account as well.
+    """
+    cache.set(DELETED_KEY.format(model._meta.label_lower), time.time(), timeout=None)
+
+
+def record_change(model):
+    """Remember when ``model``'s generation was last bumped.
+
+    A row that an update moves out of a filtered list takes its updated_at
+    with it, so max(updated_at) of the rows left can't tell; Last-Modified
+    takes this into account as well.
+    """
+    cache.set(CHANGED_KEY.format(model._meta.label_lower), time.time(), timeout=None)
+
+
+def _change_keys(models):
+    return [key.format(model._meta.label_lower) for key in (DELETED_KEY, CHANGED_KEY) for model in models]
+
+
+def _last_changes(found, models):
+    """When a row of ``models`` was last deleted, and when any of them last
+    changed, out of the ``_change_keys`` values in ``found``.
+    """
+    keys = _change_keys(models)
+    return (
+        max((found[key] for key in keys[:len(models)] if key in found), default=None),
+        max((found[key] for key in keys[len(models):] if key in found), default=None),
+    )
+
+
+@sync_to_async
+def _aget_many(keys):
+    return cache.get_many(keys)  # One thread hop for the whole lookup (see cache.py)
+
+
+def log_deletions(model, pks):
+    """Append the ids of committed ``model`` deletions to the deletion log."""
+    label = model._meta.label_lower
+    sequence = _incr(DELETION_LOG_KEY.format(label))
+    cache.set(DELETED_IDS_KEY.format(label, sequence), list(pks), timeout=DELETION_LOG_TIMEOUT)
+
+
+def deleted_since(model, sequence):
+    """Return ``(sequence, ids)``: the deletion log's position, and the ids logged after ``sequence``.
+
+    ``ids`` is None when some of them can't be told any more (entries expired
+    or evicted, the log reset, or too many to read): the reader must compare
+    with the table instead. A ``sequence`` of None just reads the position.
+    """
+    label = model._meta.label_lower
+    current = cache.get(DELETION_LOG_KEY.format(label), 0)
+    if sequence is None or current == sequence:
+        return current, set()
+    if not sequence < current <= sequence + DELETION_LOG_MAX_READ:
+        return current, None
+    keys = [DELETED_IDS_KEY.format(label, entry) for entry in range(sequence + 1, current + 1)]
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        return current, None
+    return current, {pk for pks in found.values() for pk in pks}
+
+
+class ListFingerprint:
+    """Validators of a filtered list, from one aggregate query: max(updated_at)
+    of its rows and of the ``related`` foreign keys embedded in them, plus the
+    row count, which changes when a row leaves the filter.
+
+    The filtered queryset and the count are left on the view (see
+    FingerprintReuseMixin), so a list that isn't answered with a 304 filters
+    once and takes the count from here rather than another COUNT(*).
+
+    Keyset pages (``?cursor=``) exist to avoid COUNT(*), so their token is
+    None and the ETag follows the catalog generations instead.
+    """
+
+    def __init__(self, *related):
+        self.related = related
+
+    def skip(self, request):
+        return KeysetPagination.cursor_query_param in request.query_params
+
+    def aggregates(self):
+        aggregates = {'count': Count('pk'), 'updated_at': Max('updated_at')}
+        aggregates.update({name: Max(f'{name}__updated_at') for name in self.related})
+        return aggregates
+
+    @staticmethod
+    def validators(stats):
+        timestamps = [value for name, value in stats.items() if name != 'count' and value is not None]
+        last = max(timestamps, default=None)
+        token = ';'.join(value.isoformat() for value in timestamps) + f";{stats['count']}"
+        return (last.timestamp() if last else None), token
+
+    def __call__(self, view, request, *args, **kwargs):
+        if self.skip(request):
+            return None, None
+        queryset = view.filter_queryset(view.get_queryset())
+        stats = queryset.order_by().aggregate(**self.aggregates())
+        view.filtered, view.filtered_count = queryset, stats['count']
+        return self.validators(stats)
+
+    async def acall(self, view, request, *args, **kwargs):
+        if self.skip(request):
+            return None, None
+        # Filter validation may query the database (e.g. ?category=)
+        queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+        stats = await queryset.order_by().aaggregate(**self.aggregates())
+        view.filtered, view.filtered_count = queryset, stats['count']
+        return self.validators(stats)
+
+
+class DetailFingerprint:
+    """Validators of one object: its updated_at and those of the ``related`` foreign keys.
+
+    With ``fields``, the object is read as a named row of those fields (plus
+    the timestamps) from the filtered queryset, and left on the view as
+    ``fingerprint_row`` for the response; ``instance(row)`` builds the model
+    instance that object permissions are checked against.
+    """
+
+    def __init__(self, *related, fields=(), instance=None):
+        self.timestamps = ['updated_at', *(f'{name}__updated_at' for name in related)]
+        self.fields = fields
+        self.instance = instance
+
+    def authorize(self, view, request, kwargs):
+        """Check object permissions for a 304 or 412, which the action won't run to check.
+
+        Free unless a permission class implements has_object_permission;
+        then it costs the object's query when the validators were cached.
+        """
+        if not any(type(permission).has_object_permission is not BasePermission.has_object_permission
+                   for permission in view.get_permissions()):
+            return
+        if view.fingerprint_row is not None and self.instance is not None:
+            view.check_object_permissions(request, self.instance(view.fingerprint_row))
+        else:
+            view.get_object()  # Checks them, or raises Http404
+
+    def rows(self, view, queryset, kwargs):
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        return queryset.filter(**{view.lookup_field: kwargs[lookup_url_kwarg]}).values_list(
+            *self.fields, *self.timestamps, named=True,
+        )
+
+    def validators(self, view, row):
+        if row is None:
+            return None  # Let the view answer 404
+        if self.fields:
+            view.fingerprint_row = row
+        timestamps = row[len(self.fields):]
+        return max(timestamps).timestamp(), ';'.join(value.isoformat() for value in timestamps)
+
+    def __call__(self, view, request, *args, **kwargs):
+        try:
+            queryset = view.filter_queryset(view.get_queryset()) if self.fields else view.get_queryset()
+            return self.validators(view, self.rows(view, queryset, kwargs).first())
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    async def acall(self, view, request, *args, **kwargs):
+        try:
+            if self.fields:
+                queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+            else:
+                queryset = view.get_queryset()
+            return self.validators(view, await self.rows(view, queryset, kwargs).afirst())
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+
+class FingerprintReuseMixin:
+    """Hands a view what its fingerprint already read for the request.
+
+    On a validators cache miss the fingerprint runs before the action: the
+    list's filtered queryset comes back from filter_queryset() and its count
+    goes to CountedPageNumberPagination; a detail row is ``fingerprint_row``.
+    They stay None when the validators were cached.
+    """
+    filtered = filtered_count = fingerprint_row = None
+
+    def filter_queryset(self, queryset):
+        if self.filtered is not None:
+            return self.filtered
+        return super().filter_queryset(queryset)
+
+
+def _variant(request, kwargs):
+    return hashlib.md5(repr((
+        sorted(request.query_params.lists()), sorted(kwargs.items()), request.accepted_renderer.format,
+    )).encode()).hexdigest()
+
+
+def _finish_validators(validators, generations, changes, variant):
+    last_modified, token = validators
+    deleted, changed = changes
+    if token is None:
+        token = generations
+    if deleted is not None:
+        last_modified = max(last_modified or 0, deleted)
+        token = f'{token};{deleted}'
+    if changed is not None:
+        last_modified = max(last_modified or 0, changed)
+    etag = '"%s"' % hashlib.md5(f'{token}|{variant}'.encode()).hexdigest()
+    return (int(last_modified) if last_modified is not None else None), etag
+
+
+def _tag(response, validators):
+    last_modified, etag = validators
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_get(endpoint, models, fingerprint, timeout=None):
+    """Answer If-None-Match / If-Modified-Since with a 304 before the view runs.
+
+    ``fingerprint(view, request, *args, **kwargs)`` returns the
+    ``(last_modified, token)`` of the resource, or None when it doesn't
+    exist; a None token stands for the generations of ``models``. Both are
+    cached per generation of ``models`` and per query string, so a poll
+    answered with a 304 costs two cache round trips and no queries. A
+    fingerprint with ``authorize(view, request, kwargs)`` gets to check
+    permissions before a 304 goes out. Every 200 carries the ETag and
+    Last-Modified headers.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            ttl, limit = _cache_settings(timeout, None)
+            lookup, ttl = cache_policy(ttl)
+            generations = '.'.join(str(gen) for gen in get_generations(models))
+            variant = _variant(request, kwargs)
+            key = VALIDATORS_KEY.format(endpoint, generations, variant)
+            # The change times are only needed on a miss, but cost no extra round trip here
+            keys = _change_keys(models)
+            found = cache.get_many([key, *keys] if lookup else keys)
+            validators = found.get(key)
+            if validators is None:
+                validators = fingerprint(self, request, *args, **kwargs)
+                if validators is None:
+                    return view_method(self, request, *args, **kwargs)
+                validators = _finish_validators(validators, generations, _last_changes(found, models), variant)
+                # Same cap as cached responses, so random query strings can't fill the cache
+                if _incr(VARIANTS_KEY.format(f'{endpoint}:validators', generations), timeout=ttl) <= limit:
+                    cache.set(key, validators, timeout=ttl)
+
+            last_modified, etag = validators
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+            elif hasattr(fingerprint, 'authorize'):
+                fingerprint.authorize(self, request, kwargs)
+            return _tag(response, validators)
+        return wrapper
+    return decorator
+
+
+def aconditional_get(endpoint, models, fingerprint, timeout=None):
+    """conditional_get for the ``async def`` actions of AsyncReadMixin."""
+    def decorator(view_method):
+        @wraps(view_method)
+        async def wrapper(self, request, *args, **kwargs):
+            ttl, limit = _cache_settings(timeout, None)
+            lookup, ttl = await acache_policy(ttl)
+            generations = '.'.join(str(gen) for gen in await aget_generations(models))
+            variant = _variant(request, kwargs)
+            key = VALIDATORS_KEY.format(endpoint, generations, variant)
+            keys = _change_keys(models)
+            found = await _aget_many([key, *keys] if lookup else keys)
+            validators = found.get(key)
+            if validators is None:
+                validators = await fingerprint.acall(self, request, *args, **kwargs)
+                if validators is None:
+                    return await view_method(self, request, *args, **kwargs)
+                validators = _finish_validators(validators, generations, _last_changes(found, models), variant)
+                if await _aincr(VARIANTS_KEY.format(f'{endpoint}:validators', generations), timeout=ttl) <= limit:
+                    await cache.aset(key, validators, timeout=ttl)
+
+            last_modified, etag = validators
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view_method(self, request, *args, **kwargs)
+            elif hasattr(fingerprint, 'authorize'):
+                await sync_to_async(fingerprint.authorize)(self, request, kwargs)
+            return _tag(response, validators)
+        return wrapper
+    return decorator
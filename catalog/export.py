@@ -0,0 +1,77 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .serializers import PRODUCT_CSV_HEADER, PRODUCT_ROW_FIELDS, product_rows_to_csv, product_rows_to_data
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_row_chunks(queryset, chunk_size):
+    """Yield lists of PRODUCT_ROW_FIELDS rows read through a server-side cursor.
+
+    ``iterator()`` uses a named cursor on PostgreSQL, so only ``chunk_size``
+    rows are held in memory at a time however large the catalog is.
+    """
+    rows = queryset.values_list(*PRODUCT_ROW_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aiter_row_chunks(queryset, chunk_size):
+    """Async twin of ``iter_row_chunks``, fetching each chunk in the sync thread.
+
+    ``QuerySet.aiterator()`` isn't used: for tuple rows it opens the cursor on
+    the event loop and raises SynchronousOnlyOperation.
+    """
+    chunks = iter_row_chunks(queryset, chunk_size)
+    next_chunk = sync_to_async(next)
+    while chunk := await next_chunk(chunks, None):
+        yield chunk
+
+
+def ndjson_chunk(chunk):
+    return ''.join(
+        json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n'
+        for item in product_rows_to_data(chunk)
+    ).encode()
+
+
+def csv_chunk(writer, chunk):
+    return ''.join(writer.writerow(row) for row in product_rows_to_csv(chunk)).encode()
+
+
+def ndjson_stream(queryset, chunk_size):
+    for chunk in iter_row_chunks(queryset, chunk_size):
+        yield ndjson_chunk(chunk)
+
+
+def csv_stream(queryset, chunk_size):
+    writer = csv.writer(Echo())
+    yield writer.writerow(PRODUCT_CSV_HEADER).encode()
+    for chunk in iter_row_chunks(queryset, chunk_size):
+        yield csv_chunk(writer, chunk)
+
+
+# StreamingHttpResponse under ASGI buffers a sync iterator into a list before
+# sending it, so the async export hands it these instead.
+async def andjson_stream(queryset, chunk_size):
+    async for chunk in aiter_row_chunks(queryset, chunk_size):
+        yield ndjson_chunk(chunk)
+
+
+async def acsv_stream(queryset, chunk_size):
+    writer = csv.writer(Echo())
+    yield writer.writerow(PRODUCT_CSV_HEADER).encode()
+    async for chunk in aiter_row_chunks(queryset, chunk_size):
+        yield csv_chunk(writer, chunk)
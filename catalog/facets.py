@@ -0,0 +1,150 @@
+from django.db import connections, transaction
+from django.db.models import BooleanField, Case, Count, ExpressionWrapper, Q, Value, When
+
+from .models import ProductFacet
+from .object_cache import category_cache
+
+# Price band boundaries: band 0 is below the first one, band i is from the
+# i-th boundary up to the next. The triggers have them built in; changing
+# them takes ``manage.py rebuild_facets``, which reinstalls the triggers and
+# recounts the existing products.
+PRICE_BANDS = (10, 25, 50, 100, 250, 500, 1000)
+
+_BANDS_SQL = f"ARRAY[{', '.join(str(bound) for bound in PRICE_BANDS)}]::numeric[]"
+_KEY_SQL = f'category_id, width_bucket(price, {_BANDS_SQL}), stock > 0'
+
+# Statement-level triggers see all the rows a statement changed at once
+# (transition tables), so a bulk insert or COPY costs one grouped upsert,
+# and updates that leave every key as it was (most stock changes) cost no
+# write at all. Keys are upserted in order, so concurrent writers can't
+# deadlock on them.
+_APPLY_SQL = f"""
+        INSERT INTO catalog_productfacet AS facet (category_id, price_band, in_stock, count)
+        SELECT category_id, price_band, in_stock, sum(delta) FROM (
+            {{changes}}
+        ) AS changes (category_id, price_band, in_stock, delta)
+        GROUP BY 1, 2, 3 HAVING sum(delta) <> 0 ORDER BY 1, 2, 3
+        ON CONFLICT (category_id, price_band, in_stock) DO UPDATE SET count = facet.count + EXCLUDED.count;"""
+
+FACET_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION catalog_product_facets_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN{_APPLY_SQL.format(changes=f'SELECT {_KEY_SQL}, 1 FROM new_rows')}
+    ELSIF TG_OP = 'UPDATE' THEN{_APPLY_SQL.format(changes=f'SELECT {_KEY_SQL}, 1 FROM new_rows UNION ALL SELECT {_KEY_SQL}, -1 FROM old_rows')}
+        DELETE FROM catalog_productfacet WHERE count = 0;
+    ELSE{_APPLY_SQL.format(changes=f'SELECT {_KEY_SQL}, -1 FROM old_rows')}
+        DELETE FROM catalog_productfacet WHERE count = 0;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS catalog_product_facets_insert ON catalog_product;
+CREATE TRIGGER catalog_product_facets_insert AFTER INSERT ON catalog_product
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_product_facets_update();
+DROP TRIGGER IF EXISTS catalog_product_facets_update ON catalog_product;
+CREATE TRIGGER catalog_product_facets_update AFTER UPDATE ON catalog_product
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_product_facets_update();
+DROP TRIGGER IF EXISTS catalog_product_facets_delete ON catalog_product;
+CREATE TRIGGER catalog_product_facets_delete AFTER DELETE ON catalog_product
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_product_facets_update();
+"""
+
+REBUILD_SQL = f"""
+LOCK TABLE catalog_product IN SHARE MODE;
+DELETE FROM catalog_productfacet;
+INSERT INTO catalog_productfacet (category_id, price_band, in_stock, count)
+SELECT {_KEY_SQL}, count(*) FROM catalog_product GROUP BY 1, 2, 3;
+"""
+
+
+def install_facet_support(connection, rebuild=False):
+    """Create the facet triggers on PostgreSQL, and with ``rebuild`` recount every facet; a no-op elsewhere.
+
+    Safe to run repeatedly. Writers wait while the counts are rebuilt.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(FACET_TRIGGER_SQL)
+        if rebuild:
+            cursor.execute(REBUILD_SQL)
+
+
+def install_facet_support_after_migrate(using, **kwargs):
+    # Migration 0006 installs the triggers; this covers databases created
+    # with --nomigrations (the tests), which start empty. It leaves existing
+    # triggers alone, and a database migrated back past 0006 has no facet
+    # table to install them for.
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT to_regclass('catalog_productfacet') IS NOT NULL AND NOT EXISTS ("
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'catalog_product_facets_insert')"
+        )
+        missing = cursor.fetchone()[0]
+    if missing:
+        install_facet_support(connection)
+
+
+def price_band(field='price'):
+    """ORM twin of the triggers' width_bucket()."""
+    return Case(
+        *[When(**{f'{field}__gte': bound}, then=Value(index))
+          for index, bound in reversed(list(enumerate(PRICE_BANDS, 1)))],
+        default=Value(0),
+    )
+
+
+def facet_counts(queryset):
+    """Return ``(category_id, price_band, in_stock, count)`` rows for the products in ``queryset``.
+
+    The unfiltered catalog reads the trigger-maintained counters on
+    PostgreSQL. Anything else is one aggregate query, which the
+    (category, price, stock) index covers.
+    """
+    connection = connections[queryset.db]
+    if not queryset.query.where and connection.vendor == 'postgresql':
+        return list(ProductFacet.objects.using(queryset.db).filter(count__gt=0)
+                    .values_list('category_id', 'price_band', 'in_stock', 'count'))
+    return list(
+        queryset.order_by()
+        .annotate(band=price_band(), stocked=ExpressionWrapper(Q(stock__gt=0), output_field=BooleanField()))
+        .values('category_id', 'band', 'stocked')
+        .annotate(count=Count('pk'))
+        .values_list('category_id', 'band', 'stocked', 'count')
+    )
+
+
+def product_facets(queryset):
+    """Per-category and per-price-band product counts, and in-stock counts, of ``queryset``."""
+    categories, bands = {}, [0] * (len(PRICE_BANDS) + 1)
+    total = in_stock = 0
+    for category_id, band, stocked, count in facet_counts(queryset):
+        totals = categories.setdefault(category_id, {'count': 0, 'in_stock': 0})
+        totals['count'] += count
+        bands[band] += count
+        total += count
+        if stocked:
+            totals['in_stock'] += count
+            in_stock += count
+
+    names = category_cache.get_many(categories)
+    bounds = (0, *PRICE_BANDS, None)
+    return {
+        'count': total,
+        'in_stock': in_stock,
+        'categories': sorted(
+            ({'id': category_id, 'name': names[category_id].name, **totals}
+             for category_id, totals in categories.items() if category_id in names),
+            key=lambda category: (-category['count'], category['name']),
+        ),
+        'price_bands': [
+            {'min': bounds[band], 'max': bounds[band + 1], 'count': count} for band, count in enumerate(bands)
+        ],
+    }
@@ -0,0 +1,58 @@
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import Product
+from .pagination import KeysetPagination
+from .search import search_products
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+class ProductFilter(filters.FilterSet):
+    """Product list filters, shaped after the indexes on Product.
+
+    The common "category + price range + in stock, ordered by price" query
+    is one range scan of ``catalog_product_instock_idx``, which only holds
+    products in stock; without ``in_stock`` the facet index covers it.
+    """
+    category = NumberInFilter(field_name='category_id')  # ?category=1 or ?category=1,2
+    in_stock = filters.BooleanFilter(method='filter_in_stock')
+
+    class Meta:
+        model = Product
+        fields = {
+            'name': ['exact'],
+            'price': ['exact', 'gte', 'lte'],
+        }
+
+    def filter_in_stock(self, queryset, name, value):
+        # Written as ``stock > 0`` so the partial indexes' predicate matches
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock=0)
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """Ranked ``?search=`` over product name and description.
+
+    Results are ordered by relevance unless the client passes an explicit
+    ``?ordering=``. Keep this after OrderingFilter in ``filter_backends``.
+    Keyset pages (``?cursor=``) seek on indexed columns, which a computed
+    rank is not, so they need an explicit ordering; without one they are
+    rejected rather than silently reordered.
+    """
+    search_param = 'search'
+    cursor_ordering_message = 'Pass ?ordering= to page search results by cursor, or use ?page= for relevance order.'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        queryset = search_products(queryset, term)
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            if KeysetPagination.cursor_query_param in request.query_params:
+                raise ValidationError({KeysetPagination.cursor_query_param: [self.cursor_ordering_message]})
+            queryset = queryset.order_by('-rank', 'id')
+        return queryset
@@ -1,5 +1,39 @@
 from django import forms
+from django.forms.models import ModelChoiceIterator
 from .models import Category, Product
+from .object_cache import category_cache
+
+
+class CachedChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for instance in self.field.object_cache.all():
+            yield self.choice(instance)
+
+    def __len__(self):
+        return len(self.field.object_cache.all()) + (self.field.empty_label is not None)
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField whose choices and lookups come from an ObjectCache."""
+    iterator = CachedChoiceIterator
+
+    def __init__(self, object_cache, **kwargs):
+        self.object_cache = object_cache
+        super().__init__(object_cache.model._default_manager.all(), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            instance = self.object_cache.get(int(value))
+        except (TypeError, ValueError):
+            instance = None
+        if instance is None:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return instance
+
 
 class CategoryForm(forms.ModelForm):
     class Meta:
@@ -7,6 +41,22 @@ class CategoryForm(forms.ModelForm):
         fields = ['name', 'description']
 
 class ProductForm(forms.ModelForm):
+    category = CachedModelChoiceField(category_cache)
+
     class Meta:
         model = Product
-        fields = ['name', 'description', 'price', 'stock', 'category']
\ No newline at end of file
+        fields = ['name', 'description', 'price', 'stock', 'category']
+
+class PriceStockForm(forms.Form):
+    """New price and/or stock for every product a bulk admin action selected."""
+    price = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    stock = forms.IntegerField(min_value=0, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('price') is None and cleaned_data.get('stock') is None:
+            raise forms.ValidationError('Enter a price, a stock level, or both.')
+        return cleaned_data
+
+    def changes(self):
+        return {field: value for field, value in self.cleaned_data.items() if value is not None}
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .renderers import Fragments, encode_json
+from .serializers import PRODUCT_ROW_FIELDS, product_rows_to_data
+
+# Encoded products are keyed by id and stored with their version: the
+# updated_at of the product and of its category. A write to either makes the
+# stored fragment stale instead of needing an invalidation; the next read
+# encodes the product again and overwrites it, so no stale key is left behind.
+# The key also carries FRAGMENT_FORMAT, which must be bumped whenever the
+# encoded payload changes shape (fields, serializer, encoder) without the rows
+# changing; processes on either side of a deploy then keep separate fragments.
+FRAGMENT_FORMAT = 1
+FRAGMENT_KEY = 'catalog:frag:{}:product:{}'
+
+# PRODUCT_ROW_FIELDS plus the versions that go into the key
+PRODUCT_FRAGMENT_FIELDS = (*PRODUCT_ROW_FIELDS, 'updated_at', 'category__updated_at')
+
+# Most recently used fragments of this process, with their versions, in
+# front of the shared cache. Versions are checked here as well, so this needs
+# no invalidation either.
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+def _version(timestamp):
+    return int(timestamp.timestamp() * 1_000_000)
+
+
+def fragment_key(row):
+    return FRAGMENT_KEY.format(FRAGMENT_FORMAT, row.id)
+
+
+def fragment_version(row):
+    return _version(row.updated_at), _version(row.category__updated_at)
+
+
+def clear_local():
+    with _lock:
+        _local.clear()
+
+
+def _remember(fragments):
+    with _lock:
+        _local.update(fragments)
+        for key in fragments:
+            _local.move_to_end(key)
+        while len(_local) > settings.CATALOG_FRAGMENT_LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def product_fragments(rows):
+    """Return the JSON of PRODUCT_FRAGMENT_FIELDS rows as Fragments, in row order.
+
+    Fragments are looked up in this process, then in the shared cache with
+    one ``get_many``. Only the products found in neither at the row's version
+    are serialized and encoded; they are stored in both, replacing older
+    versions, for ``CATALOG_FRAGMENT_TIMEOUT`` seconds.
+    """
+    versions = {fragment_key(row): fragment_version(row) for row in rows}
+    found = {}
+    with _lock:
+        for key, version in versions.items():
+            entry = _local.get(key)
+            if entry is not None and entry[0] == version:
+                _local.move_to_end(key)
+                found[key] = entry[1]
+    if len(found) == len(versions):
+        return Fragments(found[key] for key in versions)
+
+    fetched = {
+        key: entry for key, entry in cache.get_many([key for key in versions if key not in found]).items()
+        if entry[0] == versions[key]
+    }
+    missing = [(key, row) for key, row in zip(versions, rows) if key not in found and key not in fetched]
+    if missing:
+        data = product_rows_to_data(row[:len(PRODUCT_ROW_FIELDS)] for _, row in missing)
+        encoded = {key: (versions[key], encode_json(item)) for (key, _), item in zip(missing, data)}
+        cache.set_many(encoded, timeout=settings.CATALOG_FRAGMENT_TIMEOUT)
+        fetched.update(encoded)
+    _remember(fetched)
+    found.update((key, fragment) for key, (_, fragment) in fetched.items())
+    return Fragments(found[key] for key in versions)
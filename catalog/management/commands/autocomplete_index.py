@@ -0,0 +1,49 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.autocomplete import ProductNameIndex, normalize
+
+
+class Command(BaseCommand):
+    help = ('Load the product name autocomplete index from the database and report its memory footprint '
+            'and completion latency.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=5000, help='Prefixes to complete (default: 5000)')
+        parser.add_argument('--limit', type=int, default=10, help='Completions per prefix (default: 10)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        index = ProductNameIndex()
+        start = time.perf_counter()
+        index.load()
+        load_seconds = time.perf_counter() - start
+        stats = index.stats()
+        self.stdout.write(f"products     {stats['products']}")
+        self.stdout.write(f"entries      {stats['entries']}")
+        self.stdout.write(f"top lists    {stats['top_lists']}")
+        self.stdout.write(f"memory       {stats['bytes'] / 2 ** 20:.1f} MB "
+                          f"({stats['bytes'] / max(stats['products'], 1):.0f} bytes/product)")
+        self.stdout.write(f'load         {load_seconds:.2f} s')
+        if not index.ids:
+            return
+
+        # Prefixes people type: 1-8 characters of a name, or of one of its words
+        rng = random.Random(options['seed'])
+        names = [name for name in index.names if name is not None]
+        prefixes = []
+        for _ in range(options['queries']):
+            text = normalize(rng.choice(names))
+            if rng.random() < 0.5:
+                text = rng.choice(text.split(' ') or [text])
+            prefixes.append(text[:rng.randint(1, 8)])
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.complete(prefix, options['limit'])
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        for label, quantile in (('p50', 0.5), ('p99', 0.99), ('max', 1)):
+            self.stdout.write(f'{label:<12} {timings[min(int(quantile * len(timings)), len(timings) - 1)] * 1000:.3f} ms')
@@ -0,0 +1,270 @@
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from catalog.cache import bump_generation
+from catalog.models import Category, Product
+from catalog.tasks import send_product_batch_notification
+
+from .benchmark_search import ADJECTIVES, DETAILS, NOUNS, Rollback
+
+# Lower is better for every metric. Changes smaller than the floor are noise,
+# whatever the percentage (a 1ms request that takes 1.5ms is not a regression).
+NOISE_FLOORS = {'p50_ms': 1.0, 'p95_ms': 2.0, 'p99_ms': 5.0, 'queries': 0, 'alloc_kib': 32.0}
+BATCH_SIZE = 100
+NOTIFICATION_SIZE = 500
+# Timings only compare between runs on the same kind of database and cache
+BACKEND_META = ('database', 'cache')
+
+
+def backend_meta():
+    return {'database': connection.vendor, 'cache': settings.CACHES['default']['BACKEND']}
+
+
+def backend_mismatch(meta, baseline):
+    """Describe how the backends of ``meta`` differ from the ``baseline``'s, or return None if they don't."""
+    expected = baseline.get('meta', {})
+    differences = [f'{name} {meta[name]} (baseline: {expected[name]})'
+                   for name in BACKEND_META if name in expected and meta[name] != expected[name]]
+    return ', '.join(differences) or None
+
+
+def compare_results(results, baseline, threshold):
+    """List the metrics in ``results`` that are more than ``threshold`` percent worse than ``baseline``.
+
+    Only sizes and scenarios present in both are compared, and changes
+    within NOISE_FLOORS are ignored.
+    """
+    regressions = []
+    for size, scenarios in results['results'].items():
+        for scenario, metrics in scenarios.items():
+            expected = baseline.get('results', {}).get(size, {}).get(scenario)
+            if not expected:
+                continue
+            for metric, floor in NOISE_FLOORS.items():
+                if metric not in expected or metric not in metrics:
+                    continue
+                limit = max(expected[metric] * (1 + threshold / 100), expected[metric] + floor)
+                if metrics[metric] > limit:
+                    regressions.append(
+                        f'{size} products, {scenario}: {metric} {metrics[metric]:g} > {expected[metric]:g} '
+                        f'(+{threshold:g}% allowed)'
+                    )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the product API against seeded catalogs of several sizes and compare the results '
+            'with a stored baseline. Seeded rows are rolled back; rows already in the database are '
+            'included in the measurements, so run it against an empty database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000',
+                            help='Comma-separated catalog sizes, e.g. 1000,100000,1000000 (default: 1000,100000)')
+        parser.add_argument('--categories', type=int, default=20, help='Categories to spread products over (default: 20)')
+        parser.add_argument('--iterations', type=int, default=100, help='Timed runs per scenario (default: 100)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Compare with this JSON file and fail on regressions')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='Allowed slowdown against the baseline, in percent (default: 20)')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write the results to --baseline instead of comparing with it')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 2:
+            raise CommandError('--iterations must be at least 2.')
+        self.iterations = options['iterations']
+        self.rng = random.Random(options['seed'])
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        baseline = None
+        if options['baseline'] and not options['save_baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+            mismatch = backend_mismatch(backend_meta(), baseline)
+            if mismatch:
+                raise CommandError(f'The baseline was recorded on other backends: {mismatch}. Compare against '
+                                   f'a baseline from these backends, or record one with --save-baseline.')
+        results = {
+            'meta': {
+                **backend_meta(),
+                'python': platform.python_version(), 'django': django.get_version(),
+                'categories': options['categories'], 'iterations': self.iterations, 'seed': options['seed'],
+            },
+            'results': {},
+        }
+
+        # Throttles would reject a benchmark's worth of requests; the test client needs 'testserver'
+        with mock.patch.object(APIView, 'throttle_classes', []), \
+                override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            try:
+                with transaction.atomic():
+                    self.client = APIClient()
+                    self.client.force_authenticate(User.objects.create_user(username='benchmark-api'))
+                    self.categories = Category.objects.bulk_create(
+                        [Category(name=f'Benchmark {index}') for index in range(options['categories'])]
+                    )
+                    self.product_ids = []
+                    seeded = 0
+                    for size in sizes:
+                        self.seed(size - seeded)
+                        seeded = size
+                        if connection.vendor == 'postgresql':
+                            with connection.cursor() as cursor:
+                                cursor.execute('ANALYZE catalog_product')
+                        results['results'][str(size)] = self.run_scenarios(size)
+                    raise Rollback
+            except Rollback:
+                pass
+        # Responses cached during the run describe rows that no longer exist
+        bump_generation(Category)
+        bump_generation(Product)
+
+        if options['output']:
+            self.write_json(options['output'], results)
+        if options['baseline'] and options['save_baseline']:
+            self.write_json(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+        elif baseline is not None:
+            regressions = compare_results(results, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions above {options['threshold']:g}% against the baseline"))
+
+    def seed(self, count):
+        batch = []
+        for _ in range(count):
+            batch.append(self.make_product())
+            if len(batch) == 5000:
+                self.product_ids += [product.id for product in Product.objects.bulk_create(batch)]
+                batch = []
+        self.product_ids += [product.id for product in Product.objects.bulk_create(batch)]
+
+    def make_product(self):
+        rng = self.rng
+        return Product(
+            name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {rng.randint(1, 9999)}',
+            description=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(DETAILS)}',
+            price=rng.randint(100, 100000) / 100, stock=rng.randint(0, 100), category=rng.choice(self.categories),
+        )
+
+    def run_scenarios(self, size):
+        rng = self.rng
+        product_ids = self.product_ids
+        category_id = self.categories[0].id
+
+        def uncached(params):
+            def request():
+                bump_generation(Product)  # Not timed: forces a cache miss
+                return lambda: self.client.get('/api/products/', params)
+            return request
+
+        def retrieve():
+            product_id = rng.choice(product_ids)
+            return lambda: self.client.get(f'/api/products/{product_id}/')
+
+        def batch_create():
+            items = [
+                {'name': product.name, 'description': product.description, 'price': str(product.price),
+                 'stock': product.stock, 'category_id': product.category_id}
+                for product in (self.make_product() for _ in range(BATCH_SIZE))
+            ]
+            return lambda: self.client.post('/api/products/batch_create/', items, format='json')
+
+        def notification_task():
+            start = rng.randrange(max(len(product_ids) - NOTIFICATION_SIZE, 1))
+            ids = product_ids[start:start + NOTIFICATION_SIZE]
+            return lambda: send_product_batch_notification.run(ids)
+
+        scenarios = {
+            'list': uncached({}),
+            'list_ordering_price': uncached({'ordering': 'price'}),
+            'list_ordering_-created_at': uncached({'ordering': '-created_at'}),
+            'list_filter_category': uncached({'category': category_id}),
+            'list_filter_in_stock_range': uncached({
+                'category': category_id, 'price__gte': '50', 'price__lte': '500', 'in_stock': 'true', 'ordering': 'price',
+            }),
+            'list_search': uncached({'search': 'wireless laptop'}),
+            'list_keyset': uncached({'cursor': '', 'ordering': 'price'}),
+            'list_cached': lambda: (lambda: self.client.get('/api/products/')),
+            'retrieve': retrieve,
+            'batch_create': batch_create,
+            'notification_task': notification_task,
+        }
+        results = {}
+        self.stdout.write(f'{size} products')
+        for name, prepare in scenarios.items():
+            results[name] = self.measure(prepare)
+            row = results[name]
+            self.stdout.write(
+                f"  {name:<28} p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  "
+                f"p99 {row['p99_ms']:>8.2f}ms  {row['queries']:>3} queries  {row['alloc_kib']:>9.1f} KiB"
+            )
+        return results
+
+    def measure(self, prepare):
+        """Time ``prepare()()`` over the configured iterations.
+
+        ``prepare`` does the untimed setup and returns the call to measure.
+        Queries come from one extra run and allocations (peak traced memory)
+        from another, so neither skews the timings.
+        """
+        prepare()()  # Warm-up
+        timings = []
+        for _ in range(self.iterations):
+            call = prepare()
+            start = time.perf_counter()
+            self.check_response(call())
+            timings.append((time.perf_counter() - start) * 1000)
+
+        # Not CaptureQueriesContext: request_started clears connection.queries
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        call = prepare()
+        with connection.execute_wrapper(count_query):
+            call()
+        call = prepare()
+        tracemalloc.start()
+        try:
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentiles[94], 3),
+            'p99_ms': round(percentiles[98], 3),
+            'queries': len(queries),
+            'alloc_kib': round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def check_response(response):
+        status_code = getattr(response, 'status_code', None)
+        if status_code is not None and status_code >= 400:
+            raise CommandError(f'Benchmark request failed with {status_code}: {response.content[:200]!r}')
+
+    @staticmethod
+    def write_json(path, results):
+        with open(path, 'w') as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+            handle.write('\n')
@@ -0,0 +1,89 @@
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from catalog.fragments import PRODUCT_FRAGMENT_FIELDS, clear_local, fragment_key, product_fragments
+from catalog.metrics import TimedJSONRenderer
+from catalog.models import Category, Product
+from catalog.serializers import PRODUCT_ROW_FIELDS, ProductSerializer, product_rows_to_data
+
+from .benchmark_search import ADJECTIVES, DETAILS, NOUNS
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure how many product list pages per second each encoding path renders (seeded rows are rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000, help='Products to seed (default: 2000)')
+        parser.add_argument('--page-size', type=int, default=50, help='Products per page (default: 50)')
+        parser.add_argument('--rounds', type=int, default=5, help='Passes over every page (default: 5)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        page_size = options['page_size']
+        try:
+            with transaction.atomic():
+                categories = [Category.objects.create(name=f'Benchmark {index}') for index in range(10)]
+                Product.objects.bulk_create([
+                    Product(
+                        name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {rng.randint(1, 9999)}',
+                        description=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(DETAILS)} ✓',
+                        price=rng.randint(100, 100000) / 100, stock=rng.randint(0, 100),
+                        category=rng.choice(categories),
+                    )
+                    for _ in range(options['products'])
+                ])
+                queryset = Product.objects.filter(category__in=categories).order_by('id')
+                instances = list(queryset.select_related('category'))
+                rows = list(queryset.values_list(*PRODUCT_FRAGMENT_FIELDS, named=True))
+                pages = [(instances[start:start + page_size], rows[start:start + page_size])
+                         for start in range(0, len(rows), page_size)]
+
+                def render(data):
+                    return TimedJSONRenderer().render({'count': len(rows), 'next': None, 'previous': None, 'results': data})
+
+                def forget(page):
+                    clear_local()
+                    cache.delete_many([fragment_key(row) for row in page])
+
+                def shared_only(page):
+                    clear_local()
+
+                # (label, prepare the page untimed, encode the page)
+                scenarios = [
+                    ('ProductSerializer + JSONRenderer', None, lambda objs, page: JSONRenderer().render(
+                        ProductSerializer(objs, many=True).data)),
+                    ('row serializer + JSONRenderer', None, lambda objs, page: JSONRenderer().render(
+                        product_rows_to_data(row[:len(PRODUCT_ROW_FIELDS)] for row in page))),
+                    ('fragments, cold cache', forget, lambda objs, page: render(product_fragments(page))),
+                    ('fragments, shared cache', shared_only, lambda objs, page: render(product_fragments(page))),
+                    ('fragments, in-process', None, lambda objs, page: render(product_fragments(page))),
+                ]
+                self.stdout.write(f"{'path':<34} {'pages/s':>10} {'ms/page':>9}")
+                for label, prepare, encode in scenarios:
+                    for objs, page in pages:  # Warm up (and fill the fragment cache)
+                        encode(objs, page)
+                    elapsed = 0
+                    for _ in range(options['rounds']):
+                        for objs, page in pages:
+                            if prepare:
+                                prepare(page)
+                            start = time.perf_counter()
+                            encode(objs, page)
+                            elapsed += time.perf_counter() - start
+                    count = options['rounds'] * len(pages)
+                    self.stdout.write(f'{label:<34} {count / elapsed:>10.0f} {elapsed / count * 1000:>9.2f}')
+                clear_local()
+                cache.delete_many([fragment_key(row) for row in rows])
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from catalog.models import Category, Product
+from catalog.search import search_products
+
+ADJECTIVES = ['wireless', 'gaming', 'compact', 'vintage', 'ergonomic', 'portable', 'smart', 'heavy', 'silent', 'solar']
+NOUNS = ['laptop', 'keyboard', 'lamp', 'speaker', 'camera', 'backpack', 'monitor', 'charger', 'headset', 'kettle']
+DETAILS = ['for travel', 'with warranty', 'in black', 'made of steel', 'for kids', 'with usb-c', 'refurbished']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure product search latency against catalog size (seeded rows are rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated catalog sizes to measure (default: 1000,10000,100000)')
+        parser.add_argument('--queries', type=int, default=50, help='Search queries per size (default: 50)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        rng = random.Random(options['seed'])
+        terms = [rng.choice(NOUNS) for _ in range(options['queries'])]
+        terms += [f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}' for _ in range(options['queries'])]
+
+        self.stdout.write(f"{'products':>10} {'search p50':>12} {'search p95':>12} {'icontains p50':>14} {'icontains p95':>14}")
+        try:
+            with transaction.atomic():
+                category = Category.objects.create(name='Benchmark')
+                seeded = 0
+                for size in sizes:
+                    self.seed(category, size - seeded, rng)
+                    seeded = size
+                    if connection.vendor == 'postgresql':
+                        with connection.cursor() as cursor:
+                            cursor.execute('ANALYZE catalog_product')
+                    indexed = self.measure(terms, lambda term: search_products(Product.objects.all(), term).order_by('-rank'))
+                    scan = self.measure(terms, lambda term: Product.objects.filter(name__icontains=term.split()[-1]).order_by('name'))
+                    self.stdout.write(
+                        f'{size:>10} {indexed[0]:>10.2f}ms {indexed[1]:>10.2f}ms {scan[0]:>12.2f}ms {scan[1]:>12.2f}ms'
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, category, count, rng):
+        batch = []
+        for _ in range(count):
+            batch.append(Product(
+                name=f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {rng.randint(1, 9999)}',
+                description=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(DETAILS)}',
+                price=rng.randint(100, 100000) / 100, stock=rng.randint(0, 100), category=category,
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+
+    @staticmethod
+    def measure(terms, build_queryset):
+        timings = []
+        for term in terms:
+            start = time.perf_counter()
+            list(build_queryset(term).values_list('id', flat=True)[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), statistics.quantiles(timings, n=20)[-1]
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.schema import code_version, generate_schema, write_schema
+
+
+class Command(BaseCommand):
+    help = ('Generate the OpenAPI schema of the current code into CATALOG_SCHEMA_DIR, so /api/docs/ '
+            'serves it without introspecting the API (run at build time).')
+
+    def handle(self, *args, **options):
+        path = write_schema(generate_schema())
+        self.stdout.write(self.style.SUCCESS(f'Schema {code_version()} written to {path}'))
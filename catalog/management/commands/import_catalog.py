@@ -0,0 +1,235 @@
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from catalog.cache import bump_generation
+from catalog.models import Category, Product
+
+PRODUCT_COLUMNS = ('sku', 'name', 'description', 'price', 'stock', 'category_id')
+
+STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS catalog_product_import (
+    line bigint, sku varchar(64), name varchar(200), description text,
+    price numeric(10, 2), stock integer, category_id bigint
+) ON COMMIT DELETE ROWS
+"""
+
+# DISTINCT ON keeps the last row per sku: ON CONFLICT can't touch a row twice
+UPSERT_SQL = """
+INSERT INTO catalog_product (sku, name, description, price, stock, category_id, created_at, updated_at)
+SELECT DISTINCT ON (sku) sku, name, description, price, stock, category_id, now(), now()
+FROM catalog_product_import
+ORDER BY sku, line DESC
+ON CONFLICT (sku) DO UPDATE SET
+    name = EXCLUDED.name, description = EXCLUDED.description, price = EXCLUDED.price,
+    stock = EXCLUDED.stock, category_id = EXCLUDED.category_id, updated_at = EXCLUDED.updated_at
+"""
+
+
+def read_records(path, file_format):
+    """Yield one dict per record of a CSV (with header) or NDJSON file.
+
+    An NDJSON line that isn't a JSON object is still a record, yielded as
+    the ValueError to reject it with, so one bad line doesn't end the import.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield ValueError(f'invalid JSON: {exc}')
+                    continue
+                yield record if isinstance(record, dict) else ValueError('not a JSON object')
+
+
+class Command(BaseCommand):
+    help = ('Bulk load categories and products from CSV or NDJSON files. Categories are upserted '
+            'by name and products by sku, using COPY on PostgreSQL and bulk_create elsewhere.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', help='File with name and description columns')
+        parser.add_argument('--products', help='File with sku, name, description, price, stock and '
+                                               'category (a category name) or category_id columns')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (default: guessed from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per transaction (default: 5000)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip the product rows committed by a previous, interrupted run')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <products file>.checkpoint)')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL')
+
+    def handle(self, *args, **options):
+        if not options['categories'] and not options['products']:
+            raise CommandError('Pass --categories and/or --products.')
+        self.chunk_size = options['chunk_size']
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        self.errors = 0
+
+        if options['categories']:
+            self.import_categories(options['categories'], self.file_format(options['categories'], options))
+        if options['products']:
+            checkpoint = options['checkpoint'] or f"{options['products']}.checkpoint"
+            self.import_products(options['products'], self.file_format(options['products'], options),
+                                 checkpoint, options['resume'])
+        # COPY bypasses the ORM, so invalidate cached responses explicitly
+        bump_generation(Category)
+        bump_generation(Product)
+
+    def file_format(self, path, options):
+        if options['format']:
+            return options['format']
+        return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+    def report_error(self, kind, number, message):
+        self.errors += 1
+        if self.errors <= 20:
+            self.stderr.write(f'{kind} record {number}: {message}')
+
+    def import_categories(self, path, file_format):
+        start = time.perf_counter()
+        incoming = {}
+        for number, record in enumerate(read_records(path, file_format), 1):
+            if isinstance(record, ValueError):
+                self.report_error('category', number, record)
+                continue
+            name = (record.get('name') or '').strip()
+            if not name:
+                self.report_error('category', number, 'missing name')
+                continue
+            incoming[name] = record.get('description') or ''
+
+        existing = {}
+        for category in Category.objects.order_by('-id'):
+            existing[category.name] = category  # Lowest id wins for duplicate names
+        with transaction.atomic():
+            changed = []
+            for name, description in incoming.items():
+                category = existing.get(name)
+                if category is not None and category.description != description:
+                    category.description = description
+                    changed.append(category)
+            Category.objects.bulk_update(changed, ['description'], batch_size=self.chunk_size)
+            Category.objects.bulk_create(
+                [Category(name=name, description=description)
+                 for name, description in incoming.items() if name not in existing],
+                batch_size=self.chunk_size,
+            )
+        self.report('categories', len(incoming), start)
+
+    def import_products(self, path, file_format, checkpoint, resume):
+        skip = 0
+        if resume and os.path.exists(checkpoint):
+            with open(checkpoint) as handle:
+                skip = json.load(handle)['products']
+            self.stdout.write(f'Resuming after {skip} product records')
+        categories = dict(Category.objects.order_by('-id').values_list('name', 'id'))
+        category_ids = set(categories.values())
+
+        start = time.perf_counter()
+        number = skip
+        chunk = []
+        for number, record in enumerate(read_records(path, file_format), 1):
+            if number <= skip:
+                continue
+            try:
+                chunk.append((number, self.parse_product(record, categories, category_ids)))
+            except ValueError as exc:
+                self.report_error('product', number, exc)
+            if len(chunk) >= self.chunk_size:
+                self.write_products(chunk)
+                chunk = []
+                # Every record up to here is committed; --resume restarts after it
+                self.save_checkpoint(checkpoint, number)
+                self.report('products', number - skip, start, final=False)
+        self.write_products(chunk)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.report('products', max(number - skip, 0), start)
+
+    def parse_product(self, record, categories, category_ids):
+        if isinstance(record, ValueError):
+            raise record
+        sku = (record.get('sku') or '').strip()
+        name = (record.get('name') or '').strip()
+        if not sku or not name:
+            raise ValueError('sku and name are required')
+        if len(sku) > 64 or len(name) > 200:
+            raise ValueError('sku or name is too long')
+        try:
+            price = Decimal(str(record.get('price'))).quantize(Decimal('0.01'))
+            stock = int(record.get('stock'))
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValueError('price and stock must be numbers')
+        if price <= 0:
+            raise ValueError('Price must be positive.')
+        if price >= 10 ** 8:
+            raise ValueError('price has too many digits')
+        if stock < 0:
+            raise ValueError('Stock cannot be negative.')
+        if record.get('category'):
+            category_id = categories.get(record['category'].strip())
+        else:
+            category_id = int(record['category_id']) if str(record.get('category_id') or '').isdigit() else None
+            category_id = category_id if category_id in category_ids else None
+        if category_id is None:
+            raise ValueError('unknown category')
+        return sku, name, record.get('description') or '', price, stock, category_id
+
+    def write_products(self, chunk):
+        if not chunk:
+            return
+        with transaction.atomic():
+            if self.use_copy:
+                self.copy_products(chunk)
+            else:
+                latest = {row[0]: row for _, row in chunk}  # Last row per sku wins
+                Product.objects.bulk_create(
+                    [Product(**dict(zip(PRODUCT_COLUMNS, row))) for row in latest.values()],
+                    update_conflicts=True, unique_fields=['sku'],
+                    update_fields=['name', 'description', 'price', 'stock', 'category'],
+                    batch_size=self.chunk_size,
+                )
+
+    def copy_products(self, chunk):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for number, row in chunk:
+            writer.writerow((number, *row))
+        buffer.seek(0)
+        copy_sql = f"COPY catalog_product_import (line, {', '.join(PRODUCT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (description))"
+        with connection.cursor() as cursor:
+            cursor.execute(STAGING_SQL)
+            cursor.execute('TRUNCATE catalog_product_import')
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                raw.copy_expert(copy_sql, buffer)
+            else:  # psycopg 3
+                with raw.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+            cursor.execute(UPSERT_SQL)
+
+    def save_checkpoint(self, checkpoint, done):
+        with open(checkpoint, 'w') as handle:
+            json.dump({'products': done}, handle)
+
+    def report(self, kind, count, start, final=True):
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0
+        message = f'{kind}: {count} records in {elapsed:.1f}s ({rate:,.0f} rows/sec)'
+        if final:
+            if self.errors:
+                message += f', {self.errors} rejected'
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(message)
@@ -0,0 +1,89 @@
+import http.client
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = '/api/products/,/api/products/?ordering=price,/api/products/?cursor=&ordering=-created_at,/api/categories/'
+
+
+class Command(BaseCommand):
+    help = ('Fire concurrent GET requests at running servers and compare throughput and latency, '
+            'e.g. gunicorn (WSGI) against uvicorn (ASGI). Start the servers with a high '
+            'THROTTLE_ANON_RATE, or every request past the limit is a 429.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', metavar='NAME=URL',
+                            help='Server to test, repeatable (default: server=http://127.0.0.1:8000)')
+        parser.add_argument('--paths', default=DEFAULT_PATHS, help='Comma-separated paths to request in turn')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent connections (default: 50)')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per target (default: 10)')
+        parser.add_argument('--unique', action='store_true',
+                            help='Add a random query parameter to every request so no response is served from cache')
+        parser.add_argument('--token', help='JWT access token sent as a Bearer Authorization header')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target'] or ['server=http://127.0.0.1:8000']:
+            name, _, url = target.partition('=')
+            if not url:
+                raise CommandError(f'--target must look like NAME=URL, got {target!r}')
+            targets.append((name, url))
+        paths = [path.strip() for path in options['paths'].split(',') if path.strip()]
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f"Bearer {options['token']}"
+
+        self.stdout.write(f"{'target':<10} {'requests':>9} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}  statuses")
+        for name, url in targets:
+            timings, statuses, elapsed = self.run(url, paths, headers, options)
+            if not timings:
+                raise CommandError(f'{name}: no request completed ({dict(statuses)})')
+            percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+            self.stdout.write(
+                f'{name:<10} {len(timings):>9} {len(timings) / elapsed:>9.1f} {statistics.median(timings):>7.1f}ms '
+                f'{percentiles[94]:>7.1f}ms {percentiles[98]:>7.1f}ms  {dict(sorted(statuses.items()))}'
+            )
+
+    def run(self, url, paths, headers, options):
+        parts = urlsplit(url)
+        deadline = time.perf_counter() + options['duration']
+        timings, statuses = [], Counter()
+        lock = threading.Lock()
+
+        def worker(offset):
+            connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            local_timings, local_statuses = [], Counter()
+            request_number = offset
+            while time.perf_counter() < deadline:
+                path = parts.path.rstrip('/') + paths[request_number % len(paths)]
+                request_number += 1
+                if options['unique']:
+                    path += ('&' if '?' in path else '?') + f'_={random.getrandbits(64)}'
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    local_statuses[response.status] += 1
+                except (OSError, http.client.HTTPException) as exc:
+                    local_statuses[type(exc).__name__] += 1
+                    connection.close()
+                    continue
+                local_timings.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            with lock:
+                timings.extend(local_timings)
+                statuses.update(local_statuses)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, statuses, time.perf_counter() - started
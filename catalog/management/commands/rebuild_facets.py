@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from catalog.facets import install_facet_support
+
+
+class Command(BaseCommand):
+    help = ('Reinstall the facet triggers and recount every facet from the products table (PostgreSQL only). '
+            'Product writes wait while it runs; needed after changing PRICE_BANDS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            self.stdout.write('Facet counters are only kept on PostgreSQL; nothing to rebuild.')
+            return
+        install_facet_support(connection, rebuild=True)
+        self.stdout.write(self.style.SUCCESS('Facet counts rebuilt.'))
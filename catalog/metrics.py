@@ -0,0 +1,223 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .renderers import has_fragments, render_fragments
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REDIS_METRICS_KEY = 'catalog:metrics'
+
+
+class RequestMetrics:
+    """Timings and counters collected while one request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = {}
+
+    def add_timing(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def server_timing(self, total):
+        entries = [
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_queries} queries"',
+            f'cache;desc="{self.cache_hits} hit / {self.cache_misses} miss"',
+        ]
+        entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.timings.items()]
+        if self.view_started is not None:
+            entries.append(f'view;dur={(time.perf_counter() - self.view_started) * 1000:.2f}')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+def record_cache_lookup(hit):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's ``name`` timing."""
+    metrics = current_metrics.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_timing(name, time.perf_counter() - start)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its encoding time as the ``serialize`` timing.
+
+    Pre-encoded Fragments are joined as they are (see fragments.py).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('serialize'):
+            if has_fragments(data):
+                if not self.get_indent(accepted_media_type, renderer_context or {}):
+                    return render_fragments(data)
+                data = json.loads(render_fragments(data))  # Browsable API and ``; indent=`` media types
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class MetricsRegistry:
+    """Per-route latency histograms and DB/cache counters.
+
+    Each worker accumulates deltas in memory and periodically adds them to a
+    Redis hash with one pipelined round trip, so ``/metrics`` reports totals
+    across all gunicorn workers. Without a Redis cache it reports this
+    process only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}    # Totals for this process (used without Redis)
+        self._pending = {}  # Deltas not yet pushed to Redis
+        self._last_flush = time.monotonic()
+
+    def _add(self, name, labels, value):
+        key = json.dumps([name, labels])
+        self._local[key] = self._local.get(key, 0) + value
+        self._pending[key] = self._pending.get(key, 0) + value
+
+    def observe(self, route, method, status, seconds, metrics):
+        labels = {'route': route, 'method': method, 'status': str(status)}
+        with self._lock:
+            for bound in DURATION_BUCKETS:
+                if seconds <= bound:
+                    self._add('http_request_duration_seconds_bucket', {**labels, 'le': str(bound)}, 1)
+            self._add('http_request_duration_seconds_bucket', {**labels, 'le': '+Inf'}, 1)
+            self._add('http_request_duration_seconds_sum', labels, seconds)
+            self._add('http_request_duration_seconds_count', labels, 1)
+            route_labels = {'route': route}
+            self._add('http_request_db_queries_total', route_labels, metrics.db_queries)
+            self._add('http_request_db_seconds_total', route_labels, metrics.db_seconds)
+            self._add('http_request_cache_lookups_total', {**route_labels, 'outcome': 'hit'}, metrics.cache_hits)
+            self._add('http_request_cache_lookups_total', {**route_labels, 'outcome': 'miss'}, metrics.cache_misses)
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def increment(self, name, labels, value=1):
+        with self._lock:
+            self._add(name, labels, value)
+
+    def _redis(self):
+        if 'django_redis' not in settings.CACHES['default']['BACKEND']:
+            return None
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            client = self._redis()
+            if client is None:
+                return
+            pipeline = client.pipeline(transaction=False)
+            for key, value in pending.items():
+                pipeline.hincrbyfloat(REDIS_METRICS_KEY, key, value)
+            pipeline.execute()
+        except Exception:
+            logger.exception('Could not push request metrics to Redis')
+            with self._lock:  # Keep the deltas for the next flush
+                for key, value in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + value
+
+    def snapshot(self):
+        self.flush()
+        try:
+            client = self._redis()
+        except Exception:
+            client = None
+        if client is not None:
+            try:
+                return {key.decode(): float(value) for key, value in client.hgetall(REDIS_METRICS_KEY).items()}
+            except Exception:
+                logger.exception('Could not read request metrics from Redis')
+        with self._lock:
+            return dict(self._local)
+
+    def reset(self):
+        with self._lock:
+            self._local.clear()
+            self._pending.clear()
+        client = self._redis()
+        if client is not None:
+            client.delete(REDIS_METRICS_KEY)
+
+
+registry = MetricsRegistry()
+
+METRIC_HELP = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by route, method and status.'),
+    'http_request_db_queries_total': ('counter', 'Database queries issued while handling requests.'),
+    'http_request_db_seconds_total': ('counter', 'Time spent in database queries.'),
+    'http_request_cache_lookups_total': ('counter', 'Catalog response cache lookups.'),
+    'catalog_object_cache_lookups_total': ('counter', 'Object cache lookups by the tier that answered them.'),
+}
+
+
+def render_prometheus(samples):
+    """Format ``MetricsRegistry.snapshot()`` in the Prometheus text format."""
+    families = {}
+    for key, value in samples.items():
+        name, labels = json.loads(key)
+        family = name
+        for suffix in ('_bucket', '_sum', '_count'):
+            if name.startswith('http_request_duration_seconds') and name.endswith(suffix):
+                family = name[:-len(suffix)]
+        families.setdefault(family, []).append((name, labels, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, help_text = METRIC_HELP.get(family, ('untyped', family))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in sorted(families[family], key=_sample_sort_key):
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            number = int(value) if float(value).is_integer() else repr(float(value))
+            lines.append(f'{name}{{{label_text}}} {number}')
+    return '\n'.join(lines) + '\n'
+
+
+def _sample_sort_key(sample):
+    name, labels, _ = sample
+    bound = labels.get('le')
+    order = float('inf') if bound == '+Inf' else float(bound) if bound else 0
+    return name, sorted((k, v) for k, v in labels.items() if k != 'le'), order
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint."""
+    return HttpResponse(render_prometheus(registry.snapshot()), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,152 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import RequestMetrics, current_metrics, registry
+from .replicas import SAFE_METHODS, pin_to_primary, routing
+
+
+class ServerTimingMiddleware:
+    """Measure each request and report it in a ``Server-Timing`` header.
+
+    Records DB query count and time (through ``execute_wrapper`` on every
+    connection), catalog cache hits/misses, JSON serialization time, view
+    time and total time, and feeds the per-route histograms behind
+    ``/metrics``. Keep it first in MIDDLEWARE so ``total`` covers the rest.
+
+    Under ASGI the ORM runs queries in the request's worker thread, which
+    has its own connections, so the wrappers are installed there.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django runs a sync process_view in a worker thread under ASGI
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with self.count_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        stack = await sync_to_async(self.count_queries)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def count_queries(metrics):
+        def count_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                metrics.db_queries += 1
+                metrics.db_seconds += time.perf_counter() - start
+
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(count_query))
+        return stack
+
+    @staticmethod
+    def finish(request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        response['Server-Timing'] = metrics.server_timing(total)
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name or match.route) if match else 'unmatched'
+        registry.observe(route, request.method, response.status_code, total, metrics)
+        return response
+
+    @staticmethod
+    def start_view():
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view()
+
+
+class ReplicaRoutingMiddleware:
+    """Let ReplicaRouter see the request, and pin clients to the primary after a write."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing(request):
+            response = self.get_response(request)
+        if self.wrote(request, response):
+            pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        with routing(request):
+            response = await self.get_response(request)
+        if self.wrote(request, response):
+            await sync_to_async(pin_to_primary)(request)
+        return response
+
+    @staticmethod
+    def wrote(request, response):
+        return bool(settings.CATALOG_READ_REPLICAS) and request.method not in SAFE_METHODS and response.status_code < 400
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware that also runs natively under ASGI.
+
+    WhiteNoise is sync-only, so Django would run every middleware around it
+    in a worker thread. Finding the file for a path is a dict lookup; only
+    requests that are actually for a static file hop to a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:17
+
+import logging
+
+import catalog.search
+import django.contrib.postgres.search
+from django.db import migrations, transaction
+
+logger = logging.getLogger('catalog.search')
+
+# Written out in full rather than imported from catalog.search, so later
+# edits there don't change what this migration installs.
+SEARCH_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON catalog_product
+    FOR EACH ROW EXECUTE FUNCTION catalog_product_search_vector_update();
+
+UPDATE catalog_product SET search_vector =
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B');
+"""
+
+DROP_SEARCH_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_search_vector_trigger ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_search_vector_update();
+"""
+
+
+def install_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SEARCH_TRIGGER_SQL)
+
+
+def remove_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_TRIGGER_SQL)
+
+
+def create_trigram_extension(apps, schema_editor):
+    # Optional: without pg_trgm the trigram index is a plain one (see SearchIndex)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception as exc:
+        logger.warning('pg_trgm is unavailable, fuzzy product search is disabled: %s', exc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_search_trigger, remove_search_trigger),
+        migrations.AddIndex(
+            model_name='product',
+            index=catalog.search.SearchIndex(fields=['search_vector'], name='catalog_product_search_vector_gin'),
+        ),
+        migrations.RunPython(create_trigram_extension, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=catalog.search.SearchIndex(fields=['name'], name='catalog_product_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Written out in full rather than imported from catalog.facets, so later
+# edits to the price bands don't change what this migration installs.
+FACET_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION catalog_product_facets_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO catalog_productfacet AS facet (category_id, price_band, in_stock, count)
+        SELECT category_id, price_band, in_stock, sum(delta) FROM (
+            SELECT category_id, width_bucket(price, ARRAY[10, 25, 50, 100, 250, 500, 1000]::numeric[]), stock > 0, 1 FROM new_rows
+        ) AS changes (category_id, price_band, in_stock, delta)
+        GROUP BY 1, 2, 3 HAVING sum(delta) <> 0 ORDER BY 1, 2, 3
+        ON CONFLICT (category_id, price_band, in_stock) DO UPDATE SET count = facet.count + EXCLUDED.count;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO catalog_productfacet AS facet (category_id, price_band, in_stock, count)
+        SELECT category_id, price_band, in_stock, sum(delta) FROM (
+            SELECT category_id, width_bucket(price, ARRAY[10, 25, 50, 100, 250, 500, 1000]::numeric[]), stock > 0, 1 FROM new_rows
+            UNION ALL
+            SELECT category_id, width_bucket(price, ARRAY[10, 25, 50, 100, 250, 500, 1000]::numeric[]), stock > 0, -1 FROM old_rows
+        ) AS changes (category_id, price_band, in_stock, delta)
+        GROUP BY 1, 2, 3 HAVING sum(delta) <> 0 ORDER BY 1, 2, 3
+        ON CONFLICT (category_id, price_band, in_stock) DO UPDATE SET count = facet.count + EXCLUDED.count;
+        DELETE FROM catalog_productfacet WHERE count = 0;
+    ELSE
+        INSERT INTO catalog_productfacet AS facet (category_id, price_band, in_stock, count)
+        SELECT category_id, price_band, in_stock, sum(delta) FROM (
+            SELECT category_id, width_bucket(price, ARRAY[10, 25, 50, 100, 250, 500, 1000]::numeric[]), stock > 0, -1 FROM old_rows
+        ) AS changes (category_id, price_band, in_stock, delta)
+        GROUP BY 1, 2, 3 HAVING sum(delta) <> 0 ORDER BY 1, 2, 3
+        ON CONFLICT (category_id, price_band, in_stock) DO UPDATE SET count = facet.count + EXCLUDED.count;
+        DELETE FROM catalog_productfacet WHERE count = 0;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS catalog_product_facets_insert ON catalog_product;
+CREATE TRIGGER catalog_product_facets_insert AFTER INSERT ON catalog_product
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_product_facets_update();
+DROP TRIGGER IF EXISTS catalog_product_facets_update ON catalog_product;
+CREATE TRIGGER catalog_product_facets_update AFTER UPDATE ON catalog_product
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_product_facets_update();
+DROP TRIGGER IF EXISTS catalog_product_facets_delete ON catalog_product;
+CREATE TRIGGER catalog_product_facets_delete AFTER DELETE ON catalog_product
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_product_facets_update();
+
+LOCK TABLE catalog_product IN SHARE MODE;
+DELETE FROM catalog_productfacet;
+INSERT INTO catalog_productfacet (category_id, price_band, in_stock, count)
+SELECT category_id, width_bucket(price, ARRAY[10, 25, 50, 100, 250, 500, 1000]::numeric[]), stock > 0, count(*)
+FROM catalog_product GROUP BY 1, 2, 3;
+"""
+
+DROP_FACET_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_facets_insert ON catalog_product;
+DROP TRIGGER IF EXISTS catalog_product_facets_update ON catalog_product;
+DROP TRIGGER IF EXISTS catalog_product_facets_delete ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_facets_update();
+"""
+
+
+def install_facet_support(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(FACET_TRIGGER_SQL)
+
+
+def remove_facet_support(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_FACET_TRIGGER_SQL)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_band', models.PositiveSmallIntegerField()),
+                ('in_stock', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'price', 'stock'], name='catalog_product_facet_idx'),
+        ),
+        migrations.AddField(
+            model_name='productfacet',
+            name='category',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='catalog.category'),
+        ),
+        migrations.AddConstraint(
+            model_name='productfacet',
+            constraint=models.UniqueConstraint(fields=('category', 'price_band', 'in_stock'), name='catalog_productfacet_key'),
+        ),
+        migrations.RunPython(install_facet_support, remove_facet_support),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_popularity(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    ProductPopularity = apps.get_model('catalog', 'ProductPopularity')
+    ranked = Product.objects.filter(popularity__gt=0).values_list('pk', 'popularity')
+    ProductPopularity.objects.bulk_create(
+        (ProductPopularity(product_id=pk, units=units) for pk, units in ranked.iterator(chunk_size=10000)),
+        batch_size=1000,
+    )
+
+
+def restore_popularity(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    ProductPopularity = apps.get_model('catalog', 'ProductPopularity')
+    for pk, units in ProductPopularity.objects.values_list('pk', 'units').iterator(chunk_size=10000):
+        Product.objects.filter(pk=pk).update(popularity=units)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_product_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='catalog.product')),
+                ('units', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(copy_popularity, restore_popularity),
+        migrations.RemoveField(
+            model_name='product',
+            name='popularity',
+        ),
+    ]
@@ -1,11 +1,51 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .cache import bump_generation
+from .search import SearchIndex
+
+
+class CatalogQuerySet(models.QuerySet):
+    """QuerySet whose bulk writes invalidate the catalog response cache.
+
+    Single-row saves and deletes are covered by signals (see signals.py), but
+    bulk_create/bulk_update/update bypass them. They also skip ``auto_now``,
+    so ``updated_at`` is set here explicitly.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if kwargs.get('update_conflicts') and 'updated_at' not in kwargs.get('update_fields', ()):
+            kwargs['update_fields'] = [*kwargs['update_fields'], 'updated_at']
+        created = super().bulk_create(objs, *args, **kwargs)
+        bump_generation(self.model, using=self.db)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        updated = super().bulk_update(objs, {*fields, 'updated_at'}, *args, **kwargs)
+        bump_generation(self.model, using=self.db)
+        return updated
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        updated = super().update(**kwargs)
+        bump_generation(self.model, using=self.db)
+        return updated
+
 
 class Category(models.Model):
     """Category model for product categorization."""
     name = models.CharField(max_length=100, db_index=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Indexed so max(updated_at) is cheap: it backs Last-Modified/ETag (see conditional.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = CatalogQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -18,16 +58,67 @@ class Category(models.Model):
 class Product(models.Model):
     """Product model for e-commerce items."""
     name = models.CharField(max_length=200, db_index=True)
+    # Natural key for bulk imports and feeds; optional for products created through the API
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)
     stock = models.PositiveIntegerField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Weighted name/description tsvector, kept current by a database trigger
+    # on PostgreSQL (see search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CatalogQuerySet.as_manager()
 
     def __str__(self):
         return self.name
 
     class Meta:
         indexes = [
-            models.Index(fields=['name', 'price']),
-        ]
\ No newline at end of file
+            # Keyset pagination: each ordering field plus the id tie-breaker
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            # Covers the facet aggregate (see facets.py)
+            models.Index(fields=['category', 'price', 'stock'], name='catalog_product_facet_idx'),
+            # In-stock products by category and price, in keyset order (see ProductFilter)
+            models.Index(fields=['category', 'price', 'id'], condition=models.Q(stock__gt=0),
+                         name='catalog_product_instock_idx'),
+            # Full-text and trigram search (see search.py)
+            SearchIndex(fields=['search_vector'], name='catalog_product_search_vector_gin'),
+            SearchIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='catalog_product_name_trgm'),
+        ]
+
+
+class ProductPopularity(models.Model):
+    """Units of a product reserved so far; ranks autocomplete completions.
+
+    A table of its own so that counting reservations never writes the product
+    row: a save, which writes every column, would put back the count it read.
+    Rows are created on a product's first reservation (see autocomplete.py).
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='popularity')
+    units = models.PositiveBigIntegerField(default=0)
+    # Indexed so the autocomplete sync can read the recently ranked products
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class ProductFacet(models.Model):
+    """Number of products per category, price band and in-stock flag.
+
+    Maintained by statement-level triggers on catalog_product on PostgreSQL
+    (see facets.py), so every write path keeps it current, COPY included.
+    No foreign key constraint: the triggers may still update the rows of a
+    category that is being deleted.
+    """
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    price_band = models.PositiveSmallIntegerField()
+    in_stock = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'price_band', 'in_stock'], name='catalog_productfacet_key'),
+        ]
@@ -0,0 +1,214 @@
+import copy
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_generations
+from .metrics import registry
+from .models import Category
+from .replicas import cache_policy
+
+logger = logging.getLogger(__name__)
+
+OBJECT_KEY = 'catalog:obj:{}:{}:{}'
+ALL = 'all'  # Key of the list of every primary key
+INVALIDATION_CHANNEL = 'catalog:invalidate'
+
+
+class ObjectCache:
+    """Model instances by primary key, in an in-process LRU in front of the shared cache.
+
+    Lookups that miss the process go to ``CACHES['default']``, keyed by the
+    model's generation like cached responses, and then to the database.
+    Every generation bump empties the LRU of this process and is broadcast
+    to the others over Redis pub/sub (see Invalidations); the LRU's TTL
+    bounds staleness if a message is lost. Until this process is listening
+    for broadcasts the LRU is bypassed.
+
+    Both tiers follow the replica cache policy (see cache_policy): a client
+    pinned to the primary reads past them, and instances loaded from a
+    replica are kept no longer than replication lag is tolerated.
+    """
+
+    def __init__(self, model, max_entries=None, ttl=None):
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # pk (or ALL) -> (expires, value)
+        self._epoch = 0  # Bumped by invalidations, so loads racing one aren't kept
+        self.lookups = {'local': 0, 'shared': 0, 'database': 0}
+
+    @property
+    def label(self):
+        return self.model._meta.label_lower
+
+    def __deepcopy__(self, memo):
+        return self  # Shared by the serializer and form fields that DRF and Django copy
+
+    def get(self, pk):
+        return self.get_many([pk]).get(pk)
+
+    def get_many(self, pks):
+        """Return ``{pk: instance}`` for the ``pks`` that exist."""
+        return self._lookup(set(pks), self.model._default_manager.in_bulk)
+
+    def all(self):
+        """Every instance in the model's default order; meant for small tables like categories."""
+        queryset = self.model._default_manager.order_by(*self.model._meta.ordering or ['pk'])
+        pks = self._lookup({ALL}, lambda keys: {ALL: list(queryset.values_list('pk', flat=True))})
+        found = self.get_many(pks[ALL])
+        return [found[pk] for pk in pks[ALL] if pk in found]
+
+    def _lookup(self, keys, load):
+        found = {}
+        lookup, ttl = cache_policy(settings.CATALOG_CACHE_TIMEOUT)
+        use_local = invalidations.listening()
+        with self._lock:
+            epoch = self._epoch
+            if use_local and lookup:
+                now = time.monotonic()
+                for key in keys:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry[0] > now:
+                        self._entries.move_to_end(key)
+                        found[key] = copy.copy(entry[1])  # Callers may modify what they get
+        self._count('local', len(found))
+        missing = keys - found.keys()
+        if not missing:
+            return found
+
+        generation = get_generations([self.model])[0]
+        shared = {}
+        if lookup:
+            shared_keys = {OBJECT_KEY.format(self.label, generation, key): key for key in missing}
+            shared = {shared_keys[key]: value for key, value in cache.get_many(shared_keys).items()}
+            self._count('shared', len(shared))
+            missing -= shared.keys()
+        loaded = load(missing) if missing else {}
+        self._count('database', len(missing))
+        if loaded:
+            cache.set_many(
+                {OBJECT_KEY.format(self.label, generation, key): value for key, value in loaded.items()},
+                timeout=ttl,
+            )
+        if use_local:
+            self._remember({**shared, **loaded}, epoch, ttl)
+        found.update(shared)
+        found.update(loaded)
+        return found
+
+    def _remember(self, values, epoch, ttl):
+        expires = time.monotonic() + min(self.ttl or settings.CATALOG_OBJECT_CACHE_TTL, ttl)
+        max_entries = self.max_entries or settings.CATALOG_OBJECT_CACHE_SIZE
+        with self._lock:
+            if epoch != self._epoch:
+                return  # Invalidated while loading: the instances may predate the change
+            for key, value in values.items():
+                self._entries[key] = (expires, copy.copy(value))
+                self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear_local(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def _count(self, tier, count):
+        if count:
+            with self._lock:
+                self.lookups[tier] += count
+            registry.increment('catalog_object_cache_lookups_total', {'model': self.label, 'tier': tier}, count)
+
+    def stats(self):
+        """Lookups answered by each tier in this process, and the share that avoided the database."""
+        total = sum(self.lookups.values())
+        return {**self.lookups, 'hit_ratio': (total - self.lookups['database']) / total if total else None}
+
+
+class Invalidations:
+    """Broadcast of object cache invalidations between processes, over Redis pub/sub.
+
+    Each process subscribes from a daemon thread started on first use (and
+    again after a fork). Without a Redis cache there is nothing to
+    broadcast to and the process always counts as listening.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._origin = None  # Tags this process's broadcasts, which it has already applied
+        self._ready = threading.Event()
+
+    def _redis(self):
+        if 'django_redis' not in settings.CACHES['default']['BACKEND']:
+            return None
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+
+    def listening(self):
+        if self._redis() is None:
+            return True
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._origin = uuid.uuid4().hex
+                    self._ready = threading.Event()
+                    threading.Thread(target=self._listen, name='object-cache-invalidations', daemon=True).start()
+        return self._ready.is_set()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                pubsub.get_message(timeout=5)  # The subscription confirmation
+                self._ready.set()
+                for message in pubsub.listen():
+                    label, origin = message['data'].decode().split()
+                    if origin != self._origin:
+                        clear_local(label)
+            except Exception:
+                logger.exception('Object cache invalidation listener disconnected')
+            # Broadcasts may have been missed while disconnected
+            self._ready.clear()
+            for object_cache in OBJECT_CACHES.values():
+                object_cache.clear_local()
+            time.sleep(1)
+
+    def publish(self, label):
+        try:
+            client = self._redis()
+            if client is not None:
+                client.publish(INVALIDATION_CHANNEL, f'{label} {self._origin}')
+        except Exception:
+            logger.exception('Could not broadcast the invalidation of %s', label)
+
+
+invalidations = Invalidations()
+
+category_cache = ObjectCache(Category)
+
+OBJECT_CACHES = {category_cache.label: category_cache}
+
+
+def clear_local(label):
+    object_cache = OBJECT_CACHES.get(label)
+    if object_cache is not None:
+        object_cache.clear_local()
+
+
+def invalidate(model):
+    """Drop cached instances of ``model`` in this process and tell the others to."""
+    label = model._meta.label_lower
+    if label in OBJECT_CACHES:
+        clear_local(label)
+        invalidations.publish(label)
@@ -0,0 +1,229 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks past the last row instead of using OFFSET.
+
+    The ordering chosen through ``OrderingFilter`` is extended with a unique
+    ``id`` tie-breaker, and the cursor carries the values of those columns
+    for the boundary row. Every page is a range scan over a matching
+    ``(field, id)`` index, so page 5000 costs the same as page 1. No total
+    count is returned.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    tie_breaker = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows([row async for row in self.page_queryset(queryset, request, view)])
+
+    def page_queryset(self, queryset, request, view):
+        """The query for the requested page, plus one row to tell whether there's a next one."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering
+        ]
+        self.values, self.reverse = self.decode_cursor(request, queryset.model)
+
+        seek_fields = [(name, desc != self.reverse) for name, desc in self.fields]
+        if self.values is not None:
+            queryset = queryset.filter(self.seek(seek_fields, self.values))
+        queryset = queryset.order_by(*[('-' if desc else '') + name for name, desc in seek_fields])
+        return queryset[:self.page_size + 1]
+
+    def paginate_rows(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.next_row = self.previous_row = None
+        if rows:
+            if has_more or self.reverse:
+                self.next_row = rows[-1]
+            if (has_more and self.reverse) or (self.values is not None and not self.reverse):
+                self.previous_row = rows[0]
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if self.next_row is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self.next_row, reverse=False)
+        )
+
+    def get_previous_link(self):
+        if self.previous_row is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(self.previous_row, reverse=True)
+        )
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = [name for name in (ordering or []) if isinstance(name, str)]
+        if not any(name.lstrip('-') in (self.tie_breaker, 'pk') for name in ordering):
+            # Same direction as the last column so one (field, id) index serves both.
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append(('-' if descending else '') + self.tie_breaker)
+        return ordering
+
+    @staticmethod
+    def seek(fields, values):
+        """Build ``(f1, f2, ...) > (v1, v2, ...)`` as plain ANDs/ORs.
+
+        The redundant ``f1 >= v1`` bound lets the planner start an index range
+        scan on the leading column.
+        """
+        condition = Q()
+        for position, (name, descending) in enumerate(fields):
+            clause = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[position]})
+            for (previous, _), value in zip(fields[:position], values[:position]):
+                clause &= Q(**{previous: value})
+            condition |= clause
+        first, descending = fields[0]
+        return Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]}) & condition
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for name, _ in self.fields:
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            values.append(value if isinstance(value, int) else str(value))
+        payload = json.dumps({'o': self.ordering, 'v': values, 'r': int(reverse)})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if payload['o'] != self.ordering or len(payload['v']) != len(self.fields):
+                raise ValueError
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, payload['v'])
+            ]
+            return values, bool(payload['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class CountedPageNumberPagination(PageNumberPagination):
+    """Page numbers, without a second COUNT(*) when the view's ListFingerprint
+    already counted the filtered rows for this request.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return paginate_page_numbers(self, queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return await apaginate_page_numbers(self, queryset, request, view)
+
+
+class ProductPagination(CountedPageNumberPagination):
+    """Page numbers by default; keyset pagination once ``?cursor=`` is passed.
+
+    Start with an empty ``?cursor=`` and follow the ``next``/``previous``
+    links from there.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+def _django_paginator(paginator, queryset, request):
+    paginator.request = request
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+    return paginator.django_paginator_class(queryset, page_size)
+
+
+def _select_page(paginator, django_paginator, request):
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        paginator.page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+
+
+def paginate_page_numbers(paginator, queryset, request, view=None):
+    """``PageNumberPagination.paginate_queryset``, taking the row count from
+    ``view``'s ListFingerprint when it has one.
+    """
+    django_paginator = _django_paginator(paginator, queryset, request)
+    if django_paginator is None:
+        return None
+    count = getattr(view, 'filtered_count', None)  # See ListFingerprint
+    if count is not None:
+        django_paginator.count = count  # Pre-fills the cached property
+    _select_page(paginator, django_paginator, request)
+    return list(paginator.page)
+
+
+async def apaginate_page_numbers(paginator, queryset, request, view=None):
+    """paginate_page_numbers with the COUNT and page queries awaited, leaving
+    ``paginator`` ready for get_paginated_response.
+    """
+    django_paginator = _django_paginator(paginator, queryset, request)
+    if django_paginator is None:
+        return None
+    count = getattr(view, 'filtered_count', None)
+    django_paginator.count = count if count is not None else await queryset.acount()
+    _select_page(paginator, django_paginator, request)
+    paginator.page.object_list = [row async for row in paginator.page.object_list]
+    return list(paginator.page)
+
+
+async def apaginate_queryset(paginator, queryset, request, view=None):
+    """Await the page of any of the paginators used by the catalog viewsets."""
+    if hasattr(paginator, 'apaginate_queryset'):
+        return await paginator.apaginate_queryset(queryset, request, view)
+    return await apaginate_page_numbers(paginator, queryset, request, view)
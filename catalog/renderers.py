@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # Optional: encode_json falls back to the standard library
+    orjson = None
+
+
+class Fragments(list):
+    """A list of already encoded JSON values (bytes).
+
+    TimedJSONRenderer writes them out as they are, either as the whole
+    payload or as a value of a top-level dict such as a paginated response.
+    """
+
+
+def encode_json(value):
+    """Encode plain JSON types exactly like DRF's compact JSONRenderer, with orjson when it's installed."""
+    if orjson is not None:
+        encoded = orjson.dumps(value)
+    else:
+        encoded = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+    # Valid JSON but not valid JavaScript, so JSONRenderer escapes them too
+    return encoded.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def has_fragments(data):
+    return isinstance(data, Fragments) or (
+        isinstance(data, dict) and any(isinstance(value, Fragments) for value in data.values())
+    )
+
+
+def render_fragments(data):
+    if isinstance(data, Fragments):
+        return b'[' + b','.join(data) + b']'
+    return b'{' + b','.join(
+        encode_json(str(key)) + b':' + (render_fragments(value) if isinstance(value, Fragments) else encode_json(value))
+        for key, value in data.items()
+    ) + b'}'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """One JSON document per line. Lists are split into one line per item."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return ''.join(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n' for item in items).encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """Lists of flat dicts as CSV with a header row; anything else as one JSON cell."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if isinstance(data, list) and data and isinstance(data[0], dict):
+            writer.writerow(data[0].keys())
+            writer.writerows(item.values() for item in data)
+        else:
+            writer.writerow([json.dumps(data, ensure_ascii=False)])
+        return buffer.getvalue().encode()
@@ -0,0 +1,124 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_KEY = 'catalog:pinned:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+current_routing = ContextVar('current_routing', default=None)
+
+
+def client_key(request):
+    """Identify the client behind ``request``: its user once authenticated, else its address.
+
+    DRF copies the user it authenticates (JWT included) onto the Django
+    request, so by the time catalog queries run this is the API user.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+
+def pin_to_primary(request):
+    """Send the client's reads to the primary until its write has reached the replicas."""
+    cache.set(PIN_KEY.format(client_key(request)), 1, timeout=settings.CATALOG_PRIMARY_PIN_SECONDS)
+
+
+def is_pinned(request):
+    return cache.get(PIN_KEY.format(client_key(request))) is not None
+
+
+class RequestRouting:
+    """Database choice for the catalog reads of one request.
+
+    Decided on the first catalog query (after DRF has authenticated the
+    client) and kept for the rest of the request, so all its reads see the
+    same replica.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.alias = None
+
+    def read_alias(self):
+        if self.alias is None:
+            replicas = settings.CATALOG_READ_REPLICAS
+            if self.request.method not in SAFE_METHODS or is_pinned(self.request):
+                self.alias = DEFAULT_DB_ALIAS
+            else:
+                self.alias = random.choices(list(replicas), weights=list(replicas.values()))[0]
+        return self.alias
+
+
+@contextmanager
+def routing(request):
+    """Route the catalog reads made while handling ``request``."""
+    token = current_routing.set(RequestRouting(request))
+    try:
+        yield
+    finally:
+        current_routing.reset(token)
+
+
+def cache_policy(ttl):
+    """Return ``(lookup, ttl)`` for shared caches filled by this request's catalog reads.
+
+    A client pinned to the primary skips cached entries, which another
+    client may have filled from a lagging replica since its write. Entries
+    filled from a replica expire after CATALOG_PRIMARY_PIN_SECONDS, so
+    replication lag isn't cached for longer than it is tolerated.
+    """
+    state = current_routing.get()
+    if state is None or not settings.CATALOG_READ_REPLICAS:
+        return True, ttl
+    if state.read_alias() == DEFAULT_DB_ALIAS:
+        return False, ttl
+    return True, min(ttl, settings.CATALOG_PRIMARY_PIN_SECONDS)
+
+
+async def acache_policy(ttl):
+    if current_routing.get() is None or not settings.CATALOG_READ_REPLICAS:
+        return True, ttl  # No thread hop without replicas
+    return await sync_to_async(cache_policy)(ttl)
+
+
+class ReplicaRouter:
+    """Send catalog reads of GET/HEAD/OPTIONS requests to a read replica.
+
+    Replicas are picked at random in proportion to their weight in
+    CATALOG_READ_REPLICAS. Everything else uses the primary: writes, reads
+    made by unsafe requests, by Celery tasks and management commands, and
+    the reads of a client that wrote less than CATALOG_PRIMARY_PIN_SECONDS
+    ago (read-your-writes despite replication lag).
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'catalog' or not settings.CATALOG_READ_REPLICAS:
+            return None
+        state = current_routing.get()
+        if state is None:
+            return None
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != 'catalog':
+            return None
+        # Not the instance's database: objects read from a replica are saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.CATALOG_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.CATALOG_READ_REPLICAS:
+            return False  # Replicas get the schema through replication
+        return None
@@ -0,0 +1,135 @@
+import logging
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections, transaction
+from django.db.models import Case, F, Index, IntegerField, Q, Value, When
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+
+# Product.search_vector is maintained by a trigger rather than by the ORM, so
+# that bulk_create, queryset.update() and COPY-based imports keep it current.
+# Migration 0003 installs it; this copy is for install_search_trigger_after_migrate.
+SEARCH_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON catalog_product
+    FOR EACH ROW EXECUTE FUNCTION catalog_product_search_vector_update();
+"""
+
+_trigram_available = {}
+
+
+class SearchIndex(GinIndex):
+    """A GIN index for product search, on PostgreSQL.
+
+    Other databases search without it (see search_products) and get a plain
+    index of the same fields instead, as does PostgreSQL when an operator
+    class comes from pg_trgm and the extension isn't installed: pg_trgm is
+    optional, searches just lose typo tolerance without it.
+    """
+    max_name_length = 63  # PostgreSQL's limit
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if not self.supported(schema_editor.connection):
+            return Index(fields=self.fields, name=self.name).create_sql(model, schema_editor, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def supported(self, connection):
+        if connection.vendor != 'postgresql':
+            return False
+        if not any(opclass.startswith('gin_trgm') for opclass in self.opclasses):
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            return cursor.fetchone() is not None
+
+
+def install_trigram_extension_before_migrate(using, **kwargs):
+    # Where pg_trgm is available, create it before the trigram index is
+    # built: migration 0003 does the same, this covers --nomigrations
+    # databases (the tests).
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm' AND installed_version IS NULL"
+        )
+        if cursor.fetchone() is not None:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    _trigram_available.pop(using, None)
+
+
+def install_search_trigger_after_migrate(using, **kwargs):
+    # Migration 0003 installs the trigger; this covers databases created
+    # with --nomigrations. It leaves an existing trigger alone, and a
+    # database migrated back past 0003 has no search_vector to maintain.
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+            "AND table_name = 'catalog_product' AND column_name = 'search_vector') AND NOT EXISTS ("
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'catalog_product_search_vector_trigger')"
+        )
+        if cursor.fetchone()[0]:
+            with transaction.atomic(using=using):
+                cursor.execute(SEARCH_TRIGGER_SQL)
+
+
+def trigram_available(connection):
+    if connection.alias not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[connection.alias] = cursor.fetchone() is not None
+    return _trigram_available[connection.alias]
+
+
+def full_text_search(connection, term):
+    """PostgreSQL only: the condition matching ``term`` through the search indexes, and its rank expression."""
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+    rank = SearchRank(F('search_vector'), query)
+    matches = Q(search_vector=query)
+    if trigram_available(connection):
+        rank = rank + TrigramSimilarity('name', term)
+        matches |= Q(name__trigram_similar=term)
+    return matches, rank
+
+
+def search_products(queryset, term):
+    """Filter ``queryset`` to products matching ``term``, annotated with ``rank``.
+
+    PostgreSQL matches the trigger-maintained ``search_vector`` (GIN index),
+    weighting name over description, and adds trigram similarity on the name
+    (GIN trigram index) so typos still match. Other databases fall back to
+    case-insensitive substring matching of every word, ranking name matches
+    above description matches.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        matches, rank = full_text_search(connection, term)
+        return queryset.annotate(rank=rank).filter(matches)
+
+    words = term.split()
+    rank = Case(When(name__istartswith=term, then=Value(len(words) * 2)), default=Value(0), output_field=IntegerField())
+    for word in words:
+        queryset = queryset.filter(Q(name__icontains=word) | Q(description__icontains=word))
+        rank = rank + Case(
+            When(name__icontains=word, then=Value(2)),
+            When(description__icontains=word, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    return queryset.annotate(rank=rank)
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Category, Product
+from .object_cache import category_cache
 
 class CategorySerializer(serializers.ModelSerializer):
     """Serializer for Category model."""
@@ -13,11 +15,29 @@ class CategorySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Category name must be at least 3 characters.")
         return value
 
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField that finds the related object through an ObjectCache."""
+
+    def __init__(self, object_cache, **kwargs):
+        self.object_cache = object_cache
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            instance = self.object_cache.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
 class ProductSerializer(serializers.ModelSerializer):
     """Serializer for Product model with nested category."""
     category = CategorySerializer(read_only=True)
-    category_id = serializers.PrimaryKeyRelatedField(
-        queryset=Category.objects.all(), source='category', write_only=True
+    category_id = CachedPrimaryKeyRelatedField(
+        category_cache, queryset=Category.objects.all(), source='category', write_only=True
     )
 
     class Meta:
@@ -33,4 +53,135 @@ class ProductSerializer(serializers.ModelSerializer):
     def validate_stock(self, value):
         if value < 0:
             raise serializers.ValidationError("Stock cannot be negative.")
-        return value
\ No newline at end of file
+        return value
+
+class ProductBatchItemSerializer(serializers.ModelSerializer):
+    """Validates one batch_create row without any database lookups.
+
+    ``category_id`` is a plain integer here; batch_create checks all of the
+    ids of a batch with a single query instead of one per row.
+    """
+    category_id = serializers.IntegerField()
+
+    class Meta:
+        model = Product
+        fields = ['name', 'description', 'price', 'stock', 'category_id']
+
+    validate_price = ProductSerializer.validate_price
+    validate_stock = ProductSerializer.validate_stock
+
+
+class ProductFeedItemSerializer(serializers.Serializer):
+    """Validates one bulk_update row without any database lookups.
+
+    A row names its product by ``id`` or ``sku`` and sets ``price`` and/or
+    ``stock``. Rows for an unknown sku create the product when they also
+    carry ``name``, ``category_id``, ``price`` and ``stock``.
+    """
+    id = serializers.IntegerField(min_value=1, required=False)
+    sku = serializers.CharField(max_length=64, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    stock = serializers.IntegerField(max_value=2147483647, required=False)
+    name = serializers.CharField(max_length=200, required=False)
+    description = serializers.CharField(allow_blank=True, required=False)
+    category_id = serializers.IntegerField(required=False)
+
+    validate_price = ProductSerializer.validate_price
+    validate_stock = ProductSerializer.validate_stock
+
+    def validate(self, attrs):
+        if ('id' in attrs) == ('sku' in attrs):
+            raise serializers.ValidationError('Give exactly one of id and sku.')
+        if 'price' not in attrs and 'stock' not in attrs:
+            raise serializers.ValidationError('Give price, stock or both.')
+        return attrs
+
+
+class StockReservationLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class StockReservationSerializer(serializers.Serializer):
+    """Request body of ProductViewSet.reserve."""
+    items = StockReservationLineSerializer(many=True, allow_empty=False)
+    all_or_nothing = serializers.BooleanField(default=False)
+
+    def validate_items(self, value):
+        if len(value) > settings.CATALOG_RESERVATION_MAX_LINES:
+            raise serializers.ValidationError(
+                f'At most {settings.CATALOG_RESERVATION_MAX_LINES} lines can be reserved at once.'
+            )
+        return value
+
+
+# Fast read path for product listings. Rows come straight from
+# ``values_list(*PRODUCT_ROW_FIELDS)`` (one query with the category joined in)
+# and are turned into the exact structure ProductSerializer produces, without
+# building serializer instances per product.
+PRODUCT_ROW_FIELDS = (
+    'id', 'name', 'description', 'price', 'stock', 'created_at',
+    'category_id', 'category__name', 'category__description', 'category__created_at',
+)
+
+_price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+_datetime_field = serializers.DateTimeField()
+
+
+def product_rows_to_data(rows):
+    """Serialize rows starting with PRODUCT_ROW_FIELDS exactly like ProductSerializer(many=True)."""
+    price = _price_field.to_representation
+    timestamp = _datetime_field.to_representation
+    categories = {}
+    data = []
+    for (pk, name, description, amount, stock, created_at,
+         category_id, category_name, category_description, category_created_at, *_) in rows:
+        category = categories.get(category_id)
+        if category is None:
+            category = categories[category_id] = {
+                'id': category_id,
+                'name': category_name,
+                'description': category_description,
+                'created_at': timestamp(category_created_at),
+            }
+        data.append({
+            'id': pk,
+            'name': name,
+            'description': description,
+            'price': price(amount),
+            'stock': stock,
+            'category': category,
+            'created_at': timestamp(created_at),
+        })
+    return data
+
+
+
+def product_from_row(row):
+    """A Product, with its category, built from a row starting with PRODUCT_ROW_FIELDS.
+
+    Made with ``from_db`` like a queried instance, so object permissions see
+    what they would on ``get_object()``; fields not in the row are deferred.
+    """
+    (pk, name, description, amount, stock, created_at,
+     category_id, category_name, category_description, category_created_at, *_) = row
+    product = Product.from_db(None, ['id', 'name', 'description', 'price', 'stock', 'created_at', 'category_id'],
+                              [pk, name, description, amount, stock, created_at, category_id])
+    product.category = Category.from_db(None, ['id', 'name', 'description', 'created_at'],
+                                        [category_id, category_name, category_description, category_created_at])
+    return product
+
+PRODUCT_CSV_HEADER = (
+    'id', 'name', 'description', 'price', 'stock', 'category_id', 'category_name', 'created_at',
+)
+
+
+def product_rows_to_csv(rows):
+    """Flatten PRODUCT_ROW_FIELDS rows into PRODUCT_CSV_HEADER columns."""
+    price = _price_field.to_representation
+    timestamp = _datetime_field.to_representation
+    return [
+        (pk, name, description, price(amount), stock, category_id, category_name, timestamp(created_at))
+        for (pk, name, description, amount, stock, created_at,
+             category_id, category_name, _category_description, _category_created_at) in rows
+    ]
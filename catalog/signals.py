@@ -0,0 +1,70 @@
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import object_cache
+from .autocomplete import product_index
+from .cache import bump_generation, generation_bumped
+from .conditional import log_deletions, record_change, record_deletion
+from .models import Category, Product
+from .tasks import flush_request_notifications, start_request_notifications
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, using=None, **kwargs):
+    bump_generation(sender, using=using)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+def remember_deletion(sender, **kwargs):
+    record_deletion(sender)
+
+
+@receiver(post_save, sender=Product)
+def index_product_name(sender, instance, using=None, **kwargs):
+    change = (instance.pk, instance.name, None)  # Popularity isn't saved with the product: keep the indexed one
+    transaction.on_commit(lambda: product_index.apply([change]), using=using)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_name(sender, instance, using=None, **kwargs):
+    pk = instance.pk  # Cleared once the delete is done
+
+    def unindex():
+        product_index.apply([(pk, None, None)])
+        log_deletions(Product, [pk])  # For the other processes' indexes
+
+    transaction.on_commit(unindex, using=using)
+
+
+@receiver(generation_bumped)
+def invalidate_object_caches(sender, **kwargs):
+    object_cache.invalidate(sender)
+
+
+@receiver(generation_bumped, sender=Product)
+def schedule_index_sync(sender, **kwargs):
+    # Local only: publishing every product write to the other workers would
+    # cost a Redis round trip per write; they catch up on their periodic sync
+    product_index.schedule_sync()
+
+
+@receiver(generation_bumped)
+def remember_change(sender, **kwargs):
+    record_change(sender)
+
+
+@receiver(request_started)
+def buffer_product_notifications(sender, **kwargs):
+    start_request_notifications()
+
+
+@receiver(request_finished)
+def flush_product_notifications(sender, **kwargs):
+    # Everything created while handling the request goes out as one message
+    flush_request_notifications()
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models import F
+
+from .cache import coalesced_generation_bumps
+from .models import Product
+
+
+def reserve_stock(lines, all_or_nothing=False):
+    """Atomically decrement stock for ``(product_id, quantity)`` lines.
+
+    Each product is decremented with a single conditional
+    ``UPDATE ... SET stock = stock - qty WHERE id = ... AND stock >= qty``, so
+    concurrent reservations can never oversell or lose updates. Rows are
+    updated in ascending id order, which gives every transaction the same lock
+    order and rules out deadlocks between multi-line reservations. Repeated
+    product ids are merged into one line.
+
+    With ``all_or_nothing`` a single failed line rolls back the others.
+    Returns one result dict per distinct product, in request order.
+    """
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    reserved = {}
+    with coalesced_generation_bumps(), transaction.atomic():
+        for product_id in sorted(quantities):
+            reserved[product_id] = bool(
+                Product.objects.filter(pk=product_id, stock__gte=quantities[product_id])
+                .update(stock=F('stock') - quantities[product_id])
+            )
+        if all_or_nothing and not all(reserved.values()):
+            transaction.set_rollback(True)
+
+    failed = [product_id for product_id, ok in reserved.items() if not ok]
+    available = dict(Product.objects.filter(pk__in=failed).values_list('pk', 'stock')) if failed else {}
+    rolled_back = all_or_nothing and bool(failed)
+    results = []
+    for product_id, quantity in quantities.items():
+        result = {'product_id': product_id, 'quantity': quantity, 'reserved': reserved[product_id] and not rolled_back}
+        if not reserved[product_id]:
+            if product_id in available:
+                result.update(error='Insufficient stock.', available=available[product_id])
+            else:
+                result['error'] = 'Product not found.'
+        elif rolled_back:
+            result['error'] = 'Rolled back because another line failed.'
+        results.append(result)
+    return results
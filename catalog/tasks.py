@@ -1,10 +1,16 @@
+import atexit
 import logging  # NEW: For terminal logging
+import threading
+from contextvars import ContextVar
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
 from .models import Product
 
 logger = logging.getLogger(__name__)  # NEW: Logger for Celery worker terminal
 
-@shared_task
+# Notifications are fire-and-forget, so nothing is written to the result backend.
+@shared_task(ignore_result=True)
 def send_product_creation_notification(product_id):
     """Task to notify on product creation - logs to terminal instead of email."""
     try:
@@ -15,4 +21,96 @@ def send_product_creation_notification(product_id):
         # For demo, log a follow-up message
         logger.info(f'Notification processed for product ID: {product_id}.')
     except Product.DoesNotExist:
-        logger.error(f'Product ID {product_id} not found - notification failed.')
\ No newline at end of file
+        logger.error(f'Product ID {product_id} not found - notification failed.')
+
+@shared_task(ignore_result=True)
+def send_product_batch_notification(product_ids):
+    """Notify on a batch of created products, loading them with one query."""
+    products = Product.objects.filter(id__in=product_ids).only('id', 'name', 'price', 'stock')
+    found = set()
+    for product in products:
+        logger.info(f'New Product Created: {product.name} with price ${product.price} and stock {product.stock}.')
+        found.add(product.id)
+    for product_id in product_ids:
+        if product_id not in found:
+            logger.error(f'Product ID {product_id} not found - notification failed.')
+    logger.info(f'Notification processed for {len(found)} products.')
+
+
+def send_notifications(product_ids):
+    """Send ``product_ids`` as batch messages of at most CATALOG_NOTIFICATION_BATCH_SIZE ids."""
+    batch_size = settings.CATALOG_NOTIFICATION_BATCH_SIZE
+    for start in range(0, len(product_ids), batch_size):
+        send_product_batch_notification.delay(product_ids[start:start + batch_size])
+
+
+class NotificationBuffer:
+    """Producer-side buffer that coalesces product ids queued outside a request.
+
+    Ids queued from the shell, a management command or a task are sent
+    CATALOG_NOTIFICATION_FLUSH_INTERVAL seconds after the first one arrived;
+    a full batch is sent straight away. Requests buffer their own ids (see
+    request_notifications), so one finishing never flushes another's.
+    """
+
+    def __init__(self):
+        self._ids = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, product_ids):
+        interval = settings.CATALOG_NOTIFICATION_FLUSH_INTERVAL
+        with self._lock:
+            self._ids.extend(product_ids)
+            flush_now = len(self._ids) >= settings.CATALOG_NOTIFICATION_BATCH_SIZE or interval <= 0
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            product_ids, self._ids = self._ids, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        send_notifications(product_ids)
+
+
+notification_buffer = NotificationBuffer()
+atexit.register(notification_buffer.flush)
+
+# Ids queued while the current request is handled, sent together when it
+# finishes (see signals.py); None outside requests. A context variable, so
+# concurrent requests, in threads or on an event loop, keep separate lists.
+request_notifications = ContextVar('request_notifications', default=None)
+
+
+def start_request_notifications():
+    request_notifications.set([])
+
+
+def flush_request_notifications():
+    product_ids = request_notifications.get()
+    request_notifications.set(None)
+    if product_ids:
+        send_notifications(product_ids)
+
+
+def _buffer_notifications(product_ids):
+    pending = request_notifications.get()
+    if pending is None:
+        notification_buffer.add(product_ids)
+        return
+    pending.extend(product_ids)
+    if len(pending) >= settings.CATALOG_NOTIFICATION_BATCH_SIZE:
+        send_notifications(pending[:])
+        pending.clear()
+
+
+def queue_product_notifications(product_ids):
+    """Queue creation notifications for ``product_ids`` once the current transaction commits."""
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: _buffer_notifications(product_ids))
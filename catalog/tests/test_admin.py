@@ -0,0 +1,113 @@
+from unittest import skipUnless
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from ..admin import EstimatedCountPaginator
+from ..models import Category, Product
+
+CHANGELIST = '/admin/catalog/product/'
+
+
+def count_queries(queries):
+    return [query['sql'] for query in queries if 'COUNT(' in query['sql'].upper()]
+
+
+class ProductAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser(username='admin', password='secret'))
+        self.categories = [Category.objects.create(name=f'Category {index}') for index in range(5)]
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Widget {index}', sku=f'SKU-{index}', price=10 + index, stock=index % 3,
+                    category=self.categories[index % 5])
+            for index in range(30)
+        ])
+
+    def changelist(self, query=''):
+        response = self.client.get(CHANGELIST + query)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_changelist_queries_do_not_grow_with_the_page(self):
+        self.changelist()
+        with CaptureQueriesContext(connection) as full_page:
+            self.changelist()
+        Product.objects.filter(pk__in=[product.pk for product in self.products[:25]]).delete()
+        with CaptureQueriesContext(connection) as short_page:
+            self.changelist()
+        self.assertEqual(len(full_page), len(short_page))
+        self.assertFalse([query for query in full_page if 'FROM "catalog_category" WHERE' in query['sql']])
+
+    def test_no_full_result_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.changelist('?in_stock=1')
+        self.assertEqual(len(count_queries(queries)), 1)  # The filtered result only
+
+    def test_filters_and_search(self):
+        response = self.changelist('?in_stock=0')
+        self.assertEqual(response.context['cl'].result_count, 10)
+        response = self.changelist(f'?category__id__exact={self.categories[0].pk}&in_stock=1')
+        self.assertEqual(response.context['cl'].result_count, 4)
+        response = self.changelist('?q=SKU-7')
+        self.assertEqual([product.sku for product in response.context['cl'].result_list], ['SKU-7'])
+        response = self.changelist('?q=widget')
+        self.assertEqual(response.context['cl'].result_count, 30)
+
+    def test_set_price_and_stock(self):
+        selected = [product.pk for product in self.products[:3]]
+        data = {'action': 'set_price_and_stock', 'index': 0, ACTION_CHECKBOX_NAME: selected}
+        response = self.client.post(CHANGELIST, data)
+        self.assertContains(response, 'The 3 selected products will be updated')
+
+        response = self.client.post(CHANGELIST, {**data, 'apply': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Enter a price, a stock level, or both.')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(CHANGELIST, {**data, 'apply': '1', 'price': '5.00', 'stock': ''})
+        self.assertEqual(response.status_code, 302)
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "catalog_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(sorted(Product.objects.filter(price=5).values_list('pk', flat=True)), sorted(selected))
+        self.assertEqual(Product.objects.get(pk=selected[0]).stock, self.products[0].stock)
+
+    def test_set_stock_across_every_match(self):
+        response = self.client.post(CHANGELIST + '?in_stock=0', {
+            'action': 'set_price_and_stock', 'index': 0, 'select_across': '1',
+            ACTION_CHECKBOX_NAME: [self.products[0].pk], 'apply': '1', 'stock': '50',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Product.objects.filter(stock=0).count(), 0)
+        self.assertEqual(Product.objects.filter(stock=50).count(), 10)
+
+    def test_change_form(self):
+        product = self.products[0]
+        response = self.client.get(f'{CHANGELIST}{product.pk}/change/')
+        self.assertContains(response, 'Category 4')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row estimates come from the PostgreSQL planner')
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Electronics')
+        Product.objects.bulk_create([
+            Product(name=f'Widget {index}', price=index, stock=index % 2, category=category) for index in range(200)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE catalog_product')
+
+    @override_settings(CATALOG_ADMIN_COUNT_THRESHOLD=100)
+    def test_large_results_are_estimated(self):
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(Product.objects.order_by('-pk'), 50).count
+        self.assertEqual(count, 200)  # Exact for a freshly analyzed table
+        self.assertEqual(count_queries(queries), [])
+
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(Product.objects.filter(price__lt=10).order_by('-pk'), 50).count
+        self.assertEqual(count, 10)
+        self.assertEqual(len(count_queries(queries)), 1)
@@ -0,0 +1,123 @@
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from ..models import Category, Product
+from .test_fast_read import InStockOnly
+from ..views import CategoryViewSet, ProductViewSet
+
+
+@override_settings(ROOT_URLCONF='ecommerce.asgi_urls')
+class AsyncReadPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.electronics = Category.objects.create(name='Electronics')
+        cls.books = Category.objects.create(name='Books')
+        for index in range(15):
+            Product.objects.create(
+                name=f'Laptop {index:02}', description='Portable computer', price=100 + index * 7 % 11,
+                stock=index, category=cls.books if index % 3 else cls.electronics,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def sync_get(self, url):
+        cache.clear()  # Don't let either path answer from the other's cached response
+        with override_settings(ROOT_URLCONF='ecommerce.urls'):
+            return self.client.get(url)
+
+    async def async_get(self, url):
+        await cache.aclear()
+        sync_actions = [
+            mock.patch.object(viewset, action, side_effect=AssertionError('served by the sync action'))
+            for viewset in (CategoryViewSet, ProductViewSet) for action in ('list', 'retrieve')
+        ]
+        for patcher in sync_actions:
+            patcher.start()
+        try:
+            return await self.async_client.get(url)
+        finally:
+            for patcher in sync_actions:
+                patcher.stop()
+
+    async def test_matches_sync_responses(self):
+        product = await Product.objects.afirst()
+        urls = [
+            '/api/products/', '/api/products/?page=2', '/api/products/?ordering=-price',
+            f'/api/products/?category={self.books.id}', '/api/products/?search=laptop',
+            '/api/products/?cursor=&ordering=price', f'/api/products/{product.id}/',
+            '/api/products/999999/', '/api/products/?page=9',
+            '/api/categories/', '/api/categories/?ordering=-name', f'/api/categories/{self.books.id}/',
+        ]
+        for url in urls:
+            expected = await sync_to_async(self.sync_get)(url)
+            response = await self.async_get(url)
+            with self.subTest(url=url):
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    async def test_follows_keyset_links(self):
+        first = (await self.async_get('/api/products/?cursor=&ordering=price')).json()
+        second = (await self.async_get(first['next'].replace('http://testserver', ''))).json()
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 15)
+
+    async def test_cache_and_conditional_get(self):
+        finalize = mock.patch.object(ProductViewSet, 'finalize_response', autospec=True,
+                                     side_effect=ProductViewSet.finalize_response)
+        with finalize as finalized:
+            first = await self.async_client.get('/api/products/')
+        self.assertEqual(finalized.call_count, 1)
+        second = await self.async_client.get('/api/products/')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertIn('db;dur=', second['Server-Timing'])
+        response = await self.async_client.get('/api/products/', headers={'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_retrieve_checks_object_permissions(self):
+        sold_out = await Product.objects.filter(stock=0).afirst()
+        with mock.patch.object(ProductViewSet, 'permission_classes', [InStockOnly]):
+            response = await self.async_get(f'/api/products/{sold_out.id}/')
+        self.assertEqual(response.status_code, 401)  # Denied, anonymously
+
+    async def test_exports_stream_from_an_async_iterator(self):
+        user = await User.objects.acreate_user(username='exporter', password='pass')
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        for query, lines in (('', 15), ('?format=csv', 16)):
+            expected = await sync_to_async(self.sync_export)(query, headers)
+            with mock.patch.object(ProductViewSet, 'export', side_effect=AssertionError('served by the sync action')):
+                response = await self.async_client.get(f'/api/products/export/{query}', headers=headers)
+            with self.subTest(query=query):
+                self.assertTrue(response.is_async)
+                body = b''.join([chunk async for chunk in response.streaming_content])
+                self.assertEqual(body, expected)
+                self.assertEqual(len(body.splitlines()), lines)
+
+    def sync_export(self, query, headers):
+        with override_settings(ROOT_URLCONF='ecommerce.urls'):
+            response = self.client.get(f'/api/products/export/{query}', headers=headers)
+        return b''.join(response.streaming_content)
+
+    async def test_writes_fall_back_to_drf(self):
+        user = await User.objects.acreate_user(username='writer', password='pass')
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        payload = {'name': 'Tablet', 'price': '299.99', 'stock': 3, 'category_id': self.books.id}
+        response = await self.async_client.post('/api/products/', payload, content_type='application/json',
+                                                headers=headers)
+        self.assertEqual(response.status_code, 201)
+        response = await self.async_client.get('/api/products/', {'name': 'Tablet'})
+        self.assertEqual(response.json()['count'], 1)
+        response = await self.async_client.post('/api/products/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+
+class AsgiSettingsTests(SimpleTestCase):
+    def test_only_the_asgi_entry_point_routes_to_async_views(self):
+        from ecommerce import settings as wsgi_settings, settings_asgi
+
+        self.assertEqual(settings_asgi.ROOT_URLCONF, 'ecommerce.asgi_urls')
+        self.assertEqual(wsgi_settings.ROOT_URLCONF, 'ecommerce.urls')
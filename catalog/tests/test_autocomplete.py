@@ -0,0 +1,196 @@
+import random
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from .. import autocomplete
+from ..autocomplete import (
+    ENTRY_BITS, ProductNameIndex, index_entries, index_keys, normalize, product_index, record_reservations,
+)
+from ..conditional import DELETED_IDS_KEY, DELETION_LOG_KEY, log_deletions
+from ..models import Category, Product, ProductPopularity
+from ..object_cache import invalidations
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize('  Crème  Brûlée, Größe XL!'), 'creme brulee grosse xl')
+        self.assertEqual(normalize('Wi-Fi Router'), 'wi fi router')
+        self.assertEqual(index_keys('USB-C Cable'), {'usb c cable', 'c cable', 'cable'})
+        self.assertEqual(index_keys('!!!'), set())
+        self.assertEqual(index_entries(3, 'USB-C Cable'), {'usb c cable': 3 << ENTRY_BITS, 'c cable': (3 << ENTRY_BITS) + 4,
+                                                           'cable': (3 << ENTRY_BITS) + 6})
+
+
+@patch.object(autocomplete, 'SCAN_LIMIT', 20)
+class ProductNameIndexTests(SimpleTestCase):
+    words = ['red', 'read', 'ready', 'blue', 'black', 'box', 'bolt', 're']
+
+    def random_name(self, rng):
+        return ' '.join(rng.choice(self.words) for _ in range(rng.randint(1, 3)))
+
+    def filled(self, products):
+        index = ProductNameIndex()
+        index._fill((pk, name, popularity) for pk, (name, popularity) in products.items())
+        index.loaded = True
+        return index
+
+    def expected(self, products, prefix, limit):
+        matches = [pk for pk, (name, _) in products.items() if any(key.startswith(prefix) for key in index_keys(name))]
+        matches.sort(key=lambda pk: (-products[pk][1], len(products[pk][0]), pk))
+        return [(pk, products[pk][0]) for pk in matches[:limit]]
+
+    def assertConsistent(self, index, products):
+        for text in ['r', 're', 'rea', 'b', 'bl', 'bo', 'box', 'red b', 'x', 'Ready']:
+            self.assertEqual(index.complete(text, 20), self.expected(products, normalize(text), 20), text)
+        fresh = self.filled(products)
+        entries = self.contents(index)
+        self.assertEqual(entries, sorted(entries, key=lambda entry: entry[0]))
+        self.assertEqual(sorted(entries), sorted(self.contents(fresh)))
+        self.assertEqual(list(index.ids), list(fresh.ids))
+        self.assertEqual({index.product(pk) for pk in products}, set(products.values()))
+        for prefix, top in index.top.items():
+            self.assertEqual([(index.slot_ids[slot], index.names[slot]) for slot in top],
+                             self.expected(products, prefix, 20), prefix)
+
+    def contents(self, index):
+        return [(index.key(entry), index.slot_ids[entry >> ENTRY_BITS]) for entry in index.entries]
+
+    def test_ranking(self):
+        index = self.filled({1: ('Ready Box', 0), 2: ('Red', 0), 3: ('Blue Red Bolt', 5), 4: ('Black', 0)})
+        self.assertEqual(index.complete('re', 10), [(3, 'Blue Red Bolt'), (2, 'Red'), (1, 'Ready Box')])
+        self.assertEqual(index.complete('RE', 1), [(3, 'Blue Red Bolt')])
+        self.assertEqual(index.complete('red bo', 10), [(3, 'Blue Red Bolt')])
+        self.assertEqual(index.complete('green', 10), [])
+        self.assertEqual(index.complete(' ', 10), [])
+
+    def test_incremental_changes_match_a_rebuild(self):
+        rng = random.Random(7)
+        products = {pk: (self.random_name(rng), rng.randint(0, 5)) for pk in range(1, 300)}
+        index = self.filled(products)
+        self.assertGreater(len(index.top), 5)  # Enough heavy prefixes to exercise the top lists
+        for _ in range(30):
+            changes = []
+            for _ in range(rng.randint(1, 10)):
+                pk = rng.randint(1, 330)
+                roll = rng.random()
+                if roll < 0.2:
+                    changes.append((pk, None, None))
+                    products.pop(pk, None)
+                else:
+                    name = self.random_name(rng) if roll < 0.5 or pk not in products else products[pk][0]
+                    products[pk] = (name, rng.randint(0, 8))
+                    changes.append((pk, *products[pk]))
+            index.apply(changes)
+            self.assertConsistent(index, products)
+
+    def test_popularity_can_be_kept(self):
+        index = self.filled({1: ('Red', 4), 2: ('Read', 2)})
+        index.apply([(1, 'Red Box', None), (3, 'Ready', None)])
+        self.assertEqual((index.product(1), index.product(3)), (('Red Box', 4), ('Ready', 0)))
+
+    def test_many_equal_names(self):
+        products = {pk: ('Box', pk % 3) for pk in range(1, 60)}
+        products.update({pk: (f'Box {pk}', 0) for pk in range(60, 70)})
+        index = self.filled(products)
+        self.assertIn('box', index.top)
+        self.assertConsistent(index, products)
+
+    def test_large_changes_rebuild(self):
+        products = {pk: (f'Box {pk}', 0) for pk in range(1, 50)}
+        index = self.filled(products)
+        with patch.object(autocomplete, 'REBUILD_THRESHOLD', 10):
+            index.apply([(pk, f'Bolt {pk}', pk) for pk in range(1, 40)])
+        products.update({pk: (f'Bolt {pk}', pk) for pk in range(1, 40)})
+        self.assertConsistent(index, products)
+
+    def test_stats(self):
+        stats = self.filled({1: ('Red Box', 0), 2: ('Blue', 0)}).stats()
+        self.assertEqual((stats['products'], stats['entries']), (2, 3))
+        self.assertGreater(stats['bytes'], 0)
+
+
+class AutocompleteEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.laptop = Product.objects.create(name='Laptop Pro', price=999, stock=10, category=self.category)
+        self.lamp = Product.objects.create(name='Desk Lamp', price=20, stock=10, category=self.category)
+        Product.objects.create(name='Phone', price=499, stock=10, category=self.category)
+        self.addCleanup(setattr, product_index, 'loaded', False)
+        product_index.loaded = False
+
+    def complete(self, query, **params):
+        response = self.client.get('/api/products/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['name'] for result in response.json()['results']]
+
+    def test_completions_come_from_memory(self):
+        self.assertEqual(self.complete('la'), ['Desk Lamp', 'Laptop Pro'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('pro'), ['Laptop Pro'])
+            self.assertEqual(self.complete('la', limit=1), ['Desk Lamp'])
+            self.assertEqual(self.complete(''), [])
+
+    def test_invalid_limit(self):
+        for limit in ('0', '21', 'ten'):
+            response = self.client.get('/api/products/autocomplete/', {'q': 'la', 'limit': limit})
+            self.assertEqual(response.status_code, 400)
+
+    def test_saves_and_deletes_apply_on_commit(self):
+        self.complete('la')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.laptop.name = 'Notebook Pro'
+            self.laptop.save()
+            Product.objects.create(name='Lava Lamp', price=30, stock=1, category=self.category)
+        self.assertEqual(self.complete('la'), ['Desk Lamp', 'Lava Lamp'])  # Same length: by id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.delete()
+        self.assertEqual(self.complete('lamp'), ['Lava Lamp'])
+
+    def test_sync_catches_up_with_bulk_writes(self):
+        self.complete('la')
+        Product.objects.filter(pk=self.laptop.pk).update(name='Notebook Pro')  # No signals
+        record_reservations({self.lamp.pk: 3})  # Sales rank products
+        Product.objects.create(name='Lantern', price=15, stock=5, category=self.category)  # Commit not captured
+        self.assertEqual(self.complete('la'), ['Desk Lamp', 'Laptop Pro'])
+        product_index.sync()
+        self.assertEqual(self.complete('la'), ['Desk Lamp', 'Lantern'])
+
+        ProductPopularity.objects.filter(pk=self.lamp.pk).delete()
+        Product.objects.filter(pk=self.lamp.pk)._raw_delete(Product.objects.db)
+        log_deletions(Product, [self.lamp.pk])
+        with self.assertNumQueries(2):  # The updated and the ranked rows; deletions come from the log
+            product_index.sync()
+        self.assertEqual(self.complete('la'), ['Lantern'])
+
+    def test_sync_rescans_when_the_deletion_log_is_incomplete(self):
+        self.complete('la')
+        Product.objects.filter(pk=self.lamp.pk)._raw_delete(Product.objects.db)
+        log_deletions(Product, [self.lamp.pk])
+        label = Product._meta.label_lower
+        cache.delete(DELETED_IDS_KEY.format(label, cache.get(DELETION_LOG_KEY.format(label))))  # Evicted
+        with self.assertNumQueries(3):  # And the ids of every product
+            product_index.sync()
+        self.assertEqual(self.complete('la'), ['Laptop Pro'])
+
+    def test_deletes_are_logged_for_other_processes(self):
+        self.complete('la')
+        other = ProductNameIndex()
+        other.load()
+        lamp_pk = self.lamp.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.delete()
+        self.assertEqual(other.complete('lamp', 10), [(lamp_pk, 'Desk Lamp')])
+        with self.assertNumQueries(2):
+            other.sync()
+        self.assertEqual(other.complete('lamp', 10), [])
+
+    def test_invalidations_schedule_a_sync(self):
+        product_index._dirty.clear()
+        with patch.object(invalidations, 'publish') as publish:
+            Product.objects.filter(pk=self.lamp.pk).update(stock=3)
+        self.assertTrue(product_index._dirty.is_set())
+        publish.assert_not_called()  # Other processes catch up on their periodic sync
@@ -0,0 +1,169 @@
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test.utils import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from ..models import Category, Product
+
+
+class BatchCreateTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Electronics')
+        self.other = Category.objects.create(name='Books')
+
+    def items(self, count):
+        return [
+            {'name': f'Item {i}', 'price': '9.99', 'stock': i,
+             'category_id': (self.category if i % 2 else self.other).id}
+            for i in range(count)
+        ]
+
+    def test_query_count_is_independent_of_batch_size(self):
+        # Category IN lookup + one INSERT (plus the transaction's savepoint queries)
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/products/batch_create/', self.items(100), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 100)
+        self.assertEqual(Product.objects.count(), 100)
+
+    def test_invalid_rows_are_reported_per_index(self):
+        items = self.items(3) + [
+            {'name': 'Free', 'price': '0', 'stock': 1, 'category_id': self.category.id},
+            {'name': 'Orphan', 'price': '1.00', 'stock': 1, 'category_id': 999999},
+        ]
+        response = self.client.post('/api/products/batch_create/', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([error['index'] for error in response.data['errors']], [3, 4])
+        self.assertIn('price', response.data['errors'][0]['errors'])
+        self.assertIn('category_id', response.data['errors'][1]['errors'])
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_created_payload_matches_list_format(self):
+        response = self.client.post('/api/products/batch_create/', self.items(1), format='json')
+        created = response.data['created'][0]
+        listed = self.client.get(f"/api/products/{created['id']}/").data
+        self.assertEqual(created, listed)
+
+    def test_all_invalid_returns_400(self):
+        response = self.client.post('/api/products/batch_create/', [{'name': 'x'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'][0]['index'], 0)
+
+    @override_settings(CATALOG_BATCH_MAX_SIZE=5)
+    def test_max_batch_size(self):
+        response = self.client.post('/api/products/batch_create/', self.items(6), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Product.objects.count(), 0)
+
+    @override_settings(CATALOG_NOTIFICATION_BATCH_SIZE=50)
+    def test_notifications_are_chunked(self):
+        with mock.patch('catalog.tasks.send_product_batch_notification.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/products/batch_create/', self.items(120), format='json')
+        self.assertEqual([len(call.args[0]) for call in delay.call_args_list], [50, 50, 20])
+
+
+class BulkUpdateTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='testpass'))
+        self.category = Category.objects.create(name='Electronics')
+        Product.objects.bulk_create([
+            Product(sku=f'SKU-{i}', name=f'Item {i}', price='10.00', stock=5, category=self.category)
+            for i in range(100)
+        ])
+        self.products = list(Product.objects.order_by('id'))
+
+    def post(self, rows):
+        return self.client.post('/api/products/bulk_update/', rows, format='json')
+
+    def test_query_count_is_independent_of_feed_size(self):
+        rows = [{'sku': product.sku, 'price': '12.50', 'stock': 7} for product in self.products]
+        # Lookup, locking SELECT, one UPDATE (plus the savepoint queries)
+        with self.assertNumQueries(5):
+            response = self.post(rows)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({result['status'] for result in response.data['results']}, {'updated'})
+        self.assertEqual(set(Product.objects.values_list('price', 'stock')), {(Decimal('12.50'), 7)})
+
+    def test_partial_updates_leave_other_fields_alone(self):
+        first, second = self.products[:2]
+        Product.objects.filter(pk=first.pk).update(stock=3)  # E.g. a reservation since the feed was built
+        response = self.post([{'id': first.pk, 'price': '99.00'}, {'sku': second.sku, 'stock': 0}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Product.objects.values_list('price', 'stock').get(pk=first.pk), (Decimal('99.00'), 3))
+        self.assertEqual(Product.objects.values_list('price', 'stock').get(pk=second.pk), (Decimal('10.00'), 0))
+
+    def test_unchanged_rows_are_not_written(self):
+        product = self.products[0]
+        response = self.post([{'id': product.pk, 'price': '10', 'stock': 5}])
+        self.assertEqual(response.data['results'], [{'index': 0, 'id': product.pk, 'status': 'unchanged'}])
+        self.assertEqual(Product.objects.get(pk=product.pk).updated_at, product.updated_at)
+
+    def test_rows_for_the_same_product_merge(self):
+        product = self.products[0]
+        response = self.post([
+            {'id': product.pk, 'price': '20.00'}, {'sku': product.sku, 'stock': 1}, {'id': product.pk, 'price': '30.00'},
+        ])
+        self.assertEqual([result['status'] for result in response.data['results']], ['updated'] * 3)
+        self.assertEqual(Product.objects.values_list('price', 'stock').get(pk=product.pk), (Decimal('30.00'), 1))
+
+    def test_unknown_skus_with_every_field_are_created(self):
+        response = self.post([
+            {'sku': 'NEW-1', 'name': 'New', 'price': '5.00', 'stock': 2, 'category_id': self.category.pk},
+            {'sku': 'NEW-2', 'price': '5.00'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        created, missing = response.data['results']
+        self.assertEqual(created['status'], 'created')
+        self.assertEqual(Product.objects.get(sku='NEW-1').pk, created['id'])
+        self.assertIn('sku', missing['errors'])
+        self.assertFalse(Product.objects.filter(sku='NEW-2').exists())
+
+    def test_invalid_rows_are_reported_per_index(self):
+        product = self.products[0]
+        response = self.post([
+            {'id': product.pk, 'price': '0'},
+            {'id': product.pk, 'stock': -1},
+            {'id': 999999, 'stock': 1},
+            {'id': product.pk, 'sku': product.sku, 'stock': 1},
+            {'sku': product.sku},
+            {'sku': 'NEW', 'name': 'New', 'price': '1.00', 'stock': 1, 'category_id': 999999},
+            {'sku': product.sku, 'stock': 8},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        results = response.data['results']
+        self.assertEqual([result['index'] for result in results], list(range(7)))
+        self.assertEqual([result['status'] for result in results], ['error'] * 6 + ['updated'])
+        self.assertIn('price', results[0]['errors'])
+        self.assertIn('stock', results[1]['errors'])
+        self.assertIn('id', results[2]['errors'])
+        self.assertIn('category_id', results[5]['errors'])
+        self.assertEqual(Product.objects.values_list('price', 'stock').get(pk=product.pk), (Decimal('10.00'), 8))
+
+    def test_all_invalid_returns_400(self):
+        response = self.post([{'id': 999999, 'stock': 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post({'id': 1}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CATALOG_FEED_MAX_SIZE=5)
+    def test_max_feed_size(self):
+        response = self.post([{'id': product.pk, 'stock': 0} for product in self.products[:6]])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Product.objects.filter(stock=0).exists())
+
+    def test_cached_listing_is_refreshed(self):
+        self.client.get('/api/products/?ordering=id')
+        self.post([{'id': self.products[0].pk, 'stock': 42}])
+        self.assertEqual(self.client.get('/api/products/?ordering=id').json()['results'][0]['stock'], 42)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.post([]).status_code, status.HTTP_401_UNAUTHORIZED)
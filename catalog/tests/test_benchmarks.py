@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from ..management.commands.benchmark_api import backend_meta, backend_mismatch, compare_results
+
+BASELINE = Path(__file__).resolve().parents[2] / 'benchmarks' / 'baseline.json'
+
+
+class CompareResultsTests(TestCase):
+    def test_flags_only_regressions_beyond_threshold(self):
+        baseline = {'results': {'1000': {'list': {'p50_ms': 10.0, 'queries': 2}, 'retrieve': {'p50_ms': 1.0}}}}
+        results = {'results': {
+            '1000': {'list': {'p50_ms': 11.5, 'queries': 3}, 'retrieve': {'p50_ms': 0.5}},
+            '100000': {'list': {'p50_ms': 99.0}},  # Not in the baseline
+        }}
+        self.assertEqual(compare_results(results, baseline, threshold=20), ['1000 products, list: queries 3 > 2 (+20% allowed)'])
+        self.assertEqual(compare_results(results, baseline, threshold=50), [])
+
+
+    def test_backend_mismatch(self):
+        meta = {'database': 'sqlite', 'cache': 'django.core.cache.backends.locmem.LocMemCache'}
+        self.assertIsNone(backend_mismatch(meta, {'meta': dict(meta, python='3.12')}))
+        self.assertIsNone(backend_mismatch(meta, {}))
+        self.assertEqual(backend_mismatch(meta, {'meta': dict(meta, database='postgresql')}),
+                         'database sqlite (baseline: postgresql)')
+
+
+class BenchmarkCommandTests(TestCase):
+    def run_benchmark(self, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('benchmark_api', '--sizes', '30', '--categories', '3', '--iterations', '2',
+                         '--output', output, *args, stdout=open(os.devnull, 'w'))
+            with open(output) as handle:
+                return json.load(handle)
+
+    def test_writes_every_scenario(self):
+        results = self.run_benchmark()['results']['30']
+        self.assertIn('list_ordering_price', results)
+        self.assertEqual(results['list_cached']['queries'], 0)
+        self.assertEqual(results['notification_task']['queries'], 1)
+        self.assertTrue(all(row['p99_ms'] >= row['p50_ms'] > 0 for row in results.values()))
+
+    def test_fails_against_a_faster_baseline(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump({'results': {'30': {'notification_task': {'queries': 0}}}}, handle)
+        self.addCleanup(os.remove, handle.name)
+        with self.assertRaisesMessage(CommandError, 'notification_task: queries 1 > 0'):
+            self.run_benchmark('--baseline', handle.name)
+
+    def test_refuses_a_baseline_from_other_backends(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump({'meta': {**backend_meta(), 'database': 'oracle'}, 'results': {}}, handle)
+        self.addCleanup(os.remove, handle.name)
+        with self.assertRaisesMessage(CommandError, 'recorded on other backends: database'):
+            self.run_benchmark('--baseline', handle.name)
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_api_performance_against_baseline():
+    """Run with ``pytest -m benchmark``; BENCHMARK_SIZES and BENCHMARK_THRESHOLD tune it."""
+    if not BASELINE.exists():
+        pytest.skip(f'No baseline at {BASELINE}')
+    mismatch = backend_mismatch(backend_meta(), json.loads(BASELINE.read_text()))
+    if mismatch:
+        pytest.skip(f'The baseline was recorded on other backends: {mismatch}')
+    call_command(
+        'benchmark_api', '--sizes', os.environ.get('BENCHMARK_SIZES', '1000'),
+        '--baseline', str(BASELINE), '--threshold', os.environ.get('BENCHMARK_THRESHOLD', '20'),
+    )
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test.utils import override_settings
+from rest_framework.test import APIClient, APITestCase
+from ..cache import response_cache_stats
+from ..models import Category, Product
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # Throttle history and cached responses from other tests
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(
+            name='Laptop', price=999.99, stock=10, category=self.category
+        )
+
+    def test_second_request_is_served_from_cache(self):
+        before = response_cache_stats('products')
+        first = self.client.get('/api/products/')
+        second = self.client.get('/api/products/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        after = response_cache_stats('products')
+        self.assertEqual(after['hit'] - before['hit'], 1)
+        self.assertEqual(after['miss'] - before['miss'], 1)
+
+    def test_create_invalidates_list(self):
+        self.client.get('/api/products/')
+        Product.objects.create(name='Phone', price=499.99, stock=20, category=self.category)
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_bulk_operations_invalidate_list(self):
+        self.client.get('/api/products/')
+        Product.objects.bulk_create([
+            Product(name='Phone', price=499.99, stock=20, category=self.category),
+        ])
+        self.assertEqual(len(self.client.get('/api/products/').json()['results']), 2)
+        Product.objects.filter(name='Phone').update(stock=0)
+        response = self.client.get('/api/products/?name=Phone')
+        self.assertEqual(response.json()['results'][0]['stock'], 0)
+
+    def test_category_change_invalidates_product_list(self):
+        self.client.get('/api/products/')
+        self.category.name = 'Computers'
+        self.category.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.json()['results'][0]['category']['name'], 'Computers')
+
+    @override_settings(CATALOG_CACHE_MAX_VARIANTS=1)
+    def test_variant_cap(self):
+        self.client.get('/api/products/?ordering=price')
+        response = self.client.get('/api/products/?ordering=-price')
+        self.assertEqual(response['X-Cache'], 'SKIP')
+        self.assertEqual(len(response.json()['results']), 1)
@@ -0,0 +1,80 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+from ..models import Category, Product
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.laptop = Product.objects.create(name='Laptop', price=999.99, stock=10, category=self.category)
+        self.phone = Product.objects.create(name='Phone', price=499.99, stock=5, category=self.category)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        first = self.client.get('/api/products/')
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.revalidate('/api/products/', first)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(len(queries), 0)
+
+    def test_if_modified_since(self):
+        first = self.client.get('/api/categories/')
+        second = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, 304)
+
+    def test_rows_leaving_a_filter_move_last_modified(self):
+        url = f'/api/products/?category={self.category.id}'
+        first = self.client.get(url)
+        books = Category.objects.create(name='Books')
+        with mock.patch('catalog.conditional.time.time', return_value=time.time() + 5):
+            Product.objects.filter(pk=self.phone.pk).update(category=books)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_writes_change_the_etag(self):
+        first = self.client.get('/api/products/')
+        Product.objects.filter(pk=self.phone.pk).update(stock=4)  # Bulk path, no auto_now
+        self.assertEqual(self.revalidate('/api/products/', first).status_code, 200)
+
+        first = self.client.get('/api/products/')
+        self.category.description = 'Gadgets'
+        self.category.save()  # Embedded in every product
+        self.assertEqual(self.revalidate('/api/products/', first).status_code, 200)
+
+        first = self.client.get('/api/products/')
+        self.phone.delete()
+        response = self.revalidate('/api/products/', first)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response['Last-Modified'], first['Last-Modified'])
+
+    def test_etag_depends_on_the_query(self):
+        everything = self.client.get('/api/products/')
+        laptops = self.client.get('/api/products/', {'name': 'Laptop'})
+        self.assertNotEqual(everything['ETag'], laptops['ETag'])
+        self.assertEqual(self.client.get('/api/products/', {'name': 'Laptop'}, HTTP_IF_NONE_MATCH=everything['ETag']).status_code, 200)
+
+    def test_detail(self):
+        url = f'/api/products/{self.laptop.id}/'
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        self.laptop.stock = 3
+        self.laptop.save()
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+        self.assertEqual(self.client.get('/api/products/999999/').status_code, 404)
+
+        url = f'/api/categories/{self.category.id}/'
+        self.assertEqual(self.revalidate(url, self.client.get(url)).status_code, 304)
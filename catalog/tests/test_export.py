@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test.utils import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from ..models import Category, Product
+
+
+@override_settings(CATALOG_EXPORT_CHUNK_SIZE=3)
+class ExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='testpass'))
+        self.category = Category.objects.create(name='Electronics')
+        self.other = Category.objects.create(name='Books')
+        for i in range(10):
+            Product.objects.create(
+                name=f'Product {i}', description='Line, "quoted"\nnext', price=10 + i, stock=i,
+                category=self.category if i % 2 else self.other,
+            )
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/products/export/{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_matches_api_items(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        items = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([item['id'] for item in items], list(Product.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(items[0], self.client.get(f"/api/products/{items[0]['id']}/").json())
+
+    def test_csv(self):
+        response, body = self.export('?format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['description'], 'Line, "quoted"\nnext')
+        self.assertEqual(rows[0]['price'], '10.00')
+        self.assertEqual(rows[0]['category_name'], 'Books')
+
+    def test_filters_and_ordering_apply(self):
+        _, body = self.export(f'?category={self.category.id}&ordering=-price')
+        prices = [json.loads(line)['price'] for line in body.splitlines()]
+        self.assertEqual(prices, ['19.00', '17.00', '15.00', '13.00', '11.00'])
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/products/export/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,103 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+from ..facets import facet_counts, install_facet_support
+from ..models import Category, Product, ProductFacet
+from ..stock import reserve_stock
+
+
+class FacetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.books = Category.objects.create(name='Books')
+        Product.objects.create(name='Laptop', price=999.99, stock=10, category=self.electronics)
+        Product.objects.create(name='Phone', price=499.99, stock=0, category=self.electronics)
+        Product.objects.create(name='Cable', price=9.99, stock=100, category=self.electronics)
+        Product.objects.create(name='Novel', price=12.50, stock=3, category=self.books)
+
+    def bands(self, data):
+        return {band['min']: band['count'] for band in data['price_bands'] if band['count']}
+
+    def test_unfiltered_facets(self):
+        response = self.client.get('/api/products/facets/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['in_stock'], 3)
+        self.assertEqual(data['categories'], [
+            {'id': self.electronics.id, 'name': 'Electronics', 'count': 3, 'in_stock': 2},
+            {'id': self.books.id, 'name': 'Books', 'count': 1, 'in_stock': 1},
+        ])
+        self.assertEqual(self.bands(data), {0: 1, 10: 1, 250: 1, 500: 1})
+        self.assertEqual(data['price_bands'][0], {'min': 0, 'max': 10, 'count': 1})
+        self.assertEqual(data['price_bands'][-1], {'min': 1000, 'max': None, 'count': 0})
+
+    def test_filters_and_search_apply(self):
+        data = self.client.get(f'/api/products/facets/?category={self.books.id}').json()
+        self.assertEqual((data['count'], data['in_stock']), (1, 1))
+        self.assertEqual([category['name'] for category in data['categories']], ['Books'])
+
+        data = self.client.get('/api/products/facets/?search=laptop').json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(self.bands(data), {500: 1})
+
+    def test_writes_refresh_the_cached_facets(self):
+        self.client.get('/api/products/facets/')
+        Product.objects.filter(name='Phone').update(stock=5)
+        self.assertEqual(self.client.get('/api/products/facets/').json()['in_stock'], 4)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Facet counters are maintained by PostgreSQL triggers')
+class FacetCounterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.books = Category.objects.create(name='Books')
+        self.laptop = Product.objects.create(name='Laptop', price=999.99, stock=10, category=self.electronics)
+
+    def assertCountersMatch(self):
+        counters = sorted(facet_counts(Product.objects.all()))
+        recounted = sorted(facet_counts(Product.objects.filter(pk__gt=0)))  # Filtered: aggregate query
+        self.assertEqual(counters, recounted)
+
+    def test_counters_follow_every_write_path(self):
+        self.assertCountersMatch()
+        Product.objects.bulk_create([
+            Product(name=f'Book {index}', price=5 + index * 10, stock=index % 2, category=self.books)
+            for index in range(50)
+        ])
+        self.assertCountersMatch()
+        self.laptop.price = 20
+        self.laptop.category = self.books
+        self.laptop.save()
+        self.assertCountersMatch()
+        Product.objects.filter(category=self.books, price__lt=100).update(stock=0)
+        self.assertCountersMatch()
+        reserve_stock([(self.laptop.id, 10)])  # Sells out
+        self.assertCountersMatch()
+        Product.objects.filter(price__gt=300).delete()
+        self.assertCountersMatch()
+        self.books.delete()
+        self.assertCountersMatch()
+        self.assertFalse(ProductFacet.objects.filter(category_id=self.books.id).exists())
+
+    def test_unfiltered_facets_skip_the_products_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/products/facets/').json()
+        self.assertEqual(data['count'], 1)
+        self.assertFalse([query for query in queries if 'catalog_product"' in query['sql']])
+
+    def test_rebuild(self):
+        ProductFacet.objects.all().delete()
+        install_facet_support(connection)  # As on every migrate: the counters are left alone
+        self.assertFalse(ProductFacet.objects.exists())
+        call_command('rebuild_facets', stdout=StringIO())
+        self.assertCountersMatch()
+        self.assertEqual(ProductFacet.objects.get().count, 1)
@@ -0,0 +1,86 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from ..models import Category, Product
+from ..serializers import PRODUCT_ROW_FIELDS, ProductSerializer, product_rows_to_data
+from ..views import CategoryViewSet, ProductViewSet
+
+
+class InStockOnly(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return obj.stock > 0 if isinstance(obj, Product) else obj.name != 'Hidden'
+
+
+class FastReadPathTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # Throttle history and cached responses from other tests
+        self.client = APIClient()
+        self.categories = [
+            Category.objects.create(name='Electronics', description='Gadgets & gear'),
+            Category.objects.create(name='Café', description='Ünïcode "quoted"'),
+        ]
+        prices = [Decimal('999.99'), Decimal('10'), Decimal('0.50'), Decimal('12345678.10')]
+        for i, price in enumerate(prices * 3):
+            Product.objects.create(
+                name=f'Product {i} ✓', description='Line\nbreak' if i % 2 else '',
+                price=price, stock=i, category=self.categories[i % 2],
+            )
+
+    def test_rows_match_serializer_output(self):
+        queryset = Product.objects.select_related('category').order_by('id')
+        expected = JSONRenderer().render(ProductSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(product_rows_to_data(queryset.values_list(*PRODUCT_ROW_FIELDS)))
+        self.assertEqual(actual, expected)
+
+    def test_list_response_matches_serializer_output(self):
+        response = self.client.get('/api/products/?ordering=price')
+        page = Product.objects.select_related('category').order_by('price')[:10]
+        expected = JSONRenderer().render({
+            'count': Product.objects.count(),
+            'next': 'http://testserver/api/products/?ordering=price&page=2',
+            'previous': None,
+            'results': ProductSerializer(page, many=True).data,
+        })
+        self.assertEqual(response.content, expected)
+
+    def test_retrieve_response_matches_serializer_output(self):
+        product = Product.objects.first()
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.content, JSONRenderer().render(ProductSerializer(product).data))
+        self.assertEqual(self.client.get('/api/products/0/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/abc/').status_code, 404)
+
+    def test_retrieve_checks_object_permissions(self):
+        sold_out = Product.objects.filter(stock=0).first()
+        in_stock = Product.objects.filter(stock__gt=0).first()
+        with mock.patch.object(ProductViewSet, 'permission_classes', [InStockOnly]):
+            self.assertEqual(self.client.get(f'/api/products/{sold_out.id}/').status_code, 401)  # Denied, anonymously
+            self.assertEqual(self.client.get(f'/api/products/{in_stock.id}/').status_code, 200)
+
+    def test_not_modified_checks_object_permissions(self):
+        sold_out = Product.objects.filter(stock=0).first()
+        hidden = Category.objects.create(name='Hidden')
+        for url in (f'/api/products/{sold_out.id}/', f'/api/categories/{hidden.id}/'):
+            etag = self.client.get(url)['ETag']
+            with mock.patch.object(ProductViewSet, 'permission_classes', [InStockOnly]), \
+                    mock.patch.object(CategoryViewSet, 'permission_classes', [InStockOnly]):
+                for validators_cached in (True, False):
+                    if not validators_cached:
+                        cache.clear()
+                    with self.subTest(url=url, validators_cached=validators_cached):
+                        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 401)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_query_counts_do_not_grow_with_page_size(self):
+        # COUNT(*) + one joined SELECT, however many categories are on the
+        # page; the ETag fingerprint's aggregate is the COUNT(*)
+        with self.assertNumQueries(2):
+            self.client.get('/api/products/')
+        with self.assertNumQueries(1):
+            self.client.get('/api/products/?cursor=')
+        product = Product.objects.first()
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/products/{product.id}/')
@@ -0,0 +1,96 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient, APITestCase
+from ..filters import ProductFilter
+from ..models import Category, Product
+
+
+class ProductFilterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.electronics = Category.objects.create(name='Electronics')
+        self.books = Category.objects.create(name='Books')
+        self.toys = Category.objects.create(name='Toys')
+        Product.objects.create(name='Laptop', price=999.99, stock=10, category=self.electronics)
+        Product.objects.create(name='Phone', price=499.99, stock=0, category=self.electronics)
+        Product.objects.create(name='Cable', price=9.99, stock=100, category=self.electronics)
+        Product.objects.create(name='Novel', price=12.50, stock=3, category=self.books)
+        Product.objects.create(name='Robot', price=45.00, stock=1, category=self.toys)
+
+    def names(self, **params):
+        response = self.client.get('/api/products/', {'ordering': 'price', **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_price_range(self):
+        self.assertEqual(self.names(price__gte='10', price__lte='500'), ['Novel', 'Robot', 'Phone'])
+        self.assertEqual(self.names(price__lte='10'), ['Cable'])
+        self.assertEqual(self.names(price='45.00'), ['Robot'])
+
+    def test_in_stock(self):
+        self.assertEqual(self.names(in_stock='true'), ['Cable', 'Novel', 'Robot', 'Laptop'])
+        self.assertEqual(self.names(in_stock='false'), ['Phone'])
+
+    def test_categories(self):
+        self.assertEqual(self.names(category=self.electronics.id), ['Cable', 'Phone', 'Laptop'])
+        self.assertEqual(self.names(category=f'{self.books.id},{self.toys.id}'), ['Novel', 'Robot'])
+
+    def test_combined(self):
+        self.assertEqual(
+            self.names(category=self.electronics.id, price__gte='100', in_stock='true', name='Laptop'), ['Laptop'],
+        )
+        self.assertEqual(self.names(category=self.electronics.id, price__gte='100', in_stock='true'), ['Laptop'])
+
+    def test_invalid_values_are_rejected(self):
+        for params in ({'category': 'abc'}, {'category': '1,x'}, {'price__gte': 'cheap'}):
+            self.assertEqual(self.client.get('/api/products/', params).status_code, 400, params)
+
+    def test_facets_accept_the_same_filters(self):
+        response = self.client.get('/api/products/facets/', {'category': self.electronics.id, 'in_stock': 'true'})
+        self.assertEqual((response.json()['count'], response.json()['in_stock']), (2, 2))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Asserts PostgreSQL query plans')
+class ProductFilterPlanTests(TestCase):
+    """The common filter combinations are answered from the matching index, not a scan of the table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create([Category(name=f'Category {index}') for index in range(50)])
+        Product.objects.bulk_create([
+            Product(name=f'Product {index}', price=1 + index % 997, stock=index % 3, category=categories[index % 50])
+            for index in range(20000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE catalog_product')
+        cls.category = categories[7]
+
+    def plan(self, params, ordering=('price', 'id')):
+        queryset = ProductFilter({name: str(value) for name, value in params.items()}, Product.objects.all()).qs.order_by(*ordering)[:11]
+        return queryset.explain()
+
+    def assertUsesIndex(self, plan, index):
+        self.assertIn(f'Index Scan using {index}', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_category_price_range_in_stock_by_price(self):
+        plan = self.plan({'category': self.category.id, 'price__gte': '100', 'price__lte': '500', 'in_stock': 'true'})
+        self.assertUsesIndex(plan, 'catalog_product_instock_idx')
+        self.assertNotIn('Sort', plan)  # Already in (price, id) order
+
+    def test_category_in_stock_by_price(self):
+        plan = self.plan({'category': self.category.id, 'in_stock': 'true'})
+        self.assertUsesIndex(plan, 'catalog_product_instock_idx')
+        self.assertNotIn('Sort', plan)
+
+    def test_category_price_range(self):
+        self.assertUsesIndex(self.plan({'category': self.category.id, 'price__gte': '100', 'price__lte': '500'}),
+                             'catalog_product_facet_idx')
+
+    def test_price_range_by_price(self):
+        self.assertUsesIndex(self.plan({'price__gte': '100', 'price__lte': '120', 'in_stock': 'true'}),
+                             'catalog_pro_price_01671e_idx')
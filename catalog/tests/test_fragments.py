@@ -0,0 +1,95 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .. import fragments
+from ..fragments import PRODUCT_FRAGMENT_FIELDS, clear_local, product_fragments
+from ..models import Category, Product
+from ..renderers import Fragments, encode_json, render_fragments
+from ..serializers import ProductSerializer
+
+
+class FragmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Électronique', description='Tabs\tand "quotes"')
+        self.laptop = Product.objects.create(
+            name='Laptop \u2028 ünïcode ✓', description='Line\nbreak \x01 \\ </script>', price='999.90',
+            stock=3, category=self.category,
+        )
+        self.phone = Product.objects.create(name='Phone', price=499, stock=0, category=self.category)
+
+    def rows(self):
+        return list(Product.objects.order_by('id').values_list(*PRODUCT_FRAGMENT_FIELDS, named=True))
+
+    def test_fragments_match_product_serializer(self):
+        products = Product.objects.order_by('id').select_related('category')
+        expected = JSONRenderer().render(ProductSerializer(products, many=True).data)
+        self.assertEqual(render_fragments(product_fragments(self.rows())), expected)
+        clear_local()  # From the shared cache this time
+        self.assertEqual(render_fragments(product_fragments(self.rows())), expected)
+
+    def test_encode_json_matches_json_renderer(self):
+        value = {'text': 'a \u2028 b \u2029 c ✓ \x00 "q"', 'number': 1.5, 'none': None, 'list': [True, False]}
+        self.assertEqual(encode_json(value), JSONRenderer().render(value))
+        with mock.patch('catalog.renderers.orjson', None):
+            self.assertEqual(encode_json(value), JSONRenderer().render(value))
+
+    def test_list_response(self):
+        response = self.client.get('/api/products/?ordering=id')
+        self.assertEqual(response.status_code, 200)
+        expected = ProductSerializer(Product.objects.order_by('id').select_related('category'), many=True).data
+        self.assertEqual(response.json(), {
+            'count': 2, 'next': None, 'previous': None, 'results': json.loads(json.dumps(expected)),
+        })
+        self.assertEqual(json.loads(render_fragments({'results': Fragments([b'{"a":1}']), 'next': None})),
+                         {'results': [{'a': 1}], 'next': None})
+
+    def test_indented_rendering(self):
+        response = self.client.get('/api/products/', HTTP_ACCEPT='application/json; indent=2')
+        self.assertIn(b'\n  "count": 2', response.content)
+        self.assertEqual(response.json()['results'][0]['name'], 'Laptop \u2028 ünïcode ✓')
+
+    def test_warm_pages_skip_encoding(self):
+        product_fragments(self.rows())
+        with mock.patch.object(fragments, 'encode_json') as encode:
+            product_fragments(self.rows())
+            clear_local()
+            product_fragments(self.rows())
+        encode.assert_not_called()
+
+    def test_format_changes_make_new_fragments(self):
+        product_fragments(self.rows())
+        with mock.patch.object(fragments, 'FRAGMENT_FORMAT', fragments.FRAGMENT_FORMAT + 1), \
+                mock.patch.object(fragments, 'encode_json', wraps=encode_json) as encode:
+            product_fragments(self.rows())
+        self.assertEqual(encode.call_count, 2)
+
+    def test_writes_make_new_fragments(self):
+        self.client.get('/api/products/')
+        Product.objects.filter(pk=self.phone.pk).update(stock=7)
+        self.category.name = 'Gadgets'
+        self.category.save()
+        results = {item['id']: item for item in self.client.get('/api/products/').json()['results']}
+        self.assertEqual(results[self.phone.pk]['stock'], 7)
+        self.assertEqual({item['category']['name'] for item in results.values()}, {'Gadgets'})
+
+    def test_writes_replace_fragments(self):
+        product_fragments(self.rows())
+        Product.objects.filter(pk=self.phone.pk).update(stock=7)
+        self.category.save()
+        for _ in range(2):  # From this process, then from the shared cache
+            self.assertEqual([json.loads(fragment)['stock'] for fragment in product_fragments(self.rows())], [3, 7])
+            clear_local()
+        for row in self.rows():  # Overwritten in place: one key per product
+            self.assertEqual(cache.get(fragments.fragment_key(row))[0], fragments.fragment_version(row))
+
+    @override_settings(CATALOG_FRAGMENT_LOCAL_SIZE=1)
+    def test_local_size_is_bounded(self):
+        product_fragments(self.rows())
+        self.assertEqual(len(fragments._local), 1)
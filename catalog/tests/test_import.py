@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from ..management.commands.import_catalog import Command
+from ..models import Category, Product
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        Category.objects.create(name='Books', description='old')
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_and_upsert(self):
+        categories = self.write('categories.csv', 'name,description\nBooks,Paper\nGames,Fun\n')
+        products = self.write('products.csv', (
+            'sku,name,description,price,stock,category\n'
+            'B-1,Novel,"A long, long story",12.50,3,Books\n'
+            'G-1,Chess,,30,1,Games\n'
+            'G-1,Chess Set,,35,2,Games\n'  # Later rows for the same sku win
+            'X-1,Broken,,-1,1,Games\n'
+            'X-2,Orphan,,1,1,Unknown\n'
+        ))
+        for options in ([], ['--no-copy']):
+            out, err = self.run_import('--categories', categories, '--products', products, *options)
+            self.assertIn('rows/sec', out)
+            self.assertIn('2 rejected', out)
+            self.assertEqual(Category.objects.count(), 2)
+            self.assertEqual(Category.objects.get(name='Books').description, 'Paper')
+            self.assertEqual(Product.objects.count(), 2)
+            chess = Product.objects.get(sku='G-1')
+            self.assertEqual((chess.name, str(chess.price), chess.stock), ('Chess Set', '35.00', 2))
+            self.assertEqual(Product.objects.get(sku='B-1').description, 'A long, long story')
+
+    def test_ndjson_resume_skips_committed_records(self):
+        category = Category.objects.get(name='Books')
+        lines = [
+            json.dumps({'sku': f'S-{i}', 'name': f'Item {i}', 'price': '1.00', 'stock': i, 'category_id': category.id})
+            for i in range(5)
+        ]
+        products = self.write('products.ndjson', '\n'.join(lines))
+        checkpoint = products + '.checkpoint'
+        with open(checkpoint, 'w') as handle:
+            json.dump({'products': 3}, handle)
+        out, _ = self.run_import('--products', products, '--resume')
+        self.assertIn('Resuming after 3', out)
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['S-3', 'S-4'])
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_malformed_ndjson_lines_are_rejected(self):
+        category = Category.objects.get(name='Books')
+        good = json.dumps({'sku': 'S-1', 'name': 'Item', 'price': '1.00', 'stock': 1, 'category_id': category.id})
+        products = self.write('products.ndjson', '\n'.join([good, '{"sku": "S-2",', '["S-3"]', '']))
+        out, err = self.run_import('--products', products)
+        self.assertIn('2 rejected', out)
+        self.assertIn('product record 2: invalid JSON', err)
+        self.assertIn('product record 3: not a JSON object', err)
+        self.assertEqual(list(Product.objects.values_list('sku', flat=True)), ['S-1'])
+
+        categories = self.write('categories.ndjson', '{"name": "Games"}\nnot json\n')
+        _, err = self.run_import('--categories', categories)
+        self.assertIn('category record 2: invalid JSON', err)
+        self.assertTrue(Category.objects.filter(name='Games').exists())
+
+    def test_checkpoint_written_per_chunk(self):
+        category = Category.objects.get(name='Books')
+        rows = ''.join(f'S-{i},Item {i},,1.00,1,{category.id}\n' for i in range(5))
+        products = self.write('products.csv', 'sku,name,description,price,stock,category_id\n' + rows)
+        with mock.patch.object(Command, 'save_checkpoint', autospec=True) as save_checkpoint:
+            self.run_import('--products', products, '--chunk-size', '2')
+        saved = [call.args[2] for call in save_checkpoint.call_args_list]
+        self.assertEqual(saved, [2, 4])
+        self.assertEqual(Product.objects.count(), 5)
@@ -0,0 +1,66 @@
+from unittest import mock
+from django.core.cache import cache
+from rest_framework.test import APIClient, APITestCase
+from ..metrics import registry
+from ..models import Category, Product
+
+
+class ServerTimingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = APIClient()
+        category = Category.objects.create(name='Electronics')
+        Product.objects.create(name='Laptop', price=999.99, stock=10, category=category)
+
+    def timings(self, response):
+        return {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+
+    def test_header_reports_db_cache_and_serialization(self):
+        miss = self.timings(self.client.get('/api/products/'))
+        self.assertEqual(set(miss), {'db', 'cache', 'serialize', 'view', 'total'})
+        self.assertNotIn('desc="0 queries"', miss['db'])
+        self.assertIn('0 hit / 1 miss', miss['cache'])
+
+        hit = self.timings(self.client.get('/api/products/'))
+        self.assertIn('desc="0 queries"', hit['db'])
+        self.assertIn('1 hit / 0 miss', hit['cache'])
+
+    def test_prometheus_exposition(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        self.client.get('/api/categories/')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn(
+            'http_request_duration_seconds_count{route="product-list",method="GET",status="200"} 2', body
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="product-list",method="GET",status="200",le="+Inf"} 2', body
+        )
+        self.assertIn('http_request_cache_lookups_total{route="product-list",outcome="hit"} 1', body)
+        self.assertIn('http_request_cache_lookups_total{route="category-list",outcome="miss"} 1', body)
+
+
+class HealthCheckTests(APITestCase):
+    def test_reports_probe_latencies(self):
+        response = self.client.get('/health/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['database']['status'], data['cache']['status']), ('ok', 'ok'))
+        self.assertIsInstance(data['database']['latency_ms'], float)
+
+    def test_unreachable_cache_returns_503(self):
+        with mock.patch('ecommerce.urls.cache.get', side_effect=ConnectionError('refused')), \
+                self.assertLogs('ecommerce.urls', 'ERROR') as logs:
+            response = self.client.get('/health/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['cache'], {'status': 'error', 'latency_ms': mock.ANY})  # No details
+        self.assertIn('refused', logs.output[0])
+
+    def test_cache_probe_cleans_up(self):
+        with mock.patch('ecommerce.urls.cache.delete', wraps=cache.delete) as delete:
+            self.client.get('/health/')
+        keys = [call.args[0] for call in delete.call_args_list if call.args[0].startswith('health:probe:')]
+        self.assertEqual(len(keys), 1)
+        self.assertIsNone(cache.get(keys[0]))
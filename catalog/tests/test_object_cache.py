@@ -0,0 +1,145 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from ..forms import ProductForm
+from ..metrics import registry
+from ..models import Category
+from ..object_cache import INVALIDATION_CHANNEL, category_cache, invalidations
+from ..replicas import pin_to_primary, routing
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out')
+        time.sleep(0.01)
+
+
+def category_queries(queries):
+    return [query for query in queries if 'catalog_category' in query['sql']]
+
+
+class ObjectCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_cache.clear_local()
+        wait_until(invalidations.listening)  # The LRU is bypassed until then
+        self.electronics = Category.objects.create(name='Electronics')
+        self.books = Category.objects.create(name='Books')
+
+    def test_repeated_lookups_skip_the_database(self):
+        with self.assertNumQueries(1):
+            found = category_cache.get_many([self.electronics.pk, self.books.pk, 0])
+        self.assertEqual({pk: category.name for pk, category in found.items()},
+                         {self.electronics.pk: 'Electronics', self.books.pk: 'Books'})
+        before = dict(category_cache.lookups)
+        with self.assertNumQueries(0):
+            self.assertEqual(category_cache.get(self.books.pk).name, 'Books')
+        self.assertEqual(category_cache.lookups['local'] - before['local'], 1)
+
+    def test_other_processes_fill_from_the_shared_cache(self):
+        category_cache.get(self.books.pk)
+        category_cache.clear_local()  # As in a worker that never saw it
+        before = dict(category_cache.lookups)
+        with self.assertNumQueries(0):
+            self.assertEqual(category_cache.get(self.books.pk).name, 'Books')
+        self.assertEqual(category_cache.lookups['shared'] - before['shared'], 1)
+
+    def test_writes_invalidate(self):
+        category_cache.get(self.books.pk)
+        self.books.name = 'Novels'
+        self.books.save()
+        self.assertEqual(category_cache.get(self.books.pk).name, 'Novels')
+
+        Category.objects.filter(pk=self.books.pk).update(name='Comics')  # No signals
+        self.assertEqual(category_cache.get(self.books.pk).name, 'Comics')
+
+        self.books.delete()
+        self.assertIsNone(category_cache.get(self.books.pk))
+        self.assertEqual([category.name for category in category_cache.all()], ['Electronics'])
+
+    @override_settings(CATALOG_READ_REPLICAS={'replica_a': 1})
+    def test_pinned_clients_read_past_both_tiers(self):
+        category_cache.get(self.books.pk)
+        with connection.cursor() as cursor:  # As if the cached instance came from a lagging replica
+            cursor.execute('UPDATE catalog_category SET name = %s WHERE id = %s', ['Novels', self.books.pk])
+        factory = RequestFactory()
+        pin_to_primary(factory.post('/api/categories/'))
+        with routing(factory.get('/api/categories/')), self.assertNumQueries(1):
+            self.assertEqual(category_cache.get(self.books.pk).name, 'Novels')
+
+    def test_replica_reads_are_kept_briefly(self):
+        with mock.patch('catalog.object_cache.cache_policy', return_value=(True, 5)):
+            category_cache.get(self.books.pk)
+        self.assertLessEqual(category_cache._entries[self.books.pk][0], time.monotonic() + 5)
+
+    def test_callers_get_copies(self):
+        category_cache.get(self.books.pk).name = 'Changed'
+        self.assertEqual(category_cache.get(self.books.pk).name, 'Books')
+
+    def test_invalidation_is_broadcast(self):
+        if invalidations._redis() is None:
+            self.skipTest('Broadcasts need the Redis cache')
+        category_cache.get(self.books.pk)
+        invalidations._redis().publish(INVALIDATION_CHANNEL, 'catalog.category another-worker')
+        wait_until(lambda: not category_cache._entries)
+
+    def test_stats(self):
+        category_cache.get(self.books.pk)
+        category_cache.get(self.books.pk)
+        stats = category_cache.stats()
+        self.assertGreater(stats['hit_ratio'], 0)
+        self.assertEqual(stats['hit_ratio'], (stats['local'] + stats['shared']) / (
+            stats['local'] + stats['shared'] + stats['database']))
+        registry.flush()
+        self.assertIn('catalog_object_cache_lookups_total{model="catalog.category",tier="local"}',
+                      self.client.get('/metrics').content.decode())
+
+
+class CachedCategoryLookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category_cache.clear_local()
+        wait_until(invalidations.listening)
+        self.category = Category.objects.create(name='Electronics')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='testpass'))
+
+    def test_product_validation(self):
+        payload = {'name': 'Laptop', 'price': '999.99', 'stock': 3, 'category_id': self.category.pk}
+        self.assertEqual(self.client.post('/api/products/', payload, format='json').status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/products/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['category']['name'], 'Electronics')
+        self.assertEqual(category_queries(queries), [])
+
+        response = self.client.post('/api/products/', {**payload, 'category_id': 0}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('category_id', response.data)
+
+    def test_batch_create(self):
+        items = [{'name': 'Laptop', 'price': '999.99', 'stock': 3, 'category_id': self.category.pk}]
+        self.client.post('/api/products/batch_create/', items, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/products/batch_create/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(category_queries(queries), [])
+
+    def test_product_form(self):
+        str(ProductForm()['category'])
+        with self.assertNumQueries(0):
+            rendered = str(ProductForm()['category'])
+        self.assertIn('Electronics', rendered)
+
+        form = ProductForm({'name': 'Laptop', 'price': '999.99', 'stock': 3, 'category': self.category.pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['category'], self.category)
+        self.assertFalse(ProductForm({'name': 'Laptop', 'price': '1', 'stock': 1, 'category': 0}).is_valid())
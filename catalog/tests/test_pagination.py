@@ -0,0 +1,76 @@
+from django.db import connection
+from django.core.cache import cache
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from ..models import Category, Product
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # Throttle history and cached responses from other tests
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.other = Category.objects.create(name='Books')
+        # Duplicate names and prices so the id tie-breaker matters
+        for i in range(25):
+            Product.objects.create(
+                name=f'Product {i % 4}', price=10 + i % 3, stock=5,
+                category=self.category if i % 5 else self.other,
+            )
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.json()['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walk_matches_full_ordering(self):
+        for ordering in ['name', '-name', 'price', '-price', 'created_at', '-created_at']:
+            field = ordering.lstrip('-')
+            expected = list(
+                Product.objects.order_by(ordering, ('-' if ordering.startswith('-') else '') + 'id')
+                .values_list('id', flat=True)
+            )
+            self.assertEqual(self.walk(f'/api/products/?cursor=&ordering={ordering}'), expected, msg=field)
+
+    def test_walk_with_filters(self):
+        expected = list(
+            Product.objects.filter(category=self.category, price=11)
+            .order_by('name', 'id').values_list('id', flat=True)
+        )
+        ids = self.walk(f'/api/products/?cursor=&category={self.category.id}&price=11')
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get('/api/products/?cursor=&ordering=price')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.json()['results']],
+            [item['id'] for item in first.json()['results']],
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_deep_page_uses_no_offset_or_count(self):
+        url = self.client.get('/api/products/?cursor=&ordering=price').data['next']
+        url = self.client.get(url).data['next']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 5)
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # A cursor issued for one ordering can't be replayed against another
+        url = self.client.get('/api/products/?cursor=&ordering=price').data['next']
+        response = self.client.get(url.replace('ordering=price', 'ordering=name'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,118 @@
+from collections import Counter
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from ..models import Category, Product
+from ..replicas import ReplicaRouter, cache_policy, pin_to_primary, routing
+
+REPLICAS = {'replica_a': 3, 'replica_b': 1}
+
+
+@override_settings(CATALOG_READ_REPLICAS=REPLICAS, CATALOG_PRIMARY_PIN_SECONDS=10)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_alias(self, request, model=Product):
+        with routing(request):
+            return self.router.db_for_read(model)
+
+    def test_safe_requests_read_from_a_weighted_replica(self):
+        aliases = Counter(self.read_alias(self.factory.get('/api/products/')) for _ in range(2000))
+        self.assertEqual(set(aliases), set(REPLICAS))
+        self.assertAlmostEqual(aliases['replica_a'] / 2000, 0.75, delta=0.05)
+
+    def test_one_replica_per_request(self):
+        with routing(self.factory.get('/api/products/')):
+            aliases = {self.router.db_for_read(model) for model in (Product, Category) * 20}
+        self.assertEqual(len(aliases), 1)
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        for method in ('post', 'put', 'patch', 'delete'):
+            self.assertEqual(self.read_alias(getattr(self.factory, method)('/api/products/')), DEFAULT_DB_ALIAS)
+
+    def test_outside_requests_and_other_apps_are_left_alone(self):
+        self.assertIsNone(self.router.db_for_read(Product))  # Celery tasks, management commands
+        self.assertIsNone(self.read_alias(self.factory.get('/'), model=User))
+        with override_settings(CATALOG_READ_REPLICAS={}):
+            self.assertIsNone(self.read_alias(self.factory.get('/api/products/')))
+
+    def test_writes_and_migrations_use_the_primary(self):
+        self.assertEqual(self.router.db_for_write(Product, instance=Product()), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate('replica_a', 'catalog'))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'catalog'))
+
+    def test_client_is_pinned_to_the_primary_after_a_write(self):
+        writer = self.factory.get('/api/products/', REMOTE_ADDR='10.0.0.1')
+        pin_to_primary(self.factory.post('/api/products/', REMOTE_ADDR='10.0.0.1'))
+        self.assertEqual(self.read_alias(writer), DEFAULT_DB_ALIAS)
+        self.assertIn(self.read_alias(self.factory.get('/api/products/', REMOTE_ADDR='10.0.0.2')), REPLICAS)
+
+        cache.clear()  # The pin expired
+        self.assertIn(self.read_alias(writer), REPLICAS)
+
+    def test_cache_policy(self):
+        self.assertEqual(cache_policy(900), (True, 900))  # Outside a request
+        with routing(self.factory.get('/api/products/')):
+            self.assertEqual(cache_policy(900), (True, 10))  # Replica data is cached briefly
+        pin_to_primary(self.factory.post('/api/products/'))
+        with routing(self.factory.get('/api/products/')):
+            self.assertEqual(cache_policy(900), (False, 900))  # Pinned clients skip cached entries
+
+
+@skipIf(connection.vendor == 'sqlite', 'Connections to the in-memory test database lock tables for each other')
+@override_settings(CATALOG_READ_REPLICAS={'replica': 1}, CATALOG_PRIMARY_PIN_SECONDS=10)
+class ReplicaRoutingApiTests(TestCase):
+    """End to end, with a second connection to the test database standing in for a replica.
+
+    The replica connection doesn't see rows written in the test's
+    transaction on the primary, much like a lagging replica.
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['replica'] = {**connections.settings['default'], 'TEST': {'MIRROR': 'default'}}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Electronics')
+        self.writer = APIClient()
+        self.writer.force_authenticate(User.objects.create_user(username='writer', password='pass'))
+        self.reader = APIClient()
+        self.reader.force_authenticate(User.objects.create_user(username='reader', password='pass'))
+
+    def test_reads_go_to_the_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            response = self.reader.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(replica), 0)
+        self.assertFalse([query for query in primary if 'catalog_' in query['sql']])
+
+    def test_writer_reads_its_own_writes(self):
+        response = self.writer.post('/api/products/', {
+            'name': 'Laptop', 'price': '999.99', 'stock': 3, 'category_id': self.category.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        product_id = response.data['id']
+
+        self.assertEqual(self.writer.get(f'/api/products/{product_id}/').status_code, 200)
+        self.assertEqual(self.writer.get('/api/products/').data['count'], 1)
+        # Other clients still read the replica, which hasn't caught up
+        self.assertEqual(self.reader.get(f'/api/products/{product_id}/').status_code, 404)
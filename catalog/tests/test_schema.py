@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from ecommerce import schema
+
+
+class SchemaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(CATALOG_SCHEMA_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = directory.name
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        schema._version = schema._schema = None
+
+    def get_spec(self, **headers):
+        return self.client.get('/api/docs/', {'format': 'openapi'}, **headers)
+
+    def test_spec_is_generated_once_and_cached_by_clients(self):
+        with mock.patch.object(schema, 'generate_schema', wraps=schema.generate_schema) as generate:
+            first = self.get_spec()
+            second = self.get_spec()
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertIn('/products/', json.loads(first.content)['paths'])
+        self.assertIn('public', first['Cache-Control'])
+        self.assertEqual(self.get_spec(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_served_from_the_file_written_at_build_time(self):
+        call_command('generate_schema', stdout=open(os.devnull, 'w'))
+        self.assertEqual(os.listdir(self.directory), [f'openapi-{schema.code_version()}.json'])
+        self.reset()
+        with mock.patch.object(schema, 'generate_schema', side_effect=AssertionError('regenerated')):
+            self.assertEqual(self.get_spec().status_code, 200)
+
+    def test_new_code_version_regenerates(self):
+        with override_settings(CATALOG_SCHEMA_VERSION='build-1'):
+            etag = self.get_spec()['ETag']
+        self.reset()
+        with override_settings(CATALOG_SCHEMA_VERSION='build-2'):
+            response = self.get_spec(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.listdir(self.directory), ['openapi-build-2.json'])
+
+    def test_swagger_ui(self):
+        response = self.client.get('/api/docs/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'swagger')
+
+    def test_workers_start_without_drf_yasg(self):
+        code = ('import django, sys; django.setup(); import ecommerce.urls; '
+                'print(sorted(name for name in sys.modules if name.startswith("drf_yasg.")))')
+        output = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+            env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)},
+        ).stdout
+        self.assertEqual(output.strip(), '[]')
@@ -0,0 +1,69 @@
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient, APITestCase
+from ..models import Category, Product
+from ..search import install_search_trigger_after_migrate, trigram_available
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics')
+        self.sleeve = Product.objects.create(
+            name='Neoprene Sleeve', description='Protective sleeve for any laptop',
+            price=19.99, stock=5, category=self.category,
+        )
+        self.laptop = Product.objects.create(
+            name='Gaming Laptop', description='Fast and loud', price=1999.99, stock=2, category=self.category,
+        )
+        Product.objects.create(name='Desk Lamp', price=29.99, stock=9, category=self.category)
+
+    def search(self, query):
+        response = self.client.get('/api/products/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('laptop'), [self.laptop.id, self.sleeve.id])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('gaming laptop'), [self.laptop.id])
+        self.assertEqual(self.search('gaming lamp'), [])
+
+    def test_explicit_ordering_wins_over_rank(self):
+        response = self.client.get('/api/products/', {'search': 'laptop', 'ordering': 'price'})
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.sleeve.id, self.laptop.id])
+
+    def test_cursor_pages_need_an_explicit_ordering(self):
+        response = self.client.get('/api/products/', {'search': 'laptop', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.json())
+        response = self.client.get('/api/products/', {'search': 'laptop', 'cursor': '', 'ordering': '-price'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.laptop.id, self.sleeve.id])
+
+    def test_bulk_writes_are_searchable(self):
+        Product.objects.bulk_create([
+            Product(name='Mechanical Keyboard', price=89.99, stock=3, category=self.category),
+        ])
+        Product.objects.filter(pk=self.laptop.pk).update(name='Gaming Notebook')
+        self.assertEqual(len(self.search('keyboard')), 1)
+        self.assertEqual(self.search('notebook'), [self.laptop.id])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Trigram matching needs PostgreSQL')
+    def test_typos_match_on_postgresql(self):
+        if not trigram_available(connection):
+            self.skipTest('pg_trgm is not installed')
+        self.assertIn(self.laptop.id, self.search('Gamng Laptp'))
+
+    @skipUnless(connection.vendor == 'postgresql', 'The trigger is PostgreSQL only')
+    def test_migrate_leaves_the_trigger_alone(self):
+        query = "SELECT oid FROM pg_trigger WHERE tgname = 'catalog_product_search_vector_trigger'"
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            installed = cursor.fetchone()
+            install_search_trigger_after_migrate(connection.alias)
+            cursor.execute(query)
+            self.assertEqual(cursor.fetchone(), installed)
@@ -0,0 +1,135 @@
+import threading
+from unittest import skipIf
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from ..models import Category, Product, ProductPopularity
+from ..stock import reserve_stock
+
+
+class StockReservationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='testpass'))
+        category = Category.objects.create(name='Electronics')
+        self.phone = Product.objects.create(name='Phone', price=499.99, stock=5, category=category)
+        self.case = Product.objects.create(name='Case', price=9.99, stock=1, category=category)
+
+    def reserve(self, items, **extra):
+        return self.client.post('/api/products/reserve/', {'items': items, **extra}, format='json')
+
+    def test_reserves_many_lines(self):
+        response = self.reserve([
+            {'product_id': self.phone.id, 'quantity': 2},
+            {'product_id': self.case.id, 'quantity': 1},
+            {'product_id': self.phone.id, 'quantity': 1},  # Merged with the first line
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(line['product_id'], line['quantity'], line['reserved']) for line in response.data['results']],
+            [(self.phone.id, 3, True), (self.case.id, 1, True)],
+        )
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.stock, 2)
+
+    def test_partial_failure(self):
+        response = self.reserve([
+            {'product_id': self.phone.id, 'quantity': 1},
+            {'product_id': self.case.id, 'quantity': 2},
+            {'product_id': 999999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        phone, case, missing = response.data['results']
+        self.assertTrue(phone['reserved'])
+        self.assertEqual((case['reserved'], case['available']), (False, 1))
+        self.assertEqual(missing['error'], 'Product not found.')
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).stock, 4)
+
+    def test_all_or_nothing_rolls_back(self):
+        response = self.reserve([
+            {'product_id': self.phone.id, 'quantity': 1},
+            {'product_id': self.case.id, 'quantity': 2},
+        ], all_or_nothing=True)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(any(line['reserved'] for line in response.data['results']))
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).stock, 5)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.reserve([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.reserve([{'product_id': self.phone.id, 'quantity': 0}]).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.reserve([{'product_id': self.phone.id, 'quantity': 1}]).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_reservations_count_towards_popularity(self):
+        stale = Product.objects.get(pk=self.phone.pk)
+        self.reserve([{'product_id': self.phone.id, 'quantity': 2}])
+        self.reserve([{'product_id': self.phone.id, 'quantity': 1}, {'product_id': self.case.id, 'quantity': 2}])
+        stale.description = 'Edited elsewhere'  # Read before the reservations, as in a form
+        stale.save()
+        self.assertEqual(dict(ProductPopularity.objects.values_list('product_id', 'units')), {self.phone.pk: 3})
+
+    def test_reservation_invalidates_cached_listing(self):
+        self.client.get('/api/products/')
+        self.reserve([{'product_id': self.phone.id, 'quantity': 5}])
+        stocks = {item['id']: item['stock'] for item in self.client.get('/api/products/').json()['results']}
+        self.assertEqual(stocks[self.phone.id], 0)
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite serializes writers at the database level')
+class StockReservationConcurrencyTests(TransactionTestCase):
+    def run_threads(self, count, target):
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                target(index)
+            except Exception as exc:  # Surface deadlocks and other DB errors
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_hot_sku_never_oversells(self):
+        category = Category.objects.create(name='Flash sale')
+        product = Product.objects.create(name='Hot item', price=1, stock=50, category=category)
+        successes = []
+
+        def reserve_repeatedly(index):
+            for _ in range(10):
+                successes.extend(result for result in reserve_stock([(product.id, 1)]) if result['reserved'])
+
+        self.run_threads(16, reserve_repeatedly)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(len(successes), 50)
+
+    def test_opposite_line_orders_do_not_deadlock(self):
+        category = Category.objects.create(name='Bundles')
+        first = Product.objects.create(name='A', price=1, stock=1000, category=category)
+        second = Product.objects.create(name='B', price=1, stock=1000, category=category)
+
+        def reserve_pair(index):
+            lines = [(first.id, 1), (second.id, 1)]
+            for _ in range(20):
+                reserve_stock(lines if index % 2 else lines[::-1], all_or_nothing=True)
+
+        self.run_threads(8, reserve_pair)
+        self.assertEqual(
+            sorted(Product.objects.filter(category=category).values_list('stock', flat=True)), [840, 840]
+        )
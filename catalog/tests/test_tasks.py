@@ -0,0 +1,100 @@
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from ..models import Category, Product
+from ..tasks import notification_buffer, send_product_batch_notification, send_product_creation_notification
+
+
+@override_settings(CATALOG_NOTIFICATION_BATCH_SIZE=3, CATALOG_NOTIFICATION_FLUSH_INTERVAL=60)
+class NotificationBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        notification_buffer.flush()
+        patcher = mock.patch('catalog.tasks.send_product_batch_notification.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(notification_buffer.flush)
+        self.category = Category.objects.create(name='Electronics')
+
+    def sent(self):
+        return [call.args[0] for call in self.delay.call_args_list]
+
+    def test_ids_are_coalesced_until_flush(self):
+        notification_buffer.add([1])
+        notification_buffer.add([2])
+        self.assertEqual(self.sent(), [])
+        notification_buffer.flush()
+        self.assertEqual(self.sent(), [[1, 2]])
+
+    def test_full_batch_is_sent_immediately(self):
+        notification_buffer.add([1, 2, 3, 4])
+        self.assertEqual(self.sent(), [[1, 2, 3], [4]])
+
+    @override_settings(CATALOG_NOTIFICATION_FLUSH_INTERVAL=0.05)
+    def test_flush_interval_outside_requests(self):
+        notification_buffer.add([7])
+        deadline = time.monotonic() + 2
+        while not self.delay.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.sent(), [[7]])
+
+    def test_requests_leave_other_notifications_alone(self):
+        notification_buffer.add([7])  # Queued outside any request
+        APIClient().get('/api/categories/')
+        self.assertEqual(self.sent(), [])
+
+
+@override_settings(CATALOG_NOTIFICATION_BATCH_SIZE=3, CATALOG_NOTIFICATION_FLUSH_INTERVAL=60)
+class RequestNotificationTests(TransactionTestCase):
+    """Commits happen inside the request here, as they do outside tests."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('catalog.tasks.send_product_batch_notification.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='testpass'))
+        self.category = Category.objects.create(name='Electronics')
+
+    def sent(self):
+        return [call.args[0] for call in self.delay.call_args_list]
+
+    def create(self, count):
+        items = [{'name': f'P{i}', 'price': '9.99', 'stock': 1, 'category_id': self.category.id} for i in range(count)]
+        response = self.client.post('/api/products/batch_create/', items, format='json')
+        return [item['id'] for item in response.data['created']]
+
+    def test_creations_in_one_request_share_a_message(self):
+        ids = self.create(2)
+        self.assertEqual(self.sent(), [ids])
+        response = self.client.post('/api/products/', {
+            'name': 'Phone', 'price': 499.99, 'stock': 20, 'category_id': self.category.id,
+        })
+        self.assertEqual(self.sent(), [ids, [response.data['id']]])
+        self.assertEqual(len(notification_buffer._ids), 0)
+
+    def test_full_batches_are_sent_during_the_request(self):
+        ids = self.create(4)
+        self.assertEqual(self.sent(), [ids[:3], ids[3:]])
+
+
+class NotificationTaskTests(TestCase):
+    def test_batch_task_loads_products_with_one_query(self):
+        category = Category.objects.create(name='Electronics')
+        ids = [
+            Product.objects.create(name=f'P{i}', price=10, stock=1, category=category).id
+            for i in range(5)
+        ]
+        with self.assertNumQueries(1), self.assertLogs('catalog.tasks', level='INFO') as logs:
+            send_product_batch_notification(ids + [0])
+        self.assertEqual(sum('New Product Created' in line for line in logs.output), 5)
+        self.assertTrue(any('Product ID 0 not found' in line for line in logs.output))
+
+    def test_tasks_skip_result_storage(self):
+        self.assertTrue(send_product_batch_notification.ignore_result)
+        self.assertTrue(send_product_creation_notification.ignore_result)
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import fakeredis
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from redis.exceptions import ConnectionError
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from ..throttling import (
+    TOKEN_BUCKET_SCRIPT, AnonTokenBucketThrottle, TokenBucketThrottle, UserTokenBucketThrottle, take_tokens,
+)
+
+
+class ThrottledView(APIView):
+    def get(self, request):
+        return Response({'ok': True})
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        TokenBucketThrottle.clear_leases()
+        self.now = 1_000_000.0
+        self.redis = fakeredis.FakeRedis()  # Runs the Lua script through lupa
+        self.redis.script_load(TOKEN_BUCKET_SCRIPT)  # As after the first request of a process
+        self.factory = APIRequestFactory()
+        for target, attribute, value in [
+            (TokenBucketThrottle, 'timer', lambda throttle: self.now),
+            (TokenBucketThrottle, 'get_redis', lambda throttle: self.redis),
+            (TokenBucketThrottle, 'THROTTLE_RATES', {'anon': '3/min', 'user': '600/min'}),
+            (TokenBucketThrottle, '_scripts', {}),
+        ]:
+            patcher = patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, user=None):
+        request = self.factory.get('/throttled/')
+        if user is not None:
+            force_authenticate(request, user)
+        throttle = AnonTokenBucketThrottle if user is None else UserTokenBucketThrottle
+        return ThrottledView.as_view(throttle_classes=[throttle])(request)
+
+    def script_calls(self):
+        return patch.object(self.redis, 'evalsha', wraps=self.redis.evalsha)
+
+    @override_settings(CATALOG_THROTTLE_LEASE_SECONDS=0)
+    def test_bucket_empties_and_refills(self):
+        self.assertEqual([self.get().status_code for _ in range(4)], [200, 200, 200, 429])
+        response = self.get()
+        self.assertEqual(response['Retry-After'], '20')  # One token every 20 seconds
+        self.now += 20
+        self.assertEqual([self.get().status_code for _ in range(2)], [200, 429])
+        self.now += 3600  # Never more than a full bucket
+        self.assertEqual([self.get().status_code for _ in range(4)], [200, 200, 200, 429])
+
+    @override_settings(CATALOG_THROTTLE_LEASE_SECONDS=0)
+    def test_one_script_call_per_request(self):
+        with self.script_calls() as evalsha:
+            for _ in range(5):
+                self.get()
+        self.assertEqual(evalsha.call_count, 5)
+        key, = self.redis.keys()
+        self.assertTrue(key.decode().endswith('catalog:throttle:anon:127.0.0.1'))
+        self.assertLessEqual(self.redis.pttl(key), 61000)  # Gone once the bucket would be full
+
+    def test_clients_under_the_limit_lease_tokens(self):
+        user = User.objects.create_user(username='shopper', password='secret')
+        with self.script_calls() as evalsha:
+            self.assertEqual({self.get(user).status_code for _ in range(25)}, {200})
+        self.assertEqual(evalsha.call_count, 3)  # 10 tokens a second at 600/min: a lease of 10 per call
+        tokens = float(self.redis.hget(next(iter(self.redis.keys('*user*'))), 'tokens'))
+        self.assertEqual(tokens, 600 - 30)
+
+    def test_clients_near_the_limit_take_one_token_at_a_time(self):
+        user = User.objects.create_user(username='shopper', password='secret')
+        for _ in range(32):
+            self.get(user)
+        TokenBucketThrottle.clear_leases()
+        self.redis.hset(next(iter(self.redis.keys('*user*'))), 'tokens', '305')
+        with self.script_calls() as evalsha:
+            for _ in range(3):
+                self.get(user)
+        self.assertEqual(evalsha.call_count, 3)
+
+    def test_redis_outage_lets_requests_through(self):
+        with patch.object(self.redis, 'evalsha', side_effect=ConnectionError):
+            self.assertEqual({self.get().status_code for _ in range(5)}, {200})
+
+    @override_settings(CATALOG_THROTTLE_LEASE_SECONDS=0)
+    def test_without_redis_the_bucket_lives_in_the_cache(self):
+        with patch.object(TokenBucketThrottle, 'get_redis', lambda throttle: None):
+            self.assertEqual([self.get().status_code for _ in range(4)], [200, 200, 200, 429])
+            self.now += 20
+            self.assertEqual(self.get().status_code, 200)
+
+
+class TakeTokensTests(SimpleTestCase):
+    def test_matches_the_script(self):
+        self.assertEqual(take_tokens(None, 0, 10, 1, 1), (1, 9))
+        self.assertEqual(take_tokens((0.5, 0), 0.25, 10, 1, 1), (0, 0.75))
+        self.assertEqual(take_tokens((9, 0), 100, 10, 1, 3), (3, 7))
+        self.assertEqual(take_tokens((7, 0), 0, 10, 1, 3), (1, 6))
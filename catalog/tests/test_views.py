@@ -43,7 +43,7 @@ class APITests(APITestCase):
         Product.objects.create(name='Headphones', price=99.99, stock=50, category=self.category)
         response = self.client.get(f'/api/products/?category={self.category.id}&ordering=price')
         self.assertEqual(response.status_code, status.HTTP_200_OK, msg=response.data)
-        self.assertEqual(response.data['results'][0]['name'], 'Headphones')  # Cheapest first
+        self.assertEqual(response.json()['results'][0]['name'], 'Headphones')  # Cheapest first
 
     def test_product_pagination(self):
         for i in range(14):
@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+# Refills the bucket for the time since its last request, then takes one
+# token, or a lease of several when the bucket is more than half full.
+# Timestamps come from the caller (SimpleRateThrottle.timer) so tests can
+# move time; the key expires once the bucket would be full again anyway.
+TOKEN_BUCKET_SCRIPT = """
+local capacity, rate, now, lease = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or capacity
+local at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local granted = 0
+if tokens >= 1 then
+    granted = 1
+    if lease > 1 and tokens - lease >= capacity / 2 then
+        granted = lease
+    end
+    tokens = tokens - granted
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {granted, tostring(tokens)}
+"""
+
+LEASE_ENTRIES = 10000  # Clients holding a lease in one process, least recently used dropped first
+MAX_LEASE = 100
+
+
+def take_tokens(state, now, capacity, rate, lease):
+    """Python twin of TOKEN_BUCKET_SCRIPT: return ``(granted, tokens left)`` for a ``(tokens, at)`` state."""
+    tokens, at = state or (capacity, now)
+    tokens = min(capacity, tokens + max(0, now - at) * rate)
+    granted = 0
+    if tokens >= 1:
+        granted = lease if lease > 1 and tokens - lease >= capacity / 2 else 1
+        tokens -= granted
+    return granted, tokens
+
+
+class TokenBucketThrottle(throttling.SimpleRateThrottle):
+    """SimpleRateThrottle with a token bucket in Redis instead of a request history.
+
+    A scope's rate, e.g. ``'1000/day'``, is both the bucket's size and how
+    fast it refills, so clients may burst up to the full allowance and
+    then get a steady trickle. Each check is one script call, whatever the
+    rate, where the history list grows with it and costs a read and a write.
+
+    Clients well under their limit lease up to ``CATALOG_THROTTLE_LEASE_SECONDS``
+    worth of refill at once, which this process hands out without calling
+    Redis until it runs out or expires. Leased tokens are gone from the
+    shared bucket, so the limit still holds across processes; a lease that
+    expires unused costs the client at most that much refill. Rates slower
+    than a token per lease period are always checked in Redis.
+
+    Without a Redis cache the same bucket is kept with plain cache reads
+    and writes; if Redis is down, requests are let through.
+    """
+
+    cache_format = 'catalog:throttle:%(scope)s:%(ident)s'
+
+    _lock = threading.Lock()
+    _leases = OrderedDict()  # key -> [tokens, expires], shared by every instance in the process
+    _scripts = {}  # id(client) -> registered script
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        if self.take_leased():
+            return True
+
+        rate = self.num_requests / self.duration
+        lease = min(MAX_LEASE, int(rate * settings.CATALOG_THROTTLE_LEASE_SECONDS))
+        try:
+            granted, tokens = self.take(self.num_requests, rate, self.timer(), lease)
+        except Exception:
+            logger.exception('Token bucket throttle unavailable, allowing the request')
+            return True
+        if not granted:
+            self.wait_seconds = (1 - tokens) / rate
+            return False
+        if granted > 1:
+            self.lease(granted - 1)
+        return True
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+    def get_redis(self):
+        if 'django_redis' not in settings.CACHES['default']['BACKEND']:
+            return None
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+
+    def take(self, capacity, rate, now, lease):
+        """Take tokens from the shared bucket; return ``(granted, tokens left)``."""
+        client = self.get_redis()
+        if client is None:
+            granted, tokens = take_tokens(cache.get(self.key), now, capacity, rate, lease)
+            cache.set(self.key, (tokens, now), timeout=int((capacity - tokens) / rate) + 1)
+            return granted, tokens
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = self._scripts[id(client)] = client.register_script(TOKEN_BUCKET_SCRIPT)
+        granted, tokens = script(keys=[cache.make_key(self.key)], args=[capacity, rate, now, lease])
+        return int(granted), float(tokens)
+
+    def take_leased(self):
+        with self._lock:
+            entry = self._leases.get(self.key)
+            if entry is None:
+                return False
+            if entry[1] <= time.monotonic():
+                del self._leases[self.key]
+                return False
+            entry[0] -= 1
+            if not entry[0]:
+                del self._leases[self.key]
+            else:
+                self._leases.move_to_end(self.key)
+            return True
+
+    def lease(self, tokens):
+        with self._lock:
+            self._leases[self.key] = [tokens, time.monotonic() + settings.CATALOG_THROTTLE_LEASE_SECONDS]
+            self._leases.move_to_end(self.key)
+            while len(self._leases) > LEASE_ENTRIES:
+                self._leases.popitem(last=False)
+
+    @classmethod
+    def clear_leases(cls):
+        with cls._lock:
+            cls._leases.clear()
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle, throttling.AnonRateThrottle):
+    """Drop-in for AnonRateThrottle: the ``anon`` rate, per client IP, for unauthenticated requests."""
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle, throttling.UserRateThrottle):
+    """Drop-in for UserRateThrottle: the ``user`` rate, per user, or per IP for anonymous requests."""
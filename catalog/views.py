@@ -4,54 +4,276 @@ from rest_framework.response import Response  # NEW: For batch response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action  # NEW: For custom action
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from .batch import bulk_create_products, product_to_row, update_products
+from asgiref.sync import sync_to_async
+from .async_views import AsyncReadMixin
+from .autocomplete import product_index, record_reservations
+from .cache import acache_response, cache_response
+from .conditional import (
+    DetailFingerprint, FingerprintReuseMixin, ListFingerprint, aconditional_get, conditional_get,
+)
+from .export import acsv_stream, andjson_stream, csv_stream, ndjson_stream
+from .facets import product_facets
+from .filters import ProductFilter, ProductSearchFilter
+from .fragments import PRODUCT_FRAGMENT_FIELDS, product_fragments
+from .pagination import CountedPageNumberPagination, ProductPagination, apaginate_queryset
+from .renderers import CSVRenderer, NDJSONRenderer
 from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
-from .tasks import send_product_creation_notification  # UPDATED: Renamed for clarity
+from .serializers import (
+    CategorySerializer, ProductSerializer, PRODUCT_ROW_FIELDS, StockReservationSerializer, product_from_row,
+    product_rows_to_data,
+)
+from .stock import reserve_stock
+from .tasks import queue_product_notifications
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated  # FIXED: Added IsAuthenticated
 
 
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(FingerprintReuseMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CountedPageNumberPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['name']
     ordering_fields = ['name']
     ordering = ['name']
 
-    @method_decorator(cache_page(60*15))
+    @conditional_get('categories', models=[Category], fingerprint=ListFingerprint())
+    @cache_response('categories', models=[Category])
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+    @conditional_get('category', models=[Category], fingerprint=DetailFingerprint())
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    # Async twins of list/retrieve, served under ASGI (see async_views.py)
+    @aconditional_get('categories', models=[Category], fingerprint=ListFingerprint())
+    @acache_response('categories', models=[Category])
+    async def alist(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        page = await apaginate_queryset(self.paginator, queryset, request, self)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([category async for category in queryset], many=True).data)
+
+    @aconditional_get('category', models=[Category], fingerprint=DetailFingerprint())
+    async def aretrieve(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            category = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (Category.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(request, category)
+        return Response(self.get_serializer(category).data)
+
+class ProductViewSet(FingerprintReuseMixin, AsyncReadMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.select_related('category')
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
-    filterset_fields = ['category', 'name', 'price']
+    pagination_class = ProductPagination  # Pass ?cursor= for keyset pagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter, ProductSearchFilter]
+    filterset_class = ProductFilter
     ordering_fields = ['name', 'price', 'created_at']
     ordering = ['name']
 
-    @method_decorator(cache_page(60*15))
+    # Product payloads embed their category, so either model invalidates them.
+    @conditional_get('products', models=[Product, Category], fingerprint=ListFingerprint('category'))
+    @cache_response('products', models=[Product, Category])
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        # Reads skip ProductSerializer: pages are joined from cached JSON
+        # fragments, built from joined rows when missing (see fragments.py)
+        rows = self.filter_queryset(self.get_queryset()).values_list(*PRODUCT_FRAGMENT_FIELDS, named=True)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(product_fragments(page))
+        return Response(product_fragments(list(rows)))
+
+    @conditional_get('product', models=[Product, Category],
+                     fingerprint=DetailFingerprint('category', fields=PRODUCT_ROW_FIELDS, instance=product_from_row))
+    def retrieve(self, request, *args, **kwargs):
+        # Reads a row rather than calling get_object(): object permissions
+        # are checked against a Product built from it, without the columns
+        # the response doesn't need. The fingerprint has usually read it already.
+        row = self.fingerprint_row
+        if row is None:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            rows = self.filter_queryset(self.get_queryset()).values_list(*PRODUCT_ROW_FIELDS, named=True)
+            try:
+                row = rows.get(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (Product.DoesNotExist, TypeError, ValueError, ValidationError):
+                raise Http404
+        self.check_object_permissions(request, product_from_row(row))
+        return Response(product_rows_to_data([row])[0])
+
+    # Async twins of list/retrieve, served under ASGI (see async_views.py)
+    @aconditional_get('products', models=[Product, Category], fingerprint=ListFingerprint('category'))
+    @acache_response('products', models=[Product, Category])
+    async def alist(self, request, *args, **kwargs):
+        queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+        rows = queryset.values_list(*PRODUCT_FRAGMENT_FIELDS, named=True)
+        page = await apaginate_queryset(self.paginator, rows, request, self)
+        if page is not None:
+            return self.get_paginated_response(await sync_to_async(product_fragments)(page))
+        return Response(await sync_to_async(product_fragments)([row async for row in rows]))
+
+    @aconditional_get('product', models=[Product, Category],
+                      fingerprint=DetailFingerprint('category', fields=PRODUCT_ROW_FIELDS, instance=product_from_row))
+    async def aretrieve(self, request, *args, **kwargs):
+        row = self.fingerprint_row
+        if row is None:
+            queryset = await sync_to_async(self.filter_queryset)(self.get_queryset())
+            rows = queryset.values_list(*PRODUCT_ROW_FIELDS, named=True)
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                row = await rows.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (Product.DoesNotExist, TypeError, ValueError, ValidationError):
+                raise Http404
+        self.check_object_permissions(request, product_from_row(row))
+        return Response(product_rows_to_data([row])[0])
+
+    @action(detail=False, methods=['get'])
+    @cache_response('product-facets', models=[Product, Category])
+    def facets(self, request):
+        """Product counts per category, price band and stock status, for the same filters and search as the list."""
+        return Response(product_facets(self.filter_queryset(self.get_queryset())))
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Products with a name word starting with ``?q=``, most popular first (``?limit=``, default 10).
+
+        Answered from this process's in-memory name index, without a query.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        max_limit = settings.CATALOG_AUTOCOMPLETE_LIMIT
+        if not 1 <= limit <= max_limit:
+            return Response({'detail': f'limit must be between 1 and {max_limit}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        completions = product_index.complete(request.query_params.get('q', ''), limit)
+        return Response({'results': [{'id': pk, 'name': name} for pk, name in completions]})
 
     def perform_create(self, serializer):
         product = serializer.save()
-        send_product_creation_notification.delay(product.id)  # UPDATED: Use logging task
+        queue_product_notifications([product.id])  # Coalesced with other creations in this request
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+            renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream the filtered catalog as NDJSON (default) or CSV (``?format=csv``).
+
+        Accepts the same filters, search and ordering as the list endpoint;
+        without ``?ordering=`` rows come out in id order.
+        """
+        stream = csv_stream if request.accepted_renderer.format == 'csv' else ndjson_stream
+        return self.export_response(request, stream(self.export_queryset(request), settings.CATALOG_EXPORT_CHUNK_SIZE))
+
+    async def aexport(self, request):
+        queryset = await sync_to_async(self.export_queryset)(request)
+        stream = acsv_stream if request.accepted_renderer.format == 'csv' else andjson_stream
+        return self.export_response(request, stream(queryset, settings.CATALOG_EXPORT_CHUNK_SIZE))
+
+    def export_queryset(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        if api_settings.ORDERING_PARAM not in request.query_params and 'search' not in request.query_params:
+            queryset = queryset.order_by('id')
+        return queryset
+
+    def export_response(self, request, stream):
+        response = StreamingHttpResponse(stream, content_type=request.accepted_renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{request.accepted_renderer.format}"'
+        return response
 
     # NEW: Batch create endpoint for multiple products (demonstrates multiple Celery tasks)
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def batch_create(self, request):
-        """Endpoint to create multiple products in batch, queuing notifications."""
-        serializer = ProductSerializer(data=request.data, many=True)  # Expect list of dicts
-        if serializer.is_valid():
-            products = serializer.save()
-            for product in products:
-                send_product_creation_notification.delay(product.id)  # Queue multiple tasks
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        """Create many products with bulk inserts and chunked notifications.
+
+        Invalid rows are listed under ``errors`` by index while the valid ones
+        are still created: 201 when every row was created, 207 when only some
+        were, 400 when none were.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'detail': 'Expected a list of products.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_size = settings.CATALOG_BATCH_MAX_SIZE
+        if len(items) > max_size:
+            return Response(
+                {'detail': f'Batch of {len(items)} products exceeds the maximum of {max_size}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        products, errors = bulk_create_products(items)
+        if not products:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        created = product_rows_to_data(product_to_row(product) for product in products)
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk_update(self, request):
+        """Apply a price and stock feed: many partial updates (or sku upserts) in one transaction.
+
+        Body: ``[{"sku": "A-1", "price": "9.99", "stock": 4}, {"id": 7, "stock": 0}, ...]``.
+        Returns one result per row, in order (``updated``, ``unchanged``,
+        ``created`` or ``error``): 200 when every row applied, 207 when only
+        some did, 400 when none did.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'detail': 'Expected a list of rows.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_size = settings.CATALOG_FEED_MAX_SIZE
+        if len(items) > max_size:
+            return Response(
+                {'detail': f'Feed of {len(items)} rows exceeds the maximum of {max_size}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = update_products(items)
+        failed = sum(result['status'] == 'error' for result in results)
+        if not failed:
+            response_status = status.HTTP_200_OK
+        elif failed < len(results):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'results': results}, status=response_status)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def reserve(self, request):
+        """Atomically decrement stock for many products in one call.
+
+        Body: ``{"items": [{"product_id": 1, "quantity": 2}, ...], "all_or_nothing": false}``.
+        Returns per-line results: 200 when every line was reserved, 207 when
+        only some were, 409 when none were.
+        """
+        serializer = StockReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            results = reserve_stock(
+                [(line['product_id'], line['quantity']) for line in serializer.validated_data['items']],
+                all_or_nothing=serializer.validated_data['all_or_nothing'],
+            )
+            # Reserved units rank autocomplete completions
+            record_reservations({result['product_id']: result['quantity'] for result in results if result['reserved']})
+        reserved = sum(result['reserved'] for result in results)
+        if reserved == len(results):
+            response_status = status.HTTP_200_OK
+        elif reserved:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_409_CONFLICT
+        return Response({'results': results}, status=response_status)
@@ -2,6 +2,8 @@
 ASGI config for ecommerce project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Catalog list/retrieve requests are served by async views (see
+ecommerce/settings_asgi.py), e.g. ``uvicorn ecommerce.asgi:application --workers 3``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +13,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings_asgi')
 
 application = get_asgi_application()
+
+from catalog.autocomplete import product_index  # noqa: E402
+
+product_index.start()  # Loads the autocomplete index while the worker starts
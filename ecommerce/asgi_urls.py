@@ -0,0 +1,15 @@
+"""URLconf used under ASGI: the API router's catalog routes are async views.
+
+Product and category list/retrieve run natively on the event loop; writes
+and extra actions still go through the regular DRF views.
+"""
+from django.urls import include, path
+
+from catalog.async_views import async_router_urls
+
+from .urls import router, urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include(async_router_urls(router))),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,139 @@
+"""The OpenAPI schema, generated once per code version instead of on every docs request.
+
+``python manage.py generate_schema`` writes it to ``CATALOG_SCHEMA_DIR`` at
+build time (see the Dockerfile). Each process loads it on the first docs
+request, or generates it then if no file matches the running code, and
+serves it from memory with an ETag. drf_yasg is only imported by then, so
+workers that never serve docs don't pay for it at startup.
+"""
+import glob
+import hashlib
+import os
+import threading
+from importlib.metadata import version
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+# Libraries whose upgrades change the generated schema
+SCHEMA_PACKAGES = ('django', 'djangorestframework', 'drf-yasg', 'django-filter', 'djangorestframework-simplejwt')
+
+SCHEMA_INFO = {
+    'title': 'E-Commerce Backend API',
+    'default_version': 'v1',
+    'description': 'API for managing e-commerce product catalog',
+    'terms_of_service': 'https://www.example.com/terms/',
+    'contact': {'email': 'contact@example.com'},
+    'license': {'name': 'MIT License'},
+}
+
+_lock = threading.Lock()
+_version = None
+_schema = None  # (version, encoded JSON)
+_ui_view = None
+
+
+def code_version():
+    """``CATALOG_SCHEMA_VERSION`` (e.g. the deployed git sha), or a hash of the project's Python sources."""
+    global _version
+    if _version is None:
+        if settings.CATALOG_SCHEMA_VERSION:
+            _version = settings.CATALOG_SCHEMA_VERSION
+        else:
+            digest = hashlib.sha256()
+            for package in SCHEMA_PACKAGES:
+                digest.update(f'{package}=={version(package)}\n'.encode())
+            roots = {app.path for app in apps.get_app_configs() if app.path.startswith(str(settings.BASE_DIR))}
+            roots.add(os.path.dirname(os.path.abspath(__file__)))
+            for path in sorted(path for root in roots for path in glob.glob(os.path.join(root, '**', '*.py'), recursive=True)):
+                digest.update(os.path.relpath(path, settings.BASE_DIR).encode())
+                with open(path, 'rb') as handle:
+                    digest.update(handle.read())
+            _version = digest.hexdigest()[:16]
+    return _version
+
+
+def schema_path(schema_version=None):
+    return os.path.join(settings.CATALOG_SCHEMA_DIR, f'openapi-{schema_version or code_version()}.json')
+
+
+def schema_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(**{
+        **SCHEMA_INFO,
+        'contact': openapi.Contact(**SCHEMA_INFO['contact']),
+        'license': openapi.License(**SCHEMA_INFO['license']),
+    })
+
+
+def get_schema_view():
+    from drf_yasg.views import get_schema_view
+
+    return get_schema_view(schema_info(), public=True)
+
+
+def generate_schema():
+    """Introspect every API view and return the schema as JSON bytes.
+
+    No request is involved, so the schema names no host or scheme and
+    Swagger UI calls whichever host served the page.
+    """
+    from drf_yasg.app_settings import swagger_settings
+    from drf_yasg.codecs import OpenAPICodecJson
+
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(schema_info(), '')
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))
+
+
+def write_schema(content, schema_version=None):
+    """Store ``content`` as the schema of ``schema_version`` and drop the files of other versions."""
+    path = schema_path(schema_version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.tmp', 'wb') as handle:
+        handle.write(content)
+    os.replace(f'{path}.tmp', path)
+    for stale in glob.glob(os.path.join(settings.CATALOG_SCHEMA_DIR, 'openapi-*.json')):
+        if stale != path:
+            os.remove(stale)
+    return path
+
+
+def get_schema():
+    """The schema of the running code, from memory, the schema file, or generated on the spot."""
+    global _schema
+    schema_version = code_version()
+    if _schema is None or _schema[0] != schema_version:
+        with _lock:
+            if _schema is None or _schema[0] != schema_version:
+                try:
+                    with open(schema_path(schema_version), 'rb') as handle:
+                        content = handle.read()
+                except FileNotFoundError:
+                    content = generate_schema()
+                    try:
+                        write_schema(content, schema_version)
+                    except OSError:
+                        pass  # Read-only deployment: every process keeps its own copy
+                _schema = (schema_version, content)
+    return _schema[1]
+
+
+@condition(etag_func=lambda request: code_version())
+def schema_json(request):
+    response = HttpResponse(get_schema(), content_type='application/json')
+    patch_cache_control(response, public=True, max_age=settings.CATALOG_SCHEMA_MAX_AGE)
+    return response
+
+
+def docs_view(request, *args, **kwargs):
+    """Swagger UI; its ``?format=openapi`` spec requests get the precomputed schema."""
+    global _ui_view
+    if request.GET.get('format') == 'openapi':
+        return schema_json(request)
+    if _ui_view is None:
+        _ui_view = get_schema_view().with_ui('swagger', cache_timeout=settings.CATALOG_SCHEMA_MAX_AGE)
+    return _ui_view(request, *args, **kwargs)
@@ -28,6 +28,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Full-text/trigram lookups for product search
     'rest_framework',
     'django_filters',
     'drf_yasg',
@@ -40,19 +41,23 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [  # JSON encoding time shows up in the Server-Timing header
+        'catalog.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_THROTTLE_CLASSES': [  # NEW: Anon rate limit (e.g., 100/day) for security
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+    'DEFAULT_THROTTLE_CLASSES': [  # Token buckets in Redis: one script call per request
+        'catalog.throttling.AnonTokenBucketThrottle',
+        'catalog.throttling.UserTokenBucketThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/day',
-        'user': '1000/day',
+        'anon': os.environ.get('THROTTLE_ANON_RATE', '100/day'),
+        'user': os.environ.get('THROTTLE_USER_RATE', '1000/day'),
     },
 }
 
@@ -62,8 +67,10 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'catalog.middleware.ServerTimingMiddleware',  # First, so its total covers every other middleware
+    'catalog.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'catalog.middleware.StaticFilesMiddleware',  # WhiteNoise, without thread hops under ASGI
     'corsheaders.middleware.CorsMiddleware',  # NEW: Add CORS middleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,6 +80,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Under ASGI, ecommerce.settings_asgi routes catalog reads to async views instead
 ROOT_URLCONF = 'ecommerce.urls'
 TEMPLATES = [
     {
@@ -104,6 +112,17 @@ DATABASES = {
     }
 }
 
+# Read replicas: DATABASE_REPLICA_HOSTS=replica1,replica2 adds the aliases
+# replica_1, replica_2 with the primary's settings and their own HOST, and
+# DATABASE_REPLICA_WEIGHTS=3,1 their share of catalog reads (default 1 each).
+CATALOG_READ_REPLICAS = {}
+_replica_weights = [float(weight) for weight in os.environ.get('DATABASE_REPLICA_WEIGHTS', '').split(',') if weight]
+for _index, _host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica_{_index}'] = {**DATABASES['default'], 'HOST': _host, 'TEST': {'MIRROR': 'default'}}
+    CATALOG_READ_REPLICAS[f'replica_{_index}'] = _replica_weights[_index - 1] if _index <= len(_replica_weights) else 1
+DATABASE_ROUTERS = ['catalog.replicas.ReplicaRouter']
+CATALOG_PRIMARY_PIN_SECONDS = int(os.environ.get('CATALOG_PRIMARY_PIN_SECONDS', 10))  # Reads go to the primary after a client's write
+
 # Redis (local)
 CACHES = {
     'default': {
@@ -115,6 +134,33 @@ CACHES = {
     }
 }
 
+# Catalog response cache: list responses are keyed by per-model generation
+# counters that are bumped on every write, so the timeout only bounds memory.
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 60 * 15))
+CATALOG_CACHE_MAX_VARIANTS = int(os.environ.get('CATALOG_CACHE_MAX_VARIANTS', 500))  # Query strings cached per endpoint
+# In-process LRU of hot objects (categories) in front of the shared cache
+CATALOG_OBJECT_CACHE_SIZE = int(os.environ.get('CATALOG_OBJECT_CACHE_SIZE', 1000))
+CATALOG_OBJECT_CACHE_TTL = float(os.environ.get('CATALOG_OBJECT_CACHE_TTL', 60))  # Seconds; bounds staleness if a broadcast is missed
+# Pre-encoded product JSON, one entry per product, replaced when it changes; the timeout only bounds memory
+CATALOG_FRAGMENT_TIMEOUT = int(os.environ.get('CATALOG_FRAGMENT_TIMEOUT', 60 * 60 * 24))
+CATALOG_FRAGMENT_LOCAL_SIZE = int(os.environ.get('CATALOG_FRAGMENT_LOCAL_SIZE', 10000))  # Fragments kept in each process
+
+# Bulk writes: batch_create limits and notification batching
+CATALOG_BATCH_MAX_SIZE = int(os.environ.get('CATALOG_BATCH_MAX_SIZE', 5000))  # Rows accepted per request
+CATALOG_BATCH_CHUNK_SIZE = 1000  # Rows per INSERT
+CATALOG_FEED_MAX_SIZE = int(os.environ.get('CATALOG_FEED_MAX_SIZE', 50000))  # Rows accepted per bulk_update request
+CATALOG_NOTIFICATION_BATCH_SIZE = int(os.environ.get('CATALOG_NOTIFICATION_BATCH_SIZE', 500))  # Product ids per notification message
+CATALOG_NOTIFICATION_FLUSH_INTERVAL = float(os.environ.get('CATALOG_NOTIFICATION_FLUSH_INTERVAL', 1.0))  # Seconds to coalesce ids outside a request
+
+# Lines accepted per /api/products/reserve/ request
+CATALOG_RESERVATION_MAX_LINES = int(os.environ.get('CATALOG_RESERVATION_MAX_LINES', 500))
+
+# Rows fetched per server-side cursor round trip by /api/products/export/
+CATALOG_EXPORT_CHUNK_SIZE = int(os.environ.get('CATALOG_EXPORT_CHUNK_SIZE', 2000))
+
+# Request metrics: seconds between pushes of each worker's counters to Redis
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
 # Celery configuration (local with Redis broker)
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://127.0.0.1:6379/1')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://127.0.0.1:6379/1')
@@ -136,6 +182,18 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Logs emails
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
 }
+# The OpenAPI schema is generated once per code version (see ecommerce/schema.py)
+CATALOG_SCHEMA_DIR = os.environ.get('CATALOG_SCHEMA_DIR', os.path.join(BASE_DIR, 'schema'))
+CATALOG_SCHEMA_VERSION = os.environ.get('CATALOG_SCHEMA_VERSION', '')  # E.g. the git sha; default: a hash of the sources
+CATALOG_SCHEMA_MAX_AGE = int(os.environ.get('CATALOG_SCHEMA_MAX_AGE', 60 * 60))  # Cache-Control of the docs
+# Throttling: clients more than half under their limit take this many seconds'
+# worth of refill from Redis at once, and spend it without a round trip; 0 turns it off
+CATALOG_THROTTLE_LEASE_SECONDS = float(os.environ.get('CATALOG_THROTTLE_LEASE_SECONDS', 1))
+CATALOG_ADMIN_COUNT_THRESHOLD = int(os.environ.get('CATALOG_ADMIN_COUNT_THRESHOLD', 10000))  # Larger admin results show the planner's estimate
+# Product name autocomplete is served from an in-process index (see catalog/autocomplete.py)
+CATALOG_AUTOCOMPLETE_LIMIT = int(os.environ.get('CATALOG_AUTOCOMPLETE_LIMIT', 20))  # Most completions per request
+CATALOG_AUTOCOMPLETE_SYNC_INTERVAL = int(os.environ.get('CATALOG_AUTOCOMPLETE_SYNC_INTERVAL', 60))  # Seconds
+CATALOG_AUTOCOMPLETE_SYNC_DELAY = float(os.environ.get('CATALOG_AUTOCOMPLETE_SYNC_DELAY', 5))  # Least seconds between syncs; invalidations in between are coalesced
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -0,0 +1,8 @@
+"""Settings of the ASGI entry point (ecommerce/asgi.py).
+
+The same as ecommerce.settings, but catalog reads are routed to async views
+(see ecommerce/asgi_urls.py).
+"""
+from .settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = 'ecommerce.asgi_urls'
@@ -3,3 +3,7 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
 application = get_wsgi_application()
+
+from catalog.autocomplete import product_index  # noqa: E402
+
+product_index.start()  # Loads the autocomplete index while the worker starts